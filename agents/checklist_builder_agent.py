@@ -3,10 +3,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict
 import json
 
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm
+
 class ChecklistBuilderAgent:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     
+    @latency_recorder.timed("agent", "checklist")
     async def process(self, job_descriptions: Dict, interview_process: Dict, compensation: Dict) -> Dict:
         """Build comprehensive hiring checklists and action plans"""
         
@@ -65,7 +69,7 @@ class ChecklistBuilderAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="checklist")
         
         try:
             return json.loads(response.content)
@@ -90,7 +94,7 @@ class ChecklistBuilderAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="checklist")
         
         try:
             return json.loads(response.content)
@@ -110,7 +114,7 @@ class ChecklistBuilderAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="checklist")
         return response.content
     
     def _generate_fallback_checklist(self, role: str) -> Dict:
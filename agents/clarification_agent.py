@@ -3,10 +3,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict, Optional
 import json
 
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm
+
 class ClarificationAgent:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     
+    @latency_recorder.timed("agent", "clarification")
     async def process(self, user_input: str, company_context: Optional[str] = None) -> Dict:
         """Process user input and extract/clarify hiring requirements"""
         
@@ -45,7 +49,7 @@ class ClarificationAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="clarification")
         
         try:
             # Try to parse as JSON, fallback to structured text if needed
@@ -3,10 +3,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict
 import json
 
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm
+
 class CompensationAgent:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     
+    @latency_recorder.timed("agent", "compensation")
     async def process(self, market_research: Dict, clarifications: Dict) -> Dict:
         """Design competitive compensation packages for each role"""
         
@@ -65,7 +69,7 @@ class CompensationAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="compensation")
         
         try:
             return json.loads(response.content)
@@ -90,7 +94,7 @@ class CompensationAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="compensation")
         
         try:
             return json.loads(response.content)
@@ -120,7 +124,7 @@ class CompensationAgent:
             HumanMessage(content="Generate compensation negotiation guidelines for startups.")
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="compensation")
         return response.content
     
     def _generate_fallback_package(self, role: str, market_data: Dict) -> Dict:
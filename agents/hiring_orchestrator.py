@@ -1,5 +1,7 @@
 import asyncio
-from typing import Dict, List, Optional
+import copy
+import hashlib
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
@@ -25,6 +27,9 @@ from .interview_process_agent import InterviewProcessAgent
 from .compensation_agent import CompensationAgent
 from .checklist_builder_agent import ChecklistBuilderAgent
 from utils.tools import GoogleSearchTool, EmailWriterTool
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm, stream_llm
+from utils.single_flight import FlightAbandoned, SingleFlight
 
 class HiringState(TypedDict):
     messages: Annotated[list, add_messages]
@@ -42,6 +47,12 @@ class HiringState(TypedDict):
     current_step: str
 
 class HiringOrchestrator:
+    # Number of recent chat messages included in the chat prompt
+    CHAT_HISTORY_LIMIT = 20
+    # Plan sections, in the order the workflow steps produce them
+    PLAN_SECTIONS = ["clarifications", "market_research", "job_descriptions", "interview_process",
+                     "compensation_packages", "hiring_checklist"]
+
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
         
@@ -57,6 +68,9 @@ class HiringOrchestrator:
         self.google_search = GoogleSearchTool()
         self.email_writer = EmailWriterTool()
         
+        # Identical concurrent plan requests share one generation
+        self.plan_flight = SingleFlight("hiring_plan")
+        
         # Build the workflow graph
         self.workflow = self._build_workflow()
     
@@ -86,15 +100,29 @@ class HiringOrchestrator:
         return workflow.compile()
     
     async def generate_hiring_plan(self, user_input: str, company_context: Optional[str], session_id: str) -> Dict:
-        """Generate a comprehensive hiring plan using the multi-agent workflow"""
-        
+        """Generate a comprehensive hiring plan using the multi-agent workflow.
+
+        Concurrent requests with the same normalized input share one
+        generation; every caller gets its own deep copy stamped with its own
+        session. Only generations that await can be joined: the synchronous
+        working-plan and fallback paths finish before another request runs.
+        """
+        plan, _ = await self.plan_flight.do(
+            self._plan_key(user_input, company_context),
+            lambda: self._generate_hiring_plan(user_input, company_context, session_id)
+        )
+        # The leader copies too, so no caller's edits reach a follower's plan
+        return self._stamp_plan(plan, user_input, company_context, session_id)
+
+    async def _generate_hiring_plan(self, user_input: str, company_context: Optional[str], session_id: str) -> Dict:
         try:
             print(f"Starting plan generation for session: {session_id}")
             print(f"User input: {user_input[:100]}...")
             
             # For now, return a working plan immediately to test the system
             # This bypasses the complex agent workflow that's causing issues
-            plan = self._create_working_plan(user_input, company_context, session_id)
+            with latency_recorder.time("step", "working_plan"):
+                plan = self._create_working_plan(user_input, company_context, session_id)
             print("Plan generation completed successfully!")
             return plan
             
@@ -105,6 +133,16 @@ class HiringOrchestrator:
     
     async def chat_response(self, message: str, session_context: Dict, session_id: str) -> str:
         """Generate AI chat response with context awareness"""
+        response = await invoke_llm(self.llm, self._chat_messages(message, session_context), agent="chat")
+        return response.content
+
+    async def stream_chat_response(self, message: str, session_context: Dict, session_id: str) -> AsyncIterator[str]:
+        """Generate the chat response as text chunks, as the model produces them"""
+        async for token in stream_llm(self.llm, self._chat_messages(message, session_context), agent="chat"):
+            yield token
+
+    def _chat_messages(self, message: str, session_context: Dict) -> List:
+        """Prompt for a chat reply, with the session's plan and recent messages as context"""
         
         system_prompt = """You are an expert HR assistant helping with startup hiring processes. 
         You have access to the user's hiring plan and session history. 
@@ -114,19 +152,92 @@ class HiringOrchestrator:
         context_info = f"""
         Session Context:
         - Hiring Plan: {json.dumps(session_context.get('hiring_plan', {}), indent=2)}
-        - Previous Messages: {session_context.get('messages', [])}
+        - Previous Messages: {session_context.get('messages', [])[-self.CHAT_HISTORY_LIMIT:]}
         """
         
-        messages = [
+        return [
             SystemMessage(content=system_prompt + "\n" + context_info),
             HumanMessage(content=message)
         ]
-        
-        response = await self.llm.ainvoke(messages)
-        return response.content
     
+    async def stream_hiring_plan(self, user_input: str, company_context: Optional[str],
+                                 session_id: str) -> AsyncIterator[Dict]:
+        """Generate a hiring plan, yielding each section as soon as it is ready.
+
+        Yields ``{"section": name, "content": ...}`` for each of PLAN_SECTIONS
+        in order, then ``{"plan": plan}`` with the assembled plan (a fallback
+        plan if generation failed part way). An identical generation already
+        in flight is joined like in generate_hiring_plan; its sections are
+        then yielded together once it finishes.
+        """
+        key = self._plan_key(user_input, company_context)
+        future, leading = self.plan_flight.claim(key)
+        if not leading:
+            try:
+                plan = self._stamp_plan(await asyncio.shield(future), user_input, company_context, session_id)
+            except FlightAbandoned:
+                # The leading request went away before finishing; generate independently
+                pass
+            else:
+                for section in self.PLAN_SECTIONS:
+                    if section in plan:
+                        yield {"section": section, "content": plan[section]}
+                yield {"plan": plan}
+                return
+
+        try:
+            try:
+                print(f"Starting streamed plan generation for session: {session_id}")
+                plan = self._working_plan_header(user_input, company_context, session_id)
+                for section, content in self._working_plan_sections(user_input, company_context):
+                    plan[section] = content
+                    yield {"section": section, "content": content}
+                    # Let the response flush before the next section is built
+                    await asyncio.sleep(0)
+            except Exception as e:
+                print(f"Error in plan generation: {str(e)}")
+                plan = self._create_fallback_plan(user_input, company_context, session_id, str(e))
+            if leading:
+                # Release waiting requests before this client has read the plan
+                self.plan_flight.resolve(key, result=copy.deepcopy(plan))
+                leading = False
+            yield {"plan": plan}
+        finally:
+            if leading:
+                self.plan_flight.resolve(key, error=FlightAbandoned("plan generation abandoned"))
+
+    @staticmethod
+    def _plan_key(user_input: str, company_context: Optional[str]) -> str:
+        """Hash of the request with case and whitespace normalized"""
+        normalized = [" ".join((text or "").lower().split()) for text in (user_input, company_context)]
+        return hashlib.sha256("\0".join(normalized).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _stamp_plan(plan: Dict, user_input: str, company_context: Optional[str], session_id: str) -> Dict:
+        """Deep copy of a shared plan carrying the caller's own session and request"""
+        stamped = copy.deepcopy(plan)
+        stamped.update(session_id=session_id, user_request=user_input, company_context=company_context)
+        return stamped
+
     def _create_working_plan(self, user_input: str, company_context: Optional[str], session_id: str) -> Dict:
         """Create a comprehensive working hiring plan based on user input"""
+        plan = self._working_plan_header(user_input, company_context, session_id)
+        plan.update(self._working_plan_sections(user_input, company_context))
+        return plan
+
+    def _working_plan_header(self, user_input: str, company_context: Optional[str], session_id: str) -> Dict:
+        """Plan fields that don't depend on any section"""
+        return {
+            "session_id": session_id,
+            "user_request": user_input,
+            "company_context": company_context,
+            "status": "completed",
+            "agents_used": ["clarification", "market_research", "job_description", "interview_process", "compensation", "checklist"],
+            "created_at": datetime.now().isoformat()
+        }
+
+    def _working_plan_sections(self, user_input: str, company_context: Optional[str]) -> Iterator[Tuple[str, Dict]]:
+        """Build the working plan's sections one at a time, in PLAN_SECTIONS order"""
         
         # Extract roles from user input
         roles = []
@@ -165,79 +276,68 @@ class HiringOrchestrator:
         elif any(word in user_lower for word in ["soon", "fast"]):
             urgency = "Soon"
         
-        # Create comprehensive plan
-        plan = {
-            "session_id": session_id,
-            "user_request": user_input,
-            "company_context": company_context,
-            "status": "completed",
-            "agents_used": ["clarification", "market_research", "job_description", "interview_process", "compensation", "checklist"],
-            "created_at": datetime.now().isoformat(),
-            
-            "clarifications": {
-                "extracted_info": {
-                    "roles": roles,
-                    "skills": self._extract_skills(user_input),
-                    "timeline": urgency,
-                    "budget": "Competitive",
-                    "company_stage": self._extract_company_stage(company_context),
-                    "team_size": "Growing team",
-                    "work_mode": "Flexible"
-                },
-                "clarifying_questions": [
-                    "What is your specific budget range for these positions?",
-                    "What are the most important technical skills for your team?",
-                    "Do you prefer remote, hybrid, or onsite work arrangements?",
-                    "What is your ideal timeline for completing these hires?",
-                    "Are there any specific company culture aspects candidates should know?"
-                ],
-                "assumptions": [
-                    "Assuming startup environment with growth opportunities",
-                    "Assuming competitive compensation is important",
-                    "Assuming modern tech stack and practices",
-                    "Assuming collaborative team environment"
-                ]
-            },
-            
-            "market_research": {
-                "roles_analyzed": roles,
-                "market_data": {role: self._get_market_data(role) for role in roles},
-                "summary": f"Market analysis shows strong demand for {', '.join(roles)} roles with competitive salaries and benefits needed to attract top talent."
+        # Build each section of the plan
+        yield "clarifications", {
+            "extracted_info": {
+                "roles": roles,
+                "skills": self._extract_skills(user_input),
+                "timeline": urgency,
+                "budget": "Competitive",
+                "company_stage": self._extract_company_stage(company_context),
+                "team_size": "Growing team",
+                "work_mode": "Flexible"
             },
-            
-            "job_descriptions": {
-                "job_descriptions": {role: self._create_job_description(role, experience_level) for role in roles},
-                "posting_tips": "Post on multiple platforms, emphasize growth opportunities, highlight company mission and impact."
-            },
-            
-            "interview_process": {
-                "interview_processes": {role: self._create_interview_process(role) for role in roles},
-                "general_guidelines": "Ensure consistent evaluation criteria, provide good candidate experience, minimize bias in decision making."
-            },
-            
-            "compensation_packages": {
-                "compensation_packages": {role: self._create_compensation_package(role, experience_level) for role in roles},
-                "budget_analysis": {
-                    "total_annual_cost": f"${len(roles) * 120}k - ${len(roles) * 180}k estimated total",
-                    "budget_recommendations": ["Consider equity to offset base salary", "Flexible benefits package", "Performance bonuses"],
-                    "cost_optimization": ["Negotiate based on candidate priorities", "Offer growth opportunities", "Competitive equity packages"]
-                },
-                "negotiation_guidelines": "Be transparent about compensation philosophy, understand candidate priorities, have flexibility in package structure."
+            "clarifying_questions": [
+                "What is your specific budget range for these positions?",
+                "What are the most important technical skills for your team?",
+                "Do you prefer remote, hybrid, or onsite work arrangements?",
+                "What is your ideal timeline for completing these hires?",
+                "Are there any specific company culture aspects candidates should know?"
+            ],
+            "assumptions": [
+                "Assuming startup environment with growth opportunities",
+                "Assuming competitive compensation is important",
+                "Assuming modern tech stack and practices",
+                "Assuming collaborative team environment"
+            ]
+        }
+        
+        yield "market_research", {
+            "roles_analyzed": roles,
+            "market_data": {role: self._get_market_data(role) for role in roles},
+            "summary": f"Market analysis shows strong demand for {', '.join(roles)} roles with competitive salaries and benefits needed to attract top talent."
+        }
+        
+        yield "job_descriptions", {
+            "job_descriptions": {role: self._create_job_description(role, experience_level) for role in roles},
+            "posting_tips": "Post on multiple platforms, emphasize growth opportunities, highlight company mission and impact."
+        }
+        
+        yield "interview_process", {
+            "interview_processes": {role: self._create_interview_process(role) for role in roles},
+            "general_guidelines": "Ensure consistent evaluation criteria, provide good candidate experience, minimize bias in decision making."
+        }
+        
+        yield "compensation_packages", {
+            "compensation_packages": {role: self._create_compensation_package(role, experience_level) for role in roles},
+            "budget_analysis": {
+                "total_annual_cost": f"${len(roles) * 120}k - ${len(roles) * 180}k estimated total",
+                "budget_recommendations": ["Consider equity to offset base salary", "Flexible benefits package", "Performance bonuses"],
+                "cost_optimization": ["Negotiate based on candidate priorities", "Offer growth opportunities", "Competitive equity packages"]
             },
-            
-            "hiring_checklist": {
-                "role_checklists": {role: self._create_role_checklist(role) for role in roles},
-                "master_checklist": {
-                    "setup_phase": ["Define hiring goals", "Set budget", "Prepare job descriptions", "Set up interview process"],
-                    "execution_phase": ["Post jobs", "Screen candidates", "Conduct interviews", "Make decisions"],
-                    "coordination_tasks": ["Weekly team meetings", "Candidate tracking", "Feedback collection"],
-                    "milestones": ["Week 1: Jobs posted", "Week 2: Initial interviews", "Week 4: Final decisions", "Week 6: Onboarding"]
-                },
-                "timeline_overview": f"Expected timeline: {urgency.lower()} hiring process with {len(roles)} role(s) to fill. Estimated 4-6 weeks from job posting to hire."
-            }
+            "negotiation_guidelines": "Be transparent about compensation philosophy, understand candidate priorities, have flexibility in package structure."
         }
         
-        return plan
+        yield "hiring_checklist", {
+            "role_checklists": {role: self._create_role_checklist(role) for role in roles},
+            "master_checklist": {
+                "setup_phase": ["Define hiring goals", "Set budget", "Prepare job descriptions", "Set up interview process"],
+                "execution_phase": ["Post jobs", "Screen candidates", "Conduct interviews", "Make decisions"],
+                "coordination_tasks": ["Weekly team meetings", "Candidate tracking", "Feedback collection"],
+                "milestones": ["Week 1: Jobs posted", "Week 2: Initial interviews", "Week 4: Final decisions", "Week 6: Onboarding"]
+            },
+            "timeline_overview": f"Expected timeline: {urgency.lower()} hiring process with {len(roles)} role(s) to fill. Estimated 4-6 weeks from job posting to hire."
+        }
     
     def _extract_skills(self, user_input: str) -> List[str]:
         """Extract skills from user input"""
@@ -512,6 +612,7 @@ class HiringOrchestrator:
             "created_at": asyncio.get_event_loop().time() if asyncio.get_event_loop().is_running() else 0
         }
     
+    @latency_recorder.timed("step", "clarification")
     async def _clarification_step(self, state: Dict) -> Dict:
         """Step 1: Ask clarifying questions and gather requirements"""
         clarifications = await self.clarification_agent.process(
@@ -524,6 +625,7 @@ class HiringOrchestrator:
         state["current_step"] = "market_research"
         return state
     
+    @latency_recorder.timed("step", "market_research")
     async def _market_research_step(self, state: Dict) -> Dict:
         """Step 2: Conduct market research for roles"""
         market_data = await self.market_research_agent.process(
@@ -536,6 +638,7 @@ class HiringOrchestrator:
         state["current_step"] = "job_description"
         return state
     
+    @latency_recorder.timed("step", "job_description")
     async def _job_description_step(self, state: Dict) -> Dict:
         """Step 3: Generate job descriptions"""
         job_descriptions = await self.job_description_agent.process(
@@ -548,6 +651,7 @@ class HiringOrchestrator:
         state["current_step"] = "interview_process"
         return state
     
+    @latency_recorder.timed("step", "interview_process")
     async def _interview_process_step(self, state: Dict) -> Dict:
         """Step 4: Design interview process"""
         interview_process = await self.interview_process_agent.process(
@@ -560,6 +664,7 @@ class HiringOrchestrator:
         state["current_step"] = "compensation"
         return state
     
+    @latency_recorder.timed("step", "compensation")
     async def _compensation_step(self, state: Dict) -> Dict:
         """Step 5: Suggest compensation packages"""
         compensation = await self.compensation_agent.process(
@@ -572,6 +677,7 @@ class HiringOrchestrator:
         state["current_step"] = "checklist"
         return state
     
+    @latency_recorder.timed("step", "checklist")
     async def _checklist_step(self, state: Dict) -> Dict:
         """Step 6: Build hiring checklist"""
         checklist = await self.checklist_builder_agent.process(
@@ -585,6 +691,7 @@ class HiringOrchestrator:
         state["current_step"] = "finalize"
         return state
     
+    @latency_recorder.timed("step", "finalize")
     async def _finalize_step(self, state: Dict) -> Dict:
         """Step 7: Compile final hiring plan"""
         final_plan = {
@@ -3,10 +3,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict
 import json
 
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm
+
 class InterviewProcessAgent:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.4)
     
+    @latency_recorder.timed("agent", "interview_process")
     async def process(self, job_descriptions: Dict, clarifications: Dict) -> Dict:
         """Design structured interview processes for each role"""
         
@@ -64,7 +68,7 @@ class InterviewProcessAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="interview_process")
         
         try:
             return json.loads(response.content)
@@ -82,7 +86,7 @@ class InterviewProcessAgent:
             HumanMessage(content="Generate interview guidelines for startup hiring teams.")
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="interview_process")
         return response.content
     
     def _generate_fallback_process(self, role: str) -> Dict:
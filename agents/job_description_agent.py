@@ -3,10 +3,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict
 import json
 
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm
+
 class JobDescriptionAgent:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.5)
     
+    @latency_recorder.timed("agent", "job_description")
     async def process(self, clarifications: Dict, market_research: Dict) -> Dict:
         """Generate tailored job descriptions based on requirements and market data"""
         
@@ -69,7 +73,7 @@ class JobDescriptionAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="job_description")
         
         try:
             return json.loads(response.content)
@@ -89,7 +93,7 @@ class JobDescriptionAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="job_description")
         return response.content
     
     def _generate_fallback_jd(self, role: str, extracted_info: Dict) -> Dict:
@@ -3,10 +3,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict, Any
 import json
 
+from utils.latency import latency_recorder
+from utils.llm import invoke_llm
+
 class MarketResearchAgent:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     
+    @latency_recorder.timed("agent", "market_research")
     async def process(self, clarifications: Dict, search_tool: Any) -> Dict:
         """Conduct market research for the specified roles"""
         
@@ -80,7 +84,7 @@ class MarketResearchAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="market_research")
         
         try:
             return json.loads(response.content)
@@ -100,7 +104,7 @@ class MarketResearchAgent:
             HumanMessage(content=prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        response = await invoke_llm(self.llm, messages, agent="market_research")
         return response.content
     
     def _generate_fallback_analysis(self, role: str) -> Dict:
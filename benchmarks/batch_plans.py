@@ -0,0 +1,97 @@
+"""Throughput of /api/generate_hiring_plans:batch against sequential calls.
+
+Generates the same set of hiring plans twice, in-process, with each LLM call
+replaced by a fixed delay: once as one /api/generate_hiring_plan request per
+plan, and once as a single batch request. Inputs differ per plan so that
+single-flight coalescing doesn't hide the work.
+
+    python benchmarks/batch_plans.py --plans 100 --concurrency 16 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batch vs sequential hiring plan generation")
+    parser.add_argument("--plans", type=int, default=50, help="Hiring plans to generate")
+    parser.add_argument("--concurrency", type=int, default=8, help="Batch concurrency")
+    parser.add_argument("--llm-calls", type=int, default=6, help="Simulated LLM calls per plan")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per simulated LLM call")
+    parser.add_argument("--llm-rate", type=float, default=0, help="LLM calls per second allowed (0 = unlimited)")
+    return parser.parse_args()
+
+class StubLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return None
+
+async def run(args) -> bool:
+    import httpx
+    import server
+    from utils.llm import invoke_llm
+    from utils.rate_limit import llm_rate_limiter
+
+    llm_rate_limiter.rate = args.llm_rate
+    llm_rate_limiter.burst = max(1, int(args.llm_rate))
+    orchestrator = server.hiring_orchestrator
+    llm = StubLLM(args.llm_latency)
+
+    async def stub_generate(user_input, company_context, session_id):
+        for _ in range(args.llm_calls):
+            await invoke_llm(llm, [], "benchmark")
+        return orchestrator._create_working_plan(user_input, company_context, session_id)
+
+    orchestrator._generate_hiring_plan = stub_generate
+    requests = [{"user_input": f"We need a senior engineer #{i}"} for i in range(args.plans)]
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        sequential_ok = 0
+        for request in requests:
+            response = await client.post("/api/generate_hiring_plan", json=request)
+            sequential_ok += response.status_code == 200
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batch_ok = 0
+        indexes = set()
+        async with client.stream("POST", "/api/generate_hiring_plans:batch",
+                                 json={"requests": requests, "concurrency": args.concurrency}) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                indexes.add(item["index"])
+                batch_ok += item["status"] == "completed"
+        batch = time.perf_counter() - started
+
+    print(f"plans:            {args.plans} x {args.llm_calls} LLM calls of {args.llm_latency * 1000:.0f}ms"
+          f"{f', limited to {args.llm_rate:g}/s' if args.llm_rate else ''}")
+    print(f"sequential:       {sequential:.2f}s ({args.plans / sequential:.1f} plans/s, {sequential_ok} ok)")
+    print(f"batch:            {batch:.2f}s ({args.plans / batch:.1f} plans/s, {batch_ok} ok, "
+          f"concurrency {args.concurrency})")
+    print(f"speedup:          {sequential / batch:.1f}x")
+    return sequential_ok == batch_ok == args.plans and len(indexes) == args.plans
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    sys.path.insert(0, ROOT_DIR)
+    with tempfile.TemporaryDirectory() as data_root:
+        # The server stores sessions under ./data
+        os.chdir(data_root)
+        ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Stress test for concurrent /api/chat writes.
+
+Fires many concurrent chat requests at the API (in-process, with the LLM
+stubbed out), then checks that every message was persisted and reports
+throughput and group-commit statistics.
+
+    python benchmarks/chat_stress.py --requests 500 --sessions 5 --backend sqlite
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent /api/chat stress test")
+    parser.add_argument("--requests", type=int, default=500, help="Total chat requests")
+    parser.add_argument("--sessions", type=int, default=5, help="Sessions the requests are spread over")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests in flight at once")
+    parser.add_argument("--backend", default=os.getenv("SESSION_BACKEND", "json"),
+                        choices=["json", "indexed", "sqlite", "sharded"])
+    return parser.parse_args()
+
+async def run(args) -> bool:
+    import httpx
+    import server
+
+    async def stub_chat_response(message, session_context, session_id):
+        await asyncio.sleep(0)
+        return f"ack: {message}"
+
+    server.hiring_orchestrator.chat_response = stub_chat_response
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        session_ids = []
+        for _ in range(args.sessions):
+            response = await client.post("/api/sessions")
+            session_ids.append(response.json()["session_id"])
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        failures = Counter()
+
+        async def chat(i: int):
+            async with semaphore:
+                response = await client.post("/api/chat", json={
+                    "session_id": session_ids[i % len(session_ids)],
+                    "message": f"message-{i}"
+                })
+                if response.status_code != 200:
+                    failures[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(chat(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    # Verify against a fresh store so nothing is served from the write-through cache
+    server.memory_manager.close()
+    from utils.memory_manager import MemoryManager
+    reopened = MemoryManager(backend=args.backend)
+    expected = {
+        sid: {f"message-{i}" for i in range(args.requests) if i % len(session_ids) == n}
+        for n, sid in enumerate(session_ids)
+    }
+    lost = 0
+    for sid, messages in expected.items():
+        stored = [m["user_message"] for m in reopened.get_messages(sid)[0]]
+        if len(stored) != len(set(stored)):
+            print(f"Duplicate messages in session {sid}")
+            lost += 1
+        lost += len(messages - set(stored))
+    reopened.close()
+
+    stats = server.memory_manager.stats().get("commit_queue", {})
+    print(f"backend:          {args.backend}")
+    print(f"requests:         {args.requests} over {len(session_ids)} sessions, concurrency {args.concurrency}")
+    print(f"elapsed:          {elapsed:.2f}s")
+    print(f"throughput:       {args.requests / elapsed:.1f} req/s")
+    print(f"failed requests:  {sum(failures.values())} {dict(failures) if failures else ''}")
+    print(f"lost messages:    {lost}")
+    print(f"commit batches:   {stats.get('batches')} (avg {stats.get('avg_batch_size')}, "
+          f"max {stats.get('max_batch_size')} writes per commit)")
+    return lost == 0 and not failures
+
+def main():
+    args = parse_args()
+    os.environ["SESSION_BACKEND"] = args.backend
+    os.environ.setdefault("OPENAI_API_KEY", "stress-test")
+    sys.path.insert(0, ROOT_DIR)
+    with tempfile.TemporaryDirectory() as data_root:
+        # The server stores sessions under ./data
+        os.chdir(data_root)
+        ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Point-lookup latency of the single-file session stores as the file grows.
+
+    python benchmarks/session_lookup.py --sizes 100 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session_stores import IndexedJsonSessionStore, JsonSessionStore
+from utils.snapshot_file import SnapshotFile
+
+def build_snapshot(storage_dir: str, count: int):
+    session = {
+        "created_at": "2025-01-01T00:00:00", "status": "active", "message_count": 0,
+        "hiring_plan": {"summary": "x" * 2000}
+    }
+    SnapshotFile.write(
+        os.path.join(storage_dir, "sessions.json"),
+        ((f"session-{i:08d}", json.dumps(dict(session, id=f"session-{i:08d}"))) for i in range(count))
+    )
+
+def measure(store_class, storage_dir: str, count: int, lookups: int):
+    # The first open builds the summary index and offsets; time a reopen
+    store_class(storage_dir).close()
+    started = time.perf_counter()
+    store = store_class(storage_dir)
+    open_ms = (time.perf_counter() - started) * 1000
+    keys = [f"session-{random.randrange(count):08d}" for _ in range(lookups)]
+    started = time.perf_counter()
+    for key in keys:
+        store.get(key)
+    lookup_us = (time.perf_counter() - started) / lookups * 1e6
+    store.close()
+    return open_ms, lookup_us
+
+def main():
+    parser = argparse.ArgumentParser(description="Session point-lookup benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>10} {'store':>8} {'reopen ms':>10} {'lookup us':>10}")
+    for count in args.sizes:
+        for name, store_class in (("json", JsonSessionStore), ("indexed", IndexedJsonSessionStore)):
+            with tempfile.TemporaryDirectory() as storage_dir:
+                build_snapshot(storage_dir, count)
+                open_ms, lookup_us = measure(store_class, storage_dir, count, args.lookups)
+            print(f"{count:>10} {name:>8} {open_ms:>10.1f} {lookup_us:>10.1f}")
+
+if __name__ == "__main__":
+    main()
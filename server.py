@@ -1,9 +1,12 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
+import asyncio
 import json
 import os
+import time
 from datetime import datetime
 import uuid
 from dotenv import load_dotenv
@@ -11,6 +14,11 @@ from dotenv import load_dotenv
 from agents.hiring_orchestrator import HiringOrchestrator
 from utils.memory_manager import MemoryManager
 from utils.analytics import AnalyticsTracker
+from utils.latency import latency_recorder
+from utils.metrics import metrics, monitor_event_loop_lag
+from utils.job_queue import JobQueue, JobQueueFull, JobStore
+from utils.response_cache import ResponseCache, accepts_gzip
+from utils.session_index import CURSOR_PATTERN
 
 load_dotenv()
 
@@ -25,10 +33,157 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RequestMetricsMiddleware:
+    """Record per-endpoint latency and request counts, keyed by route template rather than raw path.
+
+    A plain ASGI middleware, so a request is measured, and counted as in
+    flight, until the app has sent the last body chunk: streamed responses
+    (SSE, NDJSON) count their whole stream, not just the time to the
+    response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        metrics.inc("hr_agent_http_requests_in_flight")
+
+        async def send_and_track(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_track)
+        finally:
+            metrics.inc("hr_agent_http_requests_in_flight", value=-1)
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up the series count
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            latency_recorder.record("endpoint", f"{method} {path}", time.perf_counter() - started)
+            metrics.inc("hr_agent_http_requests_total", {"method": method, "route": path, "status": status})
+
+app.add_middleware(RequestMetricsMiddleware)
+
 # Initialize components
-memory_manager = MemoryManager()
-analytics_tracker = AnalyticsTracker()
+memory_manager = MemoryManager(
+    backend=os.getenv("SESSION_BACKEND", "json"),
+    cache_max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1024")),
+    cache_max_bytes=int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    commit_window=float(os.getenv("SESSION_COMMIT_WINDOW_MS", "2")) / 1000,
+    archive_after=float(os.getenv("SESSION_ARCHIVE_AFTER_DAYS", "0")) * 86400 or None,
+    archive_codec=os.getenv("SESSION_ARCHIVE_CODEC", "lzma"),
+    blob_sweep_interval=float(os.getenv("PLAN_BLOB_SWEEP_HOURS", "24")) * 3600 or None
+)
+analytics_tracker = AnalyticsTracker(
+    cache_ttl=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "2")),
+    cache_max_age=float(os.getenv("ANALYTICS_CACHE_MAX_AGE_SECONDS", "60"))
+)
 hiring_orchestrator = HiringOrchestrator()
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    gzip_min_bytes=int(os.getenv("GZIP_MIN_BYTES", "1024"))
+)
+job_queue = JobQueue(
+    JobStore(),
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("JOB_QUEUE_MAX", "1000"))
+)
+
+def collect_cache_metrics():
+    """Hit and miss counters of the session cache, the plan blob intern and the response cache"""
+    caches = {"session": memory_manager.cache, "response": response_cache}
+    if memory_manager.blobs:
+        caches["plan_blob"] = memory_manager.blobs
+    for name, cache in caches.items():
+        hits, misses = cache.hits, cache.misses
+        yield "hr_agent_cache_hits_total", "counter", "Cache hits by cache", {"cache": name}, hits
+        yield "hr_agent_cache_misses_total", "counter", "Cache misses by cache", {"cache": name}, misses
+        yield ("hr_agent_cache_hit_ratio", "gauge", "Cache hit ratio by cache", {"cache": name},
+               round(hits / (hits + misses), 4) if hits + misses else 0.0)
+
+metrics.register_collector(collect_cache_metrics)
+
+def collect_job_metrics():
+    """Background job queue depth and running jobs"""
+    yield "hr_agent_job_queue_depth", "gauge", "Background jobs waiting for a worker", {}, job_queue.depth()
+    yield "hr_agent_jobs_running", "gauge", "Background jobs currently running", {}, job_queue.running
+
+metrics.register_collector(collect_job_metrics)
+
+def collect_coalescing_metrics():
+    """Share of plan requests served by an identical request already in flight"""
+    stats = hiring_orchestrator.plan_flight.stats()
+    yield ("hr_agent_plan_coalesce_ratio", "gauge", "Fraction of plan requests coalesced into an in-flight one", {},
+           stats["coalesce_rate"])
+    yield "hr_agent_plans_in_flight", "gauge", "Distinct plan generations in flight", {}, stats["in_flight"]
+
+metrics.register_collector(collect_coalescing_metrics)
+
+def storage_stats() -> Dict:
+    stats = memory_manager.stats()
+    stats["analytics_events"] = analytics_tracker.stats()
+    return stats
+
+analytics_tracker.register_section("storage", storage_stats)
+analytics_tracker.register_section("latency", latency_recorder.snapshot)
+
+def sse_event(event: str, data: Dict) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the given ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [strip_weak(candidate.strip()) for candidate in if_none_match.split(",")]
+    return "*" in candidates or strip_weak(etag) in candidates
+
+def strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def cached_response(request: Request, key, etag: str, build) -> Response:
+    """304 if the client has this version, else its cached bytes, gzipped when accepted.
+
+    ``build`` produces the body (a JSON-serializable value or bytes) on a
+    cache miss.
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.put(key, build())
+    return encoded_response(request, etag, entry)
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+def encoded_response(request: Request, etag: str, entry: Dict) -> Response:
+    """A response cache entry as a response, gzipped when the client accepts it"""
+    headers = cache_headers(etag)
+    if entry["gzip"] is not None and accepts_gzip(request.headers.get("accept-encoding")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry["gzip"], media_type="application/json", headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+def split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """A ``fields`` query parameter as a list of paths, or None for everything"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
 
 # Request/Response models
 class HiringRequest(BaseModel):
@@ -36,6 +191,10 @@ class HiringRequest(BaseModel):
     company_context: Optional[str] = None
     session_id: Optional[str] = None
 
+class BatchHiringRequest(BaseModel):
+    requests: List[HiringRequest] = Field(..., min_length=1, max_length=500)
+    concurrency: Optional[int] = Field(None, ge=1, le=64)
+
 class ChatRequest(BaseModel):
     message: str
     session_id: str
@@ -50,6 +209,21 @@ class HiringPlanResponse(BaseModel):
     status: str
     agents_used: List[str]
 
+@app.on_event("startup")
+async def startup():
+    """Start sampling event loop lag and the background job workers"""
+    app.state.loop_monitor = asyncio.create_task(monitor_event_loop_lag())
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Flush persistent state before the process exits"""
+    app.state.loop_monitor.cancel()
+    await job_queue.close()
+    job_queue.store.close()
+    memory_manager.close()
+    analytics_tracker.close()
+
 @app.get("/")
 async def root():
     return {"message": "HR Agent API is running", "status": "healthy"}
@@ -66,7 +240,7 @@ async def create_session():
         "hiring_plan": None
     }
     
-    memory_manager.create_session(session_id, session_data)
+    await memory_manager.acreate_session(session_id, session_data)
     analytics_tracker.track_session_created(session_id)
     
     return SessionResponse(session_id=session_id, status="created")
@@ -93,7 +267,7 @@ async def generate_hiring_plan(request: HiringRequest):
         )
         
         # Store the plan in memory
-        memory_manager.update_session_plan(session_id, hiring_plan)
+        await memory_manager.aupdate_session_plan(session_id, hiring_plan)
         
         # Track completion
         analytics_tracker.track_plan_generation_completed(session_id)
@@ -109,12 +283,156 @@ async def generate_hiring_plan(request: HiringRequest):
         analytics_tracker.track_error(session_id if 'session_id' in locals() else None, str(e))
         raise HTTPException(status_code=500, detail=f"Error generating hiring plan: {str(e)}")
 
+@app.post("/api/generate_hiring_plan/stream")
+async def stream_hiring_plan(request: HiringRequest):
+    """Generate a hiring plan, streaming each section as Server-Sent Events.
+
+    Emits a ``session`` event, one ``section`` event per plan section as
+    soon as it is ready, then ``plan`` with the full plan once it has been
+    stored (or ``error``).
+    """
+    if not request.session_id:
+        session_id = (await create_session()).session_id
+    else:
+        session_id = request.session_id
+
+    async def events():
+        try:
+            yield sse_event("session", {"session_id": session_id})
+            analytics_tracker.track_plan_generation_started(session_id, request.user_input)
+
+            hiring_plan = None
+            async for update in hiring_orchestrator.stream_hiring_plan(
+                user_input=request.user_input,
+                company_context=request.company_context,
+                session_id=session_id
+            ):
+                if "section" in update:
+                    yield sse_event("section", update)
+                else:
+                    hiring_plan = update["plan"]
+
+            await memory_manager.aupdate_session_plan(session_id, hiring_plan)
+            analytics_tracker.track_plan_generation_completed(session_id)
+            yield sse_event("plan", {
+                "session_id": session_id,
+                "plan": hiring_plan,
+                "status": "completed",
+                "agents_used": hiring_plan.get("agents_used", [])
+            })
+        except Exception as e:
+            analytics_tracker.track_error(session_id, str(e))
+            yield sse_event("error", {"detail": f"Error generating hiring plan: {str(e)}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/generate_hiring_plans:batch")
+async def generate_hiring_plans_batch(batch: BatchHiringRequest):
+    """Generate many hiring plans with bounded concurrency, streamed back as NDJSON.
+
+    Each line is ``{"index", "session_id", "status", "plan" | "error"}``,
+    written as soon as that item finishes, so lines arrive in completion
+    order. Items run at most ``concurrency`` (default BATCH_CONCURRENCY) at
+    a time, and LLM and search calls share the process-wide rate limits.
+    """
+    concurrency = batch.concurrency or int(os.getenv("BATCH_CONCURRENCY", "8"))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(index: int, item: HiringRequest) -> Dict:
+        async with semaphore:
+            session_id = item.session_id
+            try:
+                # Create the session here so a failed row still names it
+                if not session_id:
+                    session_id = (await create_session()).session_id
+                result = await generate_hiring_plan(item.model_copy(update={"session_id": session_id}))
+                return {"index": index, "session_id": result.session_id, "status": "completed", "plan": result.plan}
+            except HTTPException as e:
+                return {"index": index, "session_id": session_id, "status": "failed", "error": e.detail}
+            except Exception as e:
+                return {"index": index, "session_id": session_id, "status": "failed", "error": str(e)}
+
+    async def lines():
+        tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(batch.requests)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # Client went away: don't keep generating plans nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def run_hiring_plan_job(payload: Dict, progress) -> Dict:
+    """Background job: generate and store a hiring plan, reporting each finished section"""
+    session_id = payload["session_id"]
+    analytics_tracker.track_plan_generation_started(session_id, payload["user_input"])
+    completed_steps = []
+    progress({"completed_steps": completed_steps, "total_steps": len(hiring_orchestrator.PLAN_SECTIONS)})
+    try:
+        hiring_plan = None
+        async for update in hiring_orchestrator.stream_hiring_plan(
+            user_input=payload["user_input"],
+            company_context=payload.get("company_context"),
+            session_id=session_id
+        ):
+            if "section" in update:
+                completed_steps.append(update["section"])
+                progress({"completed_steps": completed_steps, "total_steps": len(hiring_orchestrator.PLAN_SECTIONS)})
+            else:
+                hiring_plan = update["plan"]
+
+        await memory_manager.aupdate_session_plan(session_id, hiring_plan)
+        analytics_tracker.track_plan_generation_completed(session_id)
+    except Exception as e:
+        analytics_tracker.track_error(session_id, str(e))
+        raise
+    return HiringPlanResponse(
+        session_id=session_id,
+        plan=hiring_plan,
+        status="completed",
+        agents_used=hiring_plan.get("agents_used", [])
+    ).model_dump()
+
+job_queue.register("hiring_plan", run_hiring_plan_job)
+
+@app.post("/api/jobs/hiring_plan", status_code=202)
+async def submit_hiring_plan_job(request: HiringRequest):
+    """Queue hiring plan generation and return the job ID immediately.
+
+    Poll GET /api/jobs/{job_id} for status, per-step progress and the result.
+    """
+    if not request.session_id:
+        session_id = (await create_session()).session_id
+    else:
+        session_id = request.session_id
+    try:
+        job = job_queue.submit("hiring_plan", {
+            "user_input": request.user_input,
+            "company_context": request.company_context,
+            "session_id": session_id
+        })
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job["job_id"], "session_id": session_id, "status": job["status"]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and (once finished) result or error of a background job"""
+    job = job_queue.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/api/chat")
 async def chat_with_assistant(request: ChatRequest):
     """Chat with AI assistant about hiring plans"""
     try:
         # Get session context
-        session_data = memory_manager.get_session(request.session_id)
+        session_data = await memory_manager.aget_session(
+            request.session_id, message_limit=hiring_orchestrator.CHAT_HISTORY_LIMIT
+        )
         if not session_data:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -126,7 +444,7 @@ async def chat_with_assistant(request: ChatRequest):
         )
         
         # Store chat message
-        memory_manager.add_chat_message(request.session_id, request.message, response)
+        await memory_manager.aadd_chat_message(request.session_id, request.message, response)
         analytics_tracker.track_chat_interaction(request.session_id)
         
         return {"response": response, "session_id": request.session_id}
@@ -135,24 +453,145 @@ async def chat_with_assistant(request: ChatRequest):
         analytics_tracker.track_error(request.session_id, str(e))
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
-@app.get("/api/sessions/{session_id}")
-async def get_session(session_id: str):
-    """Get session data including hiring plan and chat history"""
-    session_data = memory_manager.get_session(session_id)
+@app.post("/api/chat/stream")
+async def stream_chat(request: ChatRequest):
+    """Chat with the assistant, streaming the reply token by token as Server-Sent Events.
+
+    Emits ``token`` events as the model produces text, then ``done`` with the
+    full response once the exchange has been stored (or ``error``).
+    """
+    session_data = await memory_manager.aget_session(
+        request.session_id, message_limit=hiring_orchestrator.CHAT_HISTORY_LIMIT
+    )
     if not session_data:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    return session_data
+
+    async def events():
+        try:
+            tokens = []
+            async for token in hiring_orchestrator.stream_chat_response(
+                message=request.message,
+                session_context=session_data,
+                session_id=request.session_id
+            ):
+                tokens.append(token)
+                yield sse_event("token", {"token": token})
+
+            response = "".join(tokens)
+            await memory_manager.aadd_chat_message(request.session_id, request.message, response)
+            analytics_tracker.track_chat_interaction(request.session_id)
+            yield sse_event("done", {"response": response, "session_id": request.session_id})
+        except Exception as e:
+            analytics_tracker.track_error(request.session_id, str(e))
+            yield sse_event("error", {"detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(
+    request: Request,
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=0, le=1000),
+    cursor: Optional[str] = Query(None, pattern=r"^\d+$"),
+    since: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get session data including hiring plan and chat history.
+
+    With limit/cursor/since only one page of messages is returned, together
+    with next_message_cursor for the next older page. ``fields`` is a
+    comma-separated list of keys or dotted paths to return, e.g.
+    ``status,plan.compensation_packages`` or ``messages``.
+
+    Responses carry an ETag derived from the session's version and the
+    query; a matching If-None-Match gets 304 Not Modified. The encoded
+    (and gzipped) body of each version is cached.
+    """
+    version = await memory_manager.asession_version(session_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    def version_etag(version: str):
+        key = ("session", session_id, version, limit, cursor, since, fields)
+        return key, ResponseCache.etag(key)
+
+    key, etag = version_etag(version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    entry = response_cache.get(key)
+    if entry is None:
+        # A write may have landed since the version check; tag the body with the version it was read at
+        version, session_data = memory_manager.get_session_versioned(
+            session_id, message_limit=limit, message_cursor=cursor, message_since=since,
+            fields=split_fields(fields)
+        )
+        if not session_data:
+            raise HTTPException(status_code=404, detail="Session not found")
+        key, etag = version_etag(version)
+        entry = response_cache.put(key, session_data)
+    return encoded_response(request, etag, entry)
 
 @app.get("/api/sessions")
-async def list_sessions():
-    """List all sessions"""
-    return memory_manager.list_sessions()
+async def list_sessions(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, pattern=CURSOR_PATTERN),
+    status: Optional[str] = None,
+    has_hiring_plan: Optional[bool] = None,
+    fields: Optional[str] = None
+):
+    """List sessions newest first, one page at a time.
+
+    The cursor for the next page is returned in the X-Next-Cursor header;
+    ``fields`` limits each summary to the given comma-separated keys.
+    """
+    sessions, next_cursor = memory_manager.list_sessions_page(
+        limit=limit, cursor=cursor, status=status, has_hiring_plan=has_hiring_plan, fields=split_fields(fields)
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return sessions
 
 @app.get("/api/analytics")
-async def get_analytics():
-    """Get usage analytics and statistics"""
-    return analytics_tracker.get_analytics()
+async def get_analytics(request: Request):
+    """Get usage analytics and statistics.
+
+    Served from the tracker's cached document; a matching If-None-Match
+    gets 304 Not Modified.
+    """
+    body, etag = analytics_tracker.get_analytics_document()
+    return cached_response(request, ("analytics", etag), etag, lambda: body)
+
+@app.get("/api/analytics/query")
+async def query_analytics(
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_id: Optional[str] = None,
+    bucket: Optional[str] = Query(None, pattern="^(minute|hour|day)$"),
+    top_sessions: int = Query(0, ge=0, le=100),
+    hour_of_day: bool = False,
+    windows: bool = False
+):
+    """Ad-hoc event counts over the full analytics history"""
+    try:
+        return analytics_tracker.query(
+            event_type=event_type,
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None,
+            session_id=session_id,
+            bucket=bucket,
+            top_sessions=top_sessions,
+            hour_of_day=hour_of_day,
+            windows=windows
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analytics query error: {str(e)}")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics, rendered from in-memory counters only"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
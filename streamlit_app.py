@@ -17,6 +17,12 @@ st.set_page_config(
 
 # API Configuration
 API_BASE_URL = "http://localhost:8001"
+# Background plan generation jobs are polled at this interval, up to the timeout (seconds)
+JOB_POLL_INTERVAL = 0.5
+JOB_POLL_TIMEOUT = 300
+# Sessions are listed a page at a time; the API returns the next page's cursor in X-Next-Cursor
+SESSIONS_PAGE_SIZE = 200
+SESSION_STATUSES = ["active"]
 
 # Custom CSS for attractive and colorful styling
 st.markdown("""
@@ -308,53 +314,118 @@ def generate_hiring_plan(user_input, company_context=""):
             "session_id": st.session_state.session_id
         }
         
-        with st.spinner("🤖 Our AI agents are working on your hiring plan..."):
-            response = requests.post(f"{API_BASE_URL}/api/generate_hiring_plan", json=payload)
-        
-        if response.status_code == 200:
-            data = response.json()
-            st.session_state.hiring_plan = data["plan"]
-            st.session_state.session_id = data["session_id"]
-            return data["plan"]
-        else:
+        response = requests.post(f"{API_BASE_URL}/api/jobs/hiring_plan", json=payload, timeout=10)
+        if response.status_code != 202:
             st.error(f"Failed to generate hiring plan: {response.text}")
             return None
+        job_id = response.json()["job_id"]
+        
+        # Poll the background job, showing which plan sections are done
+        progress_bar = st.progress(0.0, text="🤖 Our AI agents are working on your hiring plan...")
+        deadline = time.time() + JOB_POLL_TIMEOUT
+        while time.time() < deadline:
+            job = requests.get(f"{API_BASE_URL}/api/jobs/{job_id}", timeout=10).json()
+            progress = job.get("progress", {})
+            steps = progress.get("completed_steps", [])
+            if progress.get("total_steps"):
+                latest = steps[-1].replace("_", " ").title() if steps else "Starting"
+                progress_bar.progress(len(steps) / progress["total_steps"], text=f"🤖 {latest} done...")
+            if job["status"] == "completed":
+                progress_bar.empty()
+                data = job["result"]
+                st.session_state.hiring_plan = data["plan"]
+                st.session_state.session_id = data["session_id"]
+                return data["plan"]
+            if job["status"] == "failed":
+                progress_bar.empty()
+                st.error(f"Failed to generate hiring plan: {job['error']}")
+                return None
+            time.sleep(JOB_POLL_INTERVAL)
+        
+        progress_bar.empty()
+        st.error("Hiring plan generation is taking longer than expected. Please try again later.")
+        return None
     except Exception as e:
         st.error(f"Error generating hiring plan: {str(e)}")
         return None
 
-def send_chat_message(message):
-    """Send chat message to AI assistant"""
+def stream_chat_message(message, placeholder):
+    """Send a chat message and render the reply in the placeholder as tokens arrive"""
     try:
         payload = {
             "message": message,
             "session_id": st.session_state.session_id
         }
         
-        response = requests.post(f"{API_BASE_URL}/api/chat", json=payload)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data["response"]
-        else:
-            st.error(f"Chat error: {response.text}")
-            return None
+        with requests.post(f"{API_BASE_URL}/api/chat/stream", json=payload, stream=True) as response:
+            if response.status_code != 200:
+                st.error(f"Chat error: {response.text}")
+                return None
+            
+            reply = ""
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "token":
+                        reply += data["token"]
+                        placeholder.markdown(
+                            f'<div class="chat-message"><strong>AI Assistant:</strong> {reply}▌</div>',
+                            unsafe_allow_html=True
+                        )
+                    elif event == "done":
+                        return data["response"]
+                    elif event == "error":
+                        st.error(data["detail"])
+                        return None
+            return reply or None
     except Exception as e:
         st.error(f"Error in chat: {str(e)}")
         return None
 
 def get_analytics():
-    """Get analytics data from the backend"""
+    """Get analytics data from the backend, revalidating the last copy with its ETag"""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/analytics")
+        cached = st.session_state.get("analytics_cache")
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        response = requests.get(f"{API_BASE_URL}/api/analytics", headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["data"]
         if response.status_code == 200:
-            return response.json()
+            data = response.json()
+            if response.headers.get("ETag"):
+                st.session_state.analytics_cache = {"etag": response.headers["ETag"], "data": data}
+            return data
         else:
             return None
     except Exception as e:
         st.error(f"Error fetching analytics: {str(e)}")
         return None
 
+def load_sessions_page():
+    """Fetch the next page of the session list for the current filters and append it"""
+    params = dict(st.session_state.sessions_params, limit=SESSIONS_PAGE_SIZE)
+    if st.session_state.sessions_cursor:
+        params["cursor"] = st.session_state.sessions_cursor
+    try:
+        response = requests.get(f"{API_BASE_URL}/api/sessions", params=params)
+        if response.status_code == 200:
+            st.session_state.sessions_list.extend(response.json())
+            st.session_state.sessions_cursor = response.headers.get("X-Next-Cursor")
+            st.session_state.sessions_loaded = True
+        else:
+            st.error("Failed to fetch sessions.")
+    except Exception as e:
+        st.error(f"Error fetching sessions: {str(e)}")
+
+def reset_sessions_list(params: dict):
+    st.session_state.sessions_params = params
+    st.session_state.sessions_list = []
+    st.session_state.sessions_cursor = None
+    st.session_state.sessions_loaded = False
+
 def display_hiring_plan(plan):
     """Display the hiring plan in a structured format"""
     if not plan:
@@ -817,7 +888,9 @@ def main():
             sent = st.form_submit_button("Send", type="primary")
         
         if sent and user_message:
-            ai_response = send_chat_message(user_message)
+            with chat_container:
+                st.markdown(f'<div class="chat-message"><strong>You:</strong> {user_message}</div>', unsafe_allow_html=True)
+                ai_response = stream_chat_message(user_message, st.empty())
             if ai_response:
                 st.session_state.chat_history.append((user_message, ai_response))
                 st.rerun()
@@ -1004,7 +1077,51 @@ def main():
                     ))
                     fig_response.update_layout(height=300)
                     st.plotly_chart(fig_response, use_container_width=True)
-            
+
+            # Session funnel and time between stages
+            funnel = analytics_data.get("funnel", {})
+            if funnel.get("stages"):
+                st.markdown("### 🔻 Session Funnel")
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    stages_df = pd.DataFrame(funnel["stages"])
+                    stages_df["stage"] = stages_df["stage"].str.replace("_", " ").str.title()
+                    fig_funnel = px.funnel(stages_df, x="sessions", y="stage", title="Sessions by Stage")
+                    st.plotly_chart(fig_funnel, use_container_width=True)
+
+                with col2:
+                    durations_df = pd.DataFrame([
+                        {"Interval": name.replace("_", " ").capitalize(), "Sessions": summary["count"],
+                         "Mean (s)": summary.get("mean_seconds"), "p50 (≤ s)": summary.get("p50_seconds"),
+                         "p90 (≤ s)": summary.get("p90_seconds")}
+                        for name, summary in funnel.get("durations", {}).items()
+                    ])
+                    st.markdown("**Time Between Stages**")
+                    st.dataframe(durations_df, use_container_width=True, hide_index=True)
+
+            # Latency percentiles recorded by the backend
+            latency = analytics_data.get("latency", {})
+            if latency:
+                st.markdown("### ⏱️ Latency")
+                groups = {"endpoint": "API Endpoints", "step": "Workflow Steps", "agent": "Agents", "llm": "LLM Calls"}
+                tabs = st.tabs([groups.get(group, group) for group in latency])
+                for tab, (group, histograms) in zip(tabs, latency.items()):
+                    with tab:
+                        latency_df = pd.DataFrame([
+                            {"Name": name, "Count": summary["count"], "p50": summary["p50_ms"],
+                             "p90": summary["p90_ms"], "p99": summary["p99_ms"], "Max": summary["max_ms"]}
+                            for name, summary in histograms.items()
+                        ])
+                        fig_latency = px.bar(
+                            latency_df.melt(id_vars=["Name"], value_vars=["p50", "p90", "p99", "Max"],
+                                            var_name="Percentile", value_name="Latency (ms)"),
+                            x="Name", y="Latency (ms)", color="Percentile", barmode="group",
+                            title=f"{groups.get(group, group)} Latency"
+                        )
+                        st.plotly_chart(fig_latency, use_container_width=True)
+                        st.dataframe(latency_df, use_container_width=True, hide_index=True)
+
             # User engagement metrics
             st.markdown("### 👥 User Engagement")
             col1, col2 = st.columns(2)
@@ -1049,19 +1166,36 @@ def main():
     elif page == "📚 Sessions":
         st.markdown("## 📚 Session History")
         
-        try:
-            response = requests.get(f"{API_BASE_URL}/api/sessions")
-            if response.status_code == 200:
-                sessions = response.json()
-                if sessions:
-                    df = pd.DataFrame(sessions)
-                    st.dataframe(df, use_container_width=True)
-                else:
-                    st.info("No sessions found.")
-            else:
-                st.error("Failed to fetch sessions.")
-        except Exception as e:
-            st.error(f"Error fetching sessions: {str(e)}")
+        col1, col2 = st.columns(2)
+        with col1:
+            plan_filter = st.selectbox("Show", ["All sessions", "With hiring plan", "Without hiring plan"])
+        with col2:
+            status_filter = st.selectbox("Status", ["All statuses"] + SESSION_STATUSES)
+        params = {}
+        if plan_filter != "All sessions":
+            params["has_hiring_plan"] = plan_filter == "With hiring plan"
+        if status_filter != "All statuses":
+            params["status"] = status_filter
+        
+        if st.session_state.get("sessions_params") != params:
+            reset_sessions_list(params)
+        if not st.session_state.sessions_loaded:
+            load_sessions_page()
+        
+        sessions = st.session_state.sessions_list
+        if sessions:
+            st.caption(f"Showing {len(sessions)} sessions" + (" (more available)" if st.session_state.sessions_cursor else ""))
+            df = pd.DataFrame(sessions)
+            st.dataframe(df, use_container_width=True)
+        elif st.session_state.sessions_loaded:
+            st.info("No sessions found.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.session_state.sessions_cursor:
+                st.button("Load more", on_click=load_sessions_page)
+        with col2:
+            st.button("Refresh", on_click=reset_sessions_list, args=(params,))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """The API module, storing its data under a temporary directory"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp("server"))
+        patch.setenv("OPENAI_API_KEY", "test")
+        patch.setenv("SESSION_BACKEND", "json")
+        import server as server_module
+
+        async def chat_response(message, session_context, session_id):
+            return f"ack: {message}"
+
+        patch.setattr(server_module.hiring_orchestrator, "chat_response", chat_response)
+        yield server_module
+
+@pytest.fixture(scope="session")
+def client(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def plan_session(client) -> str:
+    """A new session with a generated hiring plan"""
+    response = client.post("/api/generate_hiring_plan", json={"user_input": "Hire a founding engineer"})
+    assert response.status_code == 200
+    return response.json()["session_id"]
@@ -0,0 +1,34 @@
+from utils.analytics import AnalyticsTracker
+
+def test_dashboard_is_served_from_the_rollups(tmp_path, monkeypatch):
+    tracker = AnalyticsTracker(storage_dir=str(tmp_path))
+    try:
+        for i in range(3):
+            tracker.track_session_created(f"s{i}")
+        tracker.track_chat_interaction("s0")
+        tracker.flush()
+
+        def column_scan(*args, **kwargs):
+            raise AssertionError("the dashboard must not scan the event columns")
+
+        monkeypatch.setattr(tracker.columns, "window_counts", column_scan)
+        monkeypatch.setattr(tracker.columns, "hourly_histogram", column_scan)
+        analytics = tracker.get_analytics()
+
+        assert analytics["recent_activity"]["sessions_24h"] == 3
+        assert analytics["recent_activity"]["chats_7d"] == 1
+        assert sum(peak["sessions"] for peak in analytics["usage_patterns"]["peak_hours"]) == 3
+    finally:
+        tracker.close()
+
+def test_query_windows_and_hour_of_day_come_from_the_columns(tmp_path):
+    tracker = AnalyticsTracker(storage_dir=str(tmp_path))
+    try:
+        for i in range(2):
+            tracker.track_session_created(f"s{i}")
+        result = tracker.query(event_type="session_created", hour_of_day=True, windows=True)
+        assert result["count"] == 2
+        assert result["windows"] == {"24h": 2, "7d": 2, "30d": 2}
+        assert sum(result["hour_of_day"]) == 2
+    finally:
+        tracker.close()
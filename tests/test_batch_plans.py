@@ -0,0 +1,34 @@
+import json
+
+def test_batch_streams_ndjson(client, server, monkeypatch):
+    generate = server.hiring_orchestrator.generate_hiring_plan
+
+    async def flaky(user_input, company_context, session_id):
+        if user_input.startswith("fail"):
+            raise RuntimeError("generation failed")
+        return await generate(user_input, company_context, session_id)
+
+    monkeypatch.setattr(server.hiring_orchestrator, "generate_hiring_plan", flaky)
+    requests = [{"user_input": f"Hire engineer {i}"} for i in range(5)] + [{"user_input": "fail please"}]
+    response = client.post("/api/generate_hiring_plans:batch", json={"requests": requests, "concurrency": 2})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["index"] for row in rows) == list(range(6))
+
+    by_index = {row["index"]: row for row in rows}
+    for i in range(5):
+        assert by_index[i]["status"] == "completed"
+        assert by_index[i]["plan"]["session_id"] == by_index[i]["session_id"]
+    failed = by_index[5]
+    assert failed["status"] == "failed"
+    assert "generation failed" in failed["error"]
+    # The failed row names the session created for it
+    assert client.get(f"/api/sessions/{failed['session_id']}").status_code == 200
+
+def test_batch_validates_size(client):
+    assert client.post("/api/generate_hiring_plans:batch", json={"requests": []}).status_code == 422
+    response = client.post("/api/generate_hiring_plans:batch",
+                           json={"requests": [{"user_input": "x"}], "concurrency": 0})
+    assert response.status_code == 422
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from utils.blob_store import BlobStore
+from utils.memory_manager import MemoryManager
+
+def make_plan(role: str) -> dict:
+    return {
+        "role": role,
+        "interview_process": {"stages": [{"name": f"Stage {i}", "questions": ["q" * 40] * 3} for i in range(3)]},
+        "hiring_checklist": {"steps": [f"{role} step {i}: " + "x" * 40 for i in range(5)]},
+    }
+
+def new_session(session_id: str, plan=None) -> dict:
+    return {"id": session_id, "created_at": "2026-01-01T00:00:00", "status": "active",
+            "messages": [], "hiring_plan": plan}
+
+def blob_count(storage_dir) -> int:
+    return sum(len(files) for _, _, files in os.walk(os.path.join(storage_dir, "blobs")))
+
+def test_reads_do_not_share_plan_sections(tmp_path):
+    manager = MemoryManager(storage_dir=str(tmp_path), backend="json")
+    try:
+        for session_id in ("a", "b"):
+            manager.create_session(session_id, new_session(session_id))
+            manager.update_session_plan(session_id, make_plan("engineer"))
+
+        plan = manager.get_session("a")["hiring_plan"]
+        plan["interview_process"]["stages"].clear()
+        manager.get_session("a", fields=["plan.hiring_checklist"])["hiring_plan"]["hiring_checklist"]["steps"].clear()
+
+        for session_id in ("a", "b"):
+            stored = manager.get_session(session_id)["hiring_plan"]
+            assert len(stored["interview_process"]["stages"]) == 3
+            assert len(stored["hiring_checklist"]["steps"]) == 5
+    finally:
+        manager.close()
+
+@pytest.mark.parametrize("backend", sorted(MemoryManager.BACKENDS))
+def test_sweep_deletes_only_unreferenced_blobs(tmp_path, backend):
+    storage_dir = str(tmp_path)
+    manager = MemoryManager(storage_dir=storage_dir, backend=backend)
+    for session_id in ("kept", "replaced", "deleted", "archived"):
+        manager.create_session(session_id, new_session(session_id))
+        manager.update_session_plan(session_id, make_plan(session_id))
+    manager.update_session_plan("replaced", make_plan("replacement"))
+    manager.delete_session("deleted")
+    assert manager.archive_idle_sessions(idle_for=-1) == 3
+    manager.get_session("kept")  # restored to the hot store
+    before = blob_count(storage_dir)
+
+    # Stale: the first "replaced" plan and the "deleted" plan
+    assert manager.sweep_blobs() > 0
+    assert blob_count(storage_dir) < before
+    assert manager.sweep_blobs() == 0
+    manager.close()
+
+    reopened = MemoryManager(storage_dir=storage_dir, backend=backend)
+    try:
+        for session_id, role in (("kept", "kept"), ("replaced", "replacement"), ("archived", "archived")):
+            assert reopened.get_session(session_id)["hiring_plan"] == make_plan(role)
+    finally:
+        reopened.close()
+
+def test_blobs_stored_during_a_sweep_survive_it(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    blobs.begin_sweep()
+    packed = blobs.pack(make_plan("engineer"))
+    assert blobs.sweep([]) == 0
+    assert blobs.unpack(packed) == make_plan("engineer")
+
+    blobs.begin_sweep()
+    assert blobs.sweep([]) > 0
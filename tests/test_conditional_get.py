@@ -0,0 +1,69 @@
+from utils.response_cache import accepts_gzip
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate")
+    assert accepts_gzip("*")
+    assert accepts_gzip("gzip;q=1, *;q=0")
+    assert not accepts_gzip(None)
+    assert not accepts_gzip("br")
+    assert not accepts_gzip("gzip;q=0, *")
+
+def test_session_etag_and_not_modified(client, plan_session):
+    first = client.get(f"/api/sessions/{plan_session}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get(f"/api/sessions/{plan_session}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    # The strong form of the same tag matches too
+    strong = client.get(f"/api/sessions/{plan_session}", headers={"If-None-Match": etag[2:]})
+    assert strong.status_code == 304
+
+def test_session_etag_changes_after_a_write(client, plan_session):
+    etag = client.get(f"/api/sessions/{plan_session}").headers["etag"]
+    assert client.post("/api/chat", json={"session_id": plan_session, "message": "hi"}).status_code == 200
+
+    response = client.get(f"/api/sessions/{plan_session}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["messages"][-1]["user_message"] == "hi"
+
+def test_session_fields_have_their_own_etag(client, plan_session):
+    full = client.get(f"/api/sessions/{plan_session}")
+    projected = client.get(f"/api/sessions/{plan_session}", params={"fields": "status"},
+                           headers={"If-None-Match": full.headers["etag"]})
+    assert projected.status_code == 200
+    assert projected.headers["etag"] != full.headers["etag"]
+
+def test_session_gzip(client, plan_session):
+    response = client.get(f"/api/sessions/{plan_session}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["id"] == plan_session
+
+    plain = client.get(f"/api/sessions/{plan_session}", headers={"Accept-Encoding": "gzip;q=0, *"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content.startswith(b"{")
+    assert plain.json() == response.json()
+
+def test_session_etag_describes_the_body_sent(client, server, plan_session, monkeypatch):
+    get_session = server.memory_manager.get_session
+    raced = []
+
+    def get_session_with_racing_write(session_id, **options):
+        # A chat lands between the version check and the body read
+        if options.get("fields") is None and not raced:
+            raced.append(server.memory_manager.add_chat_message(session_id, "raced", "reply"))
+        return get_session(session_id, **options)
+
+    monkeypatch.setattr(server.memory_manager, "get_session", get_session_with_racing_write)
+    response = client.get(f"/api/sessions/{plan_session}")
+    monkeypatch.undo()
+
+    assert raced == [True]
+    assert response.json()["messages"][-1]["user_message"] == "raced"
+    again = client.get(f"/api/sessions/{plan_session}", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
@@ -0,0 +1,34 @@
+import time
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from utils.event_columns import ColumnarEventStore
+
+@pytest.fixture
+def new_york(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_hourly_histogram_uses_each_events_offset(tmp_path, new_york):
+    # Hourly events, stamped like the tracker stamps them, from a week before to a week after the March DST change
+    start = datetime(2026, 3, 1, 0, 30).timestamp()
+    timestamps = [datetime.fromtimestamp(start + i * 3600).isoformat() for i in range(14 * 24)]
+    store = ColumnarEventStore(str(tmp_path))
+    store.append({"event_type": "session_created", "timestamp": ts} for ts in timestamps)
+
+    expected = Counter(datetime.fromisoformat(ts).hour for ts in timestamps)
+    assert store.hourly_histogram("session_created") == [expected[hour] for hour in range(24)]
+
+def test_window_counts(tmp_path):
+    now = time.time()
+    store = ColumnarEventStore(str(tmp_path))
+    store.append({"event_type": "chat_message", "timestamp": datetime.fromtimestamp(now - age).isoformat()}
+                 for age in (40 * 86400, 20 * 86400, 3 * 86400, 3600, 60))
+    assert store.window_counts("chat_message", {"24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}, now) == \
+        {"24h": 2, "7d": 3, "30d": 4}
+    assert store.window_counts("error", {"24h": 86400}, now) == {"24h": 0}
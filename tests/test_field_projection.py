@@ -0,0 +1,53 @@
+import pytest
+
+from utils.field_projection import parse_fields, project
+from utils.memory_manager import MemoryManager
+
+def test_parse_fields_builds_a_tree_with_aliases():
+    tree = parse_fields(["status", "plan.compensation_packages", "plan.job_descriptions.title"],
+                        aliases={"plan": "hiring_plan"})
+    assert tree == {"status": True,
+                    "hiring_plan": {"compensation_packages": True, "job_descriptions": {"title": True}}}
+
+def test_whole_value_wins_over_deeper_paths():
+    assert parse_fields(["plan", "plan.compensation_packages"]) == {"plan": True}
+    assert parse_fields(["plan.compensation_packages", "plan"]) == {"plan": True}
+
+def test_project_lists_item_by_item():
+    session = {"id": "s", "messages": [{"user_message": "a", "ai_response": "b"}]}
+    assert project(session, parse_fields(["messages.user_message", "missing"])) == \
+        {"messages": [{"user_message": "a"}]}
+
+def test_session_fields(client, plan_session):
+    response = client.get(f"/api/sessions/{plan_session}",
+                          params={"fields": "status,plan.compensation_packages"})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"status", "hiring_plan"}
+    assert set(body["hiring_plan"]) == {"compensation_packages"}
+
+    metadata = client.get(f"/api/sessions/{plan_session}", params={"fields": "status,message_count"}).json()
+    assert metadata == {"status": "active", "message_count": 0}
+
+def test_session_list_fields(client, plan_session):
+    sessions = client.get("/api/sessions", params={"fields": "session_id,has_hiring_plan"}).json()
+    assert sessions
+    assert all(set(summary) == {"session_id", "has_hiring_plan"} for summary in sessions)
+
+@pytest.mark.parametrize("backend", sorted(MemoryManager.BACKENDS))
+def test_store_reads_only_selected_fields(tmp_path, backend):
+    manager = MemoryManager(storage_dir=str(tmp_path / "data"), backend=backend)
+    manager.create_session("s", {"id": "s", "created_at": "2026-01-01T00:00:00", "status": "active",
+                                 "messages": [], "hiring_plan": None})
+    manager.update_session_plan("s", {"compensation_packages": {"base": 1}, "hiring_checklist": {"steps": []}})
+    manager.add_chat_message("s", "hello", "hi")
+    manager.close()
+
+    reopened = MemoryManager(storage_dir=str(tmp_path / "data"), backend=backend)
+    try:
+        assert reopened.get_session("s", fields=["status", "message_count"]) == \
+            {"status": "active", "message_count": 1}
+        assert reopened.get_session("s", fields=["plan.compensation_packages"]) == \
+            {"hiring_plan": {"compensation_packages": {"base": 1}}}
+    finally:
+        reopened.close()
@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.memory_manager import MemoryManager
+
+BACKENDS = sorted(MemoryManager.BACKENDS)
+SESSIONS = 4
+WRITES = 200
+
+def new_session(session_id: str) -> dict:
+    return {"id": session_id, "created_at": "2026-01-01T00:00:00", "status": "active",
+            "messages": [], "hiring_plan": None}
+
+def expected_messages(session_index: int) -> set:
+    return {f"message-{i}" for i in range(WRITES) if i % SESSIONS == session_index}
+
+def assert_no_lost_writes(storage_dir: str, backend: str, session_ids: list):
+    """Check every message against a freshly opened store, bypassing the cache"""
+    reopened = MemoryManager(storage_dir=storage_dir, backend=backend)
+    try:
+        for n, session_id in enumerate(session_ids):
+            stored = [message["user_message"] for message in reopened.get_messages(session_id)[0]]
+            assert len(stored) == len(set(stored)), f"duplicate messages in {session_id}"
+            assert set(stored) == expected_messages(n)
+            assert reopened.get_session(session_id)["message_count"] == len(stored)
+    finally:
+        reopened.close()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_concurrent_add_message_from_threads_loses_no_writes(tmp_path, backend):
+    storage_dir = str(tmp_path / "data")
+    manager = MemoryManager(storage_dir=storage_dir, backend=backend)
+    session_ids = [f"session-{n}" for n in range(SESSIONS)]
+    for session_id in session_ids:
+        assert manager.create_session(session_id, new_session(session_id))
+
+    def write(i: int) -> bool:
+        return manager.add_chat_message(session_ids[i % SESSIONS], f"message-{i}", f"reply-{i}")
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        assert all(pool.map(write, range(WRITES)))
+    manager.close()
+
+    assert_no_lost_writes(storage_dir, backend, session_ids)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_concurrent_add_message_from_coroutines_loses_no_writes(tmp_path, backend):
+    storage_dir = str(tmp_path / "data")
+    manager = MemoryManager(storage_dir=storage_dir, backend=backend)
+    session_ids = [f"session-{n}" for n in range(SESSIONS)]
+
+    async def run():
+        await asyncio.gather(*(manager.acreate_session(sid, new_session(sid)) for sid in session_ids))
+        return await asyncio.gather(*(
+            manager.aadd_chat_message(session_ids[i % SESSIONS], f"message-{i}", f"reply-{i}")
+            for i in range(WRITES)
+        ))
+
+    assert all(asyncio.run(run()))
+    manager.close()
+
+    assert_no_lost_writes(storage_dir, backend, session_ids)
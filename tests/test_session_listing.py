@@ -0,0 +1,49 @@
+import pytest
+
+from utils.memory_manager import MemoryManager
+from utils.session_index import SessionIndex, decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2026-01-01T00:00:00", "abc")) == ("2026-01-01T00:00:00", "abc")
+    assert decode_cursor(encode_cursor(None, "abc")) == ("", "abc")
+    assert decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor("garbage")
+
+def test_index_list_with_zero_limit(tmp_path):
+    index = SessionIndex(str(tmp_path))
+    index.put({"session_id": "s", "created_at": "2026-01-01T00:00:00", "status": "active"})
+    assert index.list(limit=0) == ([], None)
+    assert [summary["session_id"] for summary in index.list(limit=1)[0]] == ["s"]
+
+@pytest.mark.parametrize("backend", sorted(MemoryManager.BACKENDS))
+def test_list_sessions_page(tmp_path, backend):
+    manager = MemoryManager(storage_dir=str(tmp_path / "data"), backend=backend)
+    try:
+        for i in range(5):
+            manager.create_session(f"s{i}", {"id": f"s{i}", "created_at": f"2026-01-01T00:00:0{i}",
+                                             "status": "active", "messages": [], "hiring_plan": None})
+        assert manager.list_sessions_page(limit=0) == ([], None)
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = manager.list_sessions_page(limit=2, cursor=cursor)
+            seen.extend(summary["session_id"] for summary in page)
+            if not cursor:
+                break
+        assert seen == ["s4", "s3", "s2", "s1", "s0"]
+    finally:
+        manager.close()
+
+def test_list_sessions_follows_next_cursor(client, plan_session):
+    client.post("/api/sessions")
+    first = client.get("/api/sessions", params={"limit": 1})
+    assert first.status_code == 200
+    cursor = first.headers["x-next-cursor"]
+    second = client.get("/api/sessions", params={"limit": 1, "cursor": cursor})
+    assert second.status_code == 200
+    assert second.json()[0]["session_id"] != first.json()[0]["session_id"]
+
+@pytest.mark.parametrize("cursor", ["garbage", "a|b|c", "2026-01-01|"])
+def test_list_sessions_rejects_malformed_cursor(client, cursor):
+    assert client.get("/api/sessions", params={"cursor": cursor}).status_code == 422
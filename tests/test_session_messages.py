@@ -0,0 +1,19 @@
+import pytest
+
+def test_session_message_pages(client, plan_session):
+    for i in range(3):
+        assert client.post("/api/chat", json={"session_id": plan_session, "message": f"m{i}"}).status_code == 200
+    first = client.get(f"/api/sessions/{plan_session}", params={"limit": 2}).json()
+    assert [m["user_message"] for m in first["messages"]] == ["m1", "m2"]
+    older = client.get(f"/api/sessions/{plan_session}",
+                       params={"limit": 2, "cursor": first["next_message_cursor"]}).json()
+    assert [m["user_message"] for m in older["messages"]] == ["m0"]
+    assert older["next_message_cursor"] is None
+
+@pytest.mark.parametrize("cursor", ["abc", "-1", "1.5"])
+def test_session_rejects_malformed_message_cursor(client, plan_session, cursor):
+    response = client.get(f"/api/sessions/{plan_session}", params={"cursor": cursor})
+    assert response.status_code == 422
+
+def test_unknown_session_is_404(client):
+    assert client.get("/api/sessions/missing").status_code == 404
@@ -0,0 +1,18 @@
+from utils.session_stores import ShardedSessionStore
+
+def test_sharded_get_messages_does_not_read_the_shard(tmp_path, monkeypatch):
+    store = ShardedSessionStore(str(tmp_path))
+    store.create("s", {"id": "s", "created_at": "2026-01-01T00:00:00", "status": "active",
+                       "messages": [], "hiring_plan": {"job_descriptions": ["x" * 1000]}})
+    for i in range(3):
+        assert store.add_message("s", {"timestamp": f"2026-01-01T00:00:0{i}", "user_message": f"m{i}"},
+                                 f"2026-01-01T00:00:0{i}")
+
+    def read_shard(session_id):
+        raise AssertionError("message reads must not parse the shard")
+
+    monkeypatch.setattr(store, "_read_shard", read_shard)
+    messages, cursor = store.get_messages("s", limit=2)
+    assert [m["user_message"] for m in messages] == ["m1", "m2"]
+    assert cursor == "1"
+    assert store.get_messages("missing") == ([], None)
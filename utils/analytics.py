@@ -1,29 +1,86 @@
+import hashlib
 import json
 import os
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from collections import defaultdict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from collections import deque
+
+from utils.analytics_rollups import DAY, FUNNEL_STAGES, AnalyticsRollups
+from utils.error_fingerprints import fingerprint_error
+from utils.event_columns import ColumnarEventStore
 
 class AnalyticsTracker:
-    def __init__(self, storage_dir: str = "data"):
+    """Usage analytics with buffered, append-only persistence.
+
+    ``track_*`` calls only append to an in-memory ring buffer. A background
+    thread flushes the buffer to ``analytics_events.ndjson`` once
+    ``flush_size`` events are pending or every ``flush_interval`` seconds,
+    and ``close()`` flushes whatever is left. If the buffer fills faster
+    than it is flushed the oldest pending events are dropped and counted.
+
+    Flushed events are folded into ``AnalyticsRollups``, which answer
+    ``get_analytics`` without scanning events. The rollups are snapshotted
+    to ``analytics_rollups.json`` together with the event-log offset they
+    cover, so startup only replays the log tail. ``analytics.json`` from
+    older versions is imported once.
+
+    Events are also appended to a ``ColumnarEventStore`` under
+    ``analytics_columns/`` for ad-hoc queries over the full history.
+
+    ``get_analytics_document`` serves a cached, serialized copy of the
+    analytics document with an ETag. Tracking an event marks it stale, and a
+    stale document is rebuilt once it is ``cache_ttl`` seconds old; an
+    unchanged one is rebuilt after ``cache_max_age`` seconds so time windows
+    and registered sections keep moving.
+    """
+
+    def __init__(self, storage_dir: str = "data", buffer_size: int = 10000, flush_size: int = 256,
+                 flush_interval: float = 1.0, snapshot_interval: float = 60.0, cache_ttl: float = 2.0,
+                 cache_max_age: float = 60.0):
         self.storage_dir = storage_dir
         self.analytics_file = os.path.join(storage_dir, "analytics.json")
+        self.events_file = os.path.join(storage_dir, "analytics_events.ndjson")
+        self.rollups_file = os.path.join(storage_dir, "analytics_rollups.json")
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.cache_ttl = cache_ttl
+        self.cache_max_age = cache_max_age
         self.ensure_storage_dir()
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+        self._skipped_offsets = set()
+        self._event_seq = 0
+
+        self._sections: Dict[str, Callable[[], Dict]] = {}
+        self._document: Optional[Tuple[bytes, str]] = None
+        self._document_seq = -1
+        self._document_built = 0.0
+        self._document_lock = threading.Lock()
+        self.document_hits = 0
+        self.document_builds = 0
+
+        self._events_log = self._open_events_log()
+        self.rollups = self._load_rollups()
+        self.columns = self._load_columns()
+        self._last_snapshot = time.monotonic()
+        self._flush_requested = threading.Event()
+        self._stopping = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="analytics-flusher", daemon=True)
+        self._flusher.start()
     
     def ensure_storage_dir(self):
         """Ensure storage directory exists"""
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
-        
-        # Initialize analytics file if it doesn't exist
-        if not os.path.exists(self.analytics_file):
-            with open(self.analytics_file, 'w') as f:
-                json.dump({
-                    "sessions": [],
-                    "plan_generations": [],
-                    "chat_interactions": [],
-                    "errors": []
-                }, f)
     
     def track_session_created(self, session_id: str):
         """Track when a new session is created"""
@@ -59,72 +116,56 @@ class AnalyticsTracker:
         })
     
     def track_error(self, session_id: Optional[str], error_message: str):
-        """Track errors for debugging"""
+        """Track errors for debugging, fingerprinted so repeats of one failure aggregate together"""
         self._add_event("errors", {
             "session_id": session_id,
             "timestamp": datetime.now().isoformat(),
             "event_type": "error",
+            "fingerprint": fingerprint_error(error_message)[0],
             "error_message": error_message[:500]  # Truncate for storage
         })
     
     def get_analytics(self) -> Dict:
         """Get comprehensive analytics data"""
         try:
-            data = self._load_analytics()
-            
-            # Calculate metrics
-            now = datetime.now()
-            last_24h = now - timedelta(hours=24)
-            last_7d = now - timedelta(days=7)
-            last_30d = now - timedelta(days=30)
-            
-            def filter_by_time(events, time_threshold):
-                return [
-                    event for event in events
-                    if datetime.fromisoformat(event["timestamp"]) >= time_threshold
-                ]
-            
-            sessions_24h = filter_by_time(data["sessions"], last_24h)
-            sessions_7d = filter_by_time(data["sessions"], last_7d)
-            sessions_30d = filter_by_time(data["sessions"], last_30d)
-            
-            plans_24h = filter_by_time(data["plan_generations"], last_24h)
-            plans_7d = filter_by_time(data["plan_generations"], last_7d)
-            plans_30d = filter_by_time(data["plan_generations"], last_30d)
-            
-            chats_24h = filter_by_time(data["chat_interactions"], last_24h)
-            chats_7d = filter_by_time(data["chat_interactions"], last_7d)
-            chats_30d = filter_by_time(data["chat_interactions"], last_30d)
-            
-            errors_24h = filter_by_time(data["errors"], last_24h)
-            errors_7d = filter_by_time(data["errors"], last_7d)
-            
-            return {
-                "overview": {
-                    "total_sessions": len(data["sessions"]),
-                    "total_plans_generated": len([e for e in data["plan_generations"] if e["event_type"] == "plan_generation_completed"]),
-                    "total_chat_interactions": len(data["chat_interactions"]),
-                    "total_errors": len(data["errors"])
-                },
-                "recent_activity": {
-                    "sessions_24h": len(sessions_24h),
-                    "sessions_7d": len(sessions_7d),
-                    "sessions_30d": len(sessions_30d),
-                    "plans_24h": len([e for e in plans_24h if e["event_type"] == "plan_generation_completed"]),
-                    "plans_7d": len([e for e in plans_7d if e["event_type"] == "plan_generation_completed"]),
-                    "plans_30d": len([e for e in plans_30d if e["event_type"] == "plan_generation_completed"]),
-                    "chats_24h": len(chats_24h),
-                    "chats_7d": len(chats_7d),
-                    "chats_30d": len(chats_30d)
-                },
-                "error_analysis": {
-                    "errors_24h": len(errors_24h),
-                    "errors_7d": len(errors_7d),
-                    "recent_errors": errors_7d[-5:] if errors_7d else []  # Last 5 errors
-                },
-                "usage_patterns": self._analyze_usage_patterns(data),
-                "performance_metrics": self._calculate_performance_metrics(data)
-            }
+            # Fold in anything still buffered so counts include this request's events
+            self.flush()
+            now = time.time()
+            last_7d = (datetime.now() - timedelta(days=7)).isoformat()
+
+            with self._flush_lock:
+                count = self.rollups.count
+                recent_errors = [e for e in self.rollups.recent_errors if e["timestamp"] >= last_7d]
+
+                return {
+                    "overview": {
+                        "total_sessions": count("session_created"),
+                        "total_plans_generated": count("plan_generation_completed"),
+                        "total_chat_interactions": count("chat_message"),
+                        "total_errors": count("error")
+                    },
+                    "recent_activity": {
+                        "sessions_24h": count("session_created", DAY, now),
+                        "sessions_7d": count("session_created", 7 * DAY, now),
+                        "sessions_30d": count("session_created", 30 * DAY, now),
+                        "plans_24h": count("plan_generation_completed", DAY, now),
+                        "plans_7d": count("plan_generation_completed", 7 * DAY, now),
+                        "plans_30d": count("plan_generation_completed", 30 * DAY, now),
+                        "chats_24h": count("chat_message", DAY, now),
+                        "chats_7d": count("chat_message", 7 * DAY, now),
+                        "chats_30d": count("chat_message", 30 * DAY, now)
+                    },
+                    "error_analysis": {
+                        "errors_24h": count("error", DAY, now),
+                        "errors_7d": count("error", 7 * DAY, now),
+                        "recent_errors": recent_errors[-5:],  # Last 5 errors
+                        "distinct_errors": len(self.rollups.errors.fingerprints),
+                        "top_fingerprints": self.rollups.errors.top(limit=10, now=now)
+                    },
+                    "usage_patterns": self._analyze_usage_patterns(),
+                    "performance_metrics": self._calculate_performance_metrics(),
+                    "funnel": self._analyze_funnel()
+                }
             
         except Exception as e:
             return {
@@ -132,69 +173,258 @@ class AnalyticsTracker:
                 "overview": {"total_sessions": 0, "total_plans_generated": 0}
             }
     
-    def _analyze_usage_patterns(self, data: Dict) -> Dict:
-        """Analyze usage patterns from the data"""
-        
-        # Analyze hourly usage
-        hourly_usage = defaultdict(int)
-        for event in data["sessions"]:
-            try:
-                hour = datetime.fromisoformat(event["timestamp"]).hour
-                hourly_usage[hour] += 1
-            except:
-                continue
+    def register_section(self, name: str, provider: Callable[[], Dict]):
+        """Add a top-level section to the cached analytics document, computed when it is rebuilt"""
+        self._sections[name] = provider
+
+    def get_analytics_document(self) -> Tuple[bytes, str]:
+        """Serialized analytics document and its ETag, rebuilt only when stale"""
+        with self._document_lock:
+            age = time.monotonic() - self._document_built
+            stale = self._event_seq != self._document_seq
+            if self._document is not None and age < self.cache_max_age and (not stale or age < self.cache_ttl):
+                self.document_hits += 1
+                return self._document
+
+            seq = self._event_seq
+            analytics = self.get_analytics()
+            for name, provider in self._sections.items():
+                try:
+                    analytics[name] = provider()
+                except Exception as e:
+                    print(f"Error building analytics section {name}: {e}")
+            body = json.dumps(analytics).encode("utf-8")
+            etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+            self._document = (body, etag)
+            self._document_seq = seq
+            self._document_built = time.monotonic()
+            self.document_builds += 1
+            return self._document
+
+    def _analyze_usage_patterns(self) -> Dict:
+        """Analyze usage patterns from the rollups"""
         
         # Find peak hours
-        peak_hours = sorted(hourly_usage.items(), key=lambda x: x[1], reverse=True)[:3]
-        
-        # Analyze session duration (approximate based on chat interactions)
-        session_interactions = defaultdict(int)
-        for event in data["chat_interactions"]:
-            session_interactions[event["session_id"]] += 1
+        hourly_usage = self.rollups.hour_of_day.get("session_created", [0] * 24)
+        peak_hours = sorted(
+            ((hour, count) for hour, count in enumerate(hourly_usage) if count),
+            key=lambda x: x[1], reverse=True
+        )[:3]
         
+        # Chat engagement among sessions that chatted at all
+        chatting_sessions = self.rollups.chatting_sessions
         avg_interactions_per_session = (
-            sum(session_interactions.values()) / len(session_interactions)
-            if session_interactions else 0
+            self.rollups.session_chats / chatting_sessions if chatting_sessions else 0
         )
         
         return {
             "peak_hours": [{"hour": h, "sessions": c} for h, c in peak_hours],
             "avg_interactions_per_session": round(avg_interactions_per_session, 2),
-            "active_sessions": len(session_interactions)
+            "active_sessions": chatting_sessions
+        }
+
+    def _analyze_funnel(self) -> Dict:
+        """Sessions reaching each stage, stage-to-stage conversion and the durations between stages"""
+        funnel = self.rollups.funnel
+        conversion = {}
+        for previous, stage in zip(FUNNEL_STAGES, FUNNEL_STAGES[1:]):
+            conversion[f"{previous}_to_{stage}"] = (
+                round(funnel[stage] / funnel[previous] * 100, 2) if funnel[previous] else 0
+            )
+        return {
+            "stages": [{"stage": stage, "sessions": funnel[stage]} for stage in FUNNEL_STAGES],
+            "conversion": conversion,
+            "durations": {name: histogram.summary() for name, histogram in self.rollups.durations.items()}
         }
     
-    def _calculate_performance_metrics(self, data: Dict) -> Dict:
+    def _calculate_performance_metrics(self) -> Dict:
         """Calculate performance and success metrics"""
+        count = self.rollups.count
         
         # Calculate plan generation success rate
-        started = len([e for e in data["plan_generations"] if e["event_type"] == "plan_generation_started"])
-        completed = len([e for e in data["plan_generations"] if e["event_type"] == "plan_generation_completed"])
+        started = count("plan_generation_started")
+        completed = count("plan_generation_completed")
         
         success_rate = (completed / started * 100) if started > 0 else 0
         
         # Calculate error rate
-        total_events = len(data["sessions"]) + len(data["plan_generations"]) + len(data["chat_interactions"])
-        error_rate = (len(data["errors"]) / total_events * 100) if total_events > 0 else 0
+        total_events = count("session_created") + started + completed + count("chat_message")
+        error_rate = (count("error") / total_events * 100) if total_events > 0 else 0
         
         return {
             "plan_generation_success_rate": round(success_rate, 2),
             "error_rate": round(error_rate, 2),
             "total_events_processed": total_events
         }
-    
+
+    def flush(self):
+        """Write all buffered events to the event log and fold them into the rollups"""
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._buffer)
+                self._buffer.clear()
+            if events:
+                try:
+                    self._events_log.write("".join(
+                        json.dumps(dict(event_data, type=event_type)) + "\n" for event_type, event_data in events
+                    ))
+                    self._events_log.flush()
+                    for _, event_data in events:
+                        self.rollups.add(event_data)
+                    self.columns.append((event_data for _, event_data in events), self._events_log.tell())
+                    self.flushed += len(events)
+                    self.flushes += 1
+                except Exception as e:
+                    print(f"Error flushing analytics events: {e}")
+            if time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+                self._save_rollups()
+
+    def query(self, event_type: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+              session_id: Optional[str] = None, bucket: Optional[str] = None, top_sessions: int = 0,
+              hour_of_day: bool = False, windows: bool = False) -> Dict:
+        """Ad-hoc count over the full event history, optionally bucketed, by hour of day, over
+        trailing 24h/7d/30d windows or grouped by session"""
+        self.flush()
+        since_epoch = datetime.fromisoformat(since).timestamp() if since else None
+        until_epoch = datetime.fromisoformat(until).timestamp() if until else None
+        result = {
+            "event_type": event_type,
+            "since": since,
+            "until": until,
+            "session_id": session_id,
+            "count": self.columns.count(event_type, since_epoch, until_epoch, session_id)
+        }
+        if bucket:
+            result["series"] = self.columns.series(event_type, since_epoch, until_epoch, session_id, bucket)
+        if hour_of_day and event_type:
+            result["hour_of_day"] = self.columns.hourly_histogram(event_type, since_epoch)
+        if windows and event_type:
+            result["windows"] = self.columns.window_counts(event_type, {"24h": DAY, "7d": 7 * DAY, "30d": 30 * DAY})
+        if top_sessions and event_type:
+            result["top_sessions"] = self.columns.session_counts(event_type, top=top_sessions)
+        return result
+
+    def stats(self) -> Dict:
+        """Event pipeline counters"""
+        return {
+            "buffered": len(self._buffer),
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "skipped_lines": len(self._skipped_offsets),
+            "columns": self.columns.stats(),
+            "document_cache": {"hits": self.document_hits, "builds": self.document_builds}
+        }
+
+    def close(self):
+        """Stop the flusher, write out buffered events and snapshot the rollups"""
+        self._stopping = True
+        self._flush_requested.set()
+        self._flusher.join()
+        self.flush()
+        with self._flush_lock:
+            self._save_rollups()
+            self._events_log.close()
+
     def _add_event(self, event_type: str, event_data: Dict):
         """Add an event to analytics"""
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append((event_type, event_data))
+            self._event_seq += 1
+            pending = len(self._buffer)
+        if pending >= self.flush_size:
+            self._flush_requested.set()
+
+    def _flush_loop(self):
+        while not self._stopping:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def _load_rollups(self) -> AnalyticsRollups:
+        """Restore the rollup snapshot and replay the event log written after it"""
+        offset = 0
         try:
-            data = self._load_analytics()
-            data[event_type].append(event_data)
-            
-            # Keep only last 1000 events per type to prevent file from growing too large
-            if len(data[event_type]) > 1000:
-                data[event_type] = data[event_type][-1000:]
-            
-            self._save_analytics(data)
+            with open(self.rollups_file, 'r') as f:
+                snapshot = json.load(f)
+            rollups = AnalyticsRollups.from_dict(snapshot["rollups"])
+            offset = snapshot["log_offset"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            rollups = AnalyticsRollups()
+            for events in self._load_analytics().values():
+                for event in events:
+                    rollups.add(event)
+
+        for event in self._read_log(offset):
+            rollups.add(event)
+        rollups.prune()
+        return rollups
+
+    def _load_columns(self) -> ColumnarEventStore:
+        """Open the columnar store and append events it hasn't seen yet"""
+        columns = ColumnarEventStore(os.path.join(self.storage_dir, "analytics_columns"))
+        if not len(columns) and not columns.log_offset:
+            legacy = self._load_analytics()
+            columns.append(sorted(
+                (event for events in legacy.values() for event in events), key=lambda e: e["timestamp"]
+            ))
+        end = os.path.getsize(self.events_file) if os.path.exists(self.events_file) else 0
+        columns.append(self._read_log(columns.log_offset), end)
+        return columns
+
+    def _open_events_log(self):
+        """Open the event log for appending, first cutting off a torn last line left by a crash"""
+        try:
+            with open(self.events_file, 'rb+') as f:
+                end = f.seek(0, os.SEEK_END)
+                keep = end
+                while keep > 0:
+                    step = min(4096, keep)
+                    f.seek(keep - step)
+                    newline = f.read(step).rfind(b"\n")
+                    if newline != -1:
+                        keep = keep - step + newline + 1
+                        break
+                    keep -= step
+                if keep != end:
+                    f.truncate(keep)
+        except FileNotFoundError:
+            pass
+        return open(self.events_file, 'a', encoding='utf-8')
+
+    def _read_log(self, offset: int) -> Iterator[Dict]:
+        """Events in the event log from a byte offset on, skipping undecodable lines"""
+        try:
+            with open(self.events_file, 'rb') as f:
+                f.seek(offset)
+                position = offset
+                for line in f:
+                    position += len(line)
+                    try:
+                        event = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        # Rollups and columns may both replay this line; count it once
+                        self._skipped_offsets.add(position)
+                        continue
+                    event.pop("type", None)
+                    yield event
+        except FileNotFoundError:
+            return
+
+    def _save_rollups(self):
+        """Snapshot the rollups with the event-log offset they cover"""
+        try:
+            snapshot = {"log_offset": self._events_log.tell(), "rollups": self.rollups.to_dict()}
+            tmp_file = f"{self.rollups_file}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_file, self.rollups_file)
+            self.rollups.prune()
+            self._last_snapshot = time.monotonic()
         except Exception as e:
-            print(f"Error adding analytics event: {e}")
+            print(f"Error saving analytics rollups: {e}")
     
     def _load_analytics(self) -> Dict:
         """Load analytics data from file"""
@@ -208,11 +438,3 @@ class AnalyticsTracker:
                 "chat_interactions": [],
                 "errors": []
             }
-    
-    def _save_analytics(self, data: Dict):
-        """Save analytics data to file"""
-        try:
-            with open(self.analytics_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving analytics: {e}")
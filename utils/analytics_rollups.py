@@ -0,0 +1,275 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.error_fingerprints import ErrorFingerprints
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Session funnel stages, in order, and the event that first reaches each one
+FUNNEL_STAGES = ["created", "plan_started", "plan_completed", "first_chat"]
+STAGE_EVENTS = {
+    "session_created": "created",
+    "plan_generation_started": "plan_started",
+    "plan_generation_completed": "plan_completed",
+    "chat_message": "first_chat",
+}
+
+class DurationHistogram:
+    """Fixed-bucket histogram of durations from a second to a month"""
+
+    BOUNDS = [1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, HOUR, 3 * HOUR, 6 * HOUR, 12 * HOUR,
+              DAY, 3 * DAY, 7 * DAY, 30 * DAY]
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        seconds = max(0.0, seconds)
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile; None past the last bound"""
+        rank = max(1, round(percentile / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.BOUNDS[index] if index < len(self.BOUNDS) else None
+        return None
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_seconds": round(self.total / self.count, 2),
+            "p50_seconds": self.percentile(50),
+            "p90_seconds": self.percentile(90),
+            "p99_seconds": self.percentile(99),
+            "buckets": [
+                {"le": bound, "count": count}
+                for bound, count in zip(self.BOUNDS + ["+Inf"], self.counts) if count
+            ]
+        }
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "count": self.count, "total": self.total}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DurationHistogram":
+        histogram = cls()
+        counts = data.get("counts", [])
+        if len(counts) == len(histogram.counts):
+            histogram.counts = list(counts)
+            histogram.count = data.get("count", 0)
+            histogram.total = data.get("total", 0.0)
+        return histogram
+
+class AnalyticsRollups:
+    """Incrementally maintained counters over the analytics event stream.
+
+    Every event bumps a per-minute, per-hour and per-day counter for its
+    ``event_type``, an all-time total and an hour-of-day histogram. Minute buckets are kept for a day and hour buckets
+    for ``hour_retention_days``; day buckets are kept forever. Window counts
+    are sums over at most a day's worth of buckets, so queries cost the same
+    however many events have been recorded.
+
+    Sessions are followed through the funnel stages (created, plan started,
+    plan completed, first chat) from their ``session_created`` event. Stage
+    counts and the durations between stages are folded into counters and
+    ``DurationHistogram``s as events arrive, so funnel conversion and
+    time-to-plan distributions are read without walking sessions. A
+    session's stage times are only kept until it has reached every stage or
+    goes quiet for longer than the hour-bucket retention; after that its
+    events still count everywhere but can no longer move it through the
+    funnel. Plan requests waiting for completion are tracked separately, so
+    plan generation time is measured for every session:
+
+    - ``time_to_plan_start``: created to first plan request
+    - ``plan_generation``: each plan request to its completion, i.e. the
+      wait users see while a plan is generated
+    - ``time_to_first_plan``: created to first completed plan
+    - ``plan_to_first_chat``: first completed plan to first chat message
+    """
+
+    DURATIONS = ["time_to_plan_start", "plan_generation", "time_to_first_plan", "plan_to_first_chat"]
+
+    RECENT_ERRORS = 20
+
+    def __init__(self, hour_retention_days: int = 31):
+        self.hour_retention = hour_retention_days * DAY
+        self.totals: Dict[str, int] = defaultdict(int)
+        self.minutes: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.hours: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.days: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.hour_of_day: Dict[str, List[int]] = defaultdict(lambda: [0] * 24)
+        self.sessions: Dict[str, Dict] = {}
+        self.pending_plans: Dict[str, str] = {}
+        self.recent_errors: deque = deque(maxlen=self.RECENT_ERRORS)
+        self.errors = ErrorFingerprints()
+        self.funnel: Dict[str, int] = {stage: 0 for stage in FUNNEL_STAGES}
+        self.durations: Dict[str, DurationHistogram] = {name: DurationHistogram() for name in self.DURATIONS}
+        self.chatting_sessions = 0
+        self.session_chats = 0
+
+    def add(self, event: Dict):
+        """Fold one event into the rollups"""
+        event_type = event.get("event_type")
+        moment = datetime.fromisoformat(event["timestamp"])
+        epoch = int(moment.timestamp())
+
+        self.totals[event_type] += 1
+        self.minutes[event_type][epoch // MINUTE] += 1
+        self.hours[event_type][epoch // HOUR] += 1
+        self.days[event_type][epoch // DAY] += 1
+        self.hour_of_day[event_type][moment.hour] += 1
+        if event_type == "error":
+            self.recent_errors.append(event)
+            self.errors.add(event, epoch)
+
+        session_id = event.get("session_id")
+        if session_id:
+            self._advance_funnel(session_id, event_type, event["timestamp"], moment)
+
+    def _advance_funnel(self, session_id: str, event_type: str, timestamp: str, moment: datetime):
+        """Record the session's stage transition and the durations it completes"""
+
+        def since(earlier: str) -> float:
+            return (moment - datetime.fromisoformat(earlier)).total_seconds()
+
+        if event_type == "plan_generation_started":
+            self.pending_plans[session_id] = timestamp
+        elif event_type == "plan_generation_completed" and session_id in self.pending_plans:
+            self.durations["plan_generation"].add(since(self.pending_plans.pop(session_id)))
+        elif event_type == "chat_message":
+            self.session_chats += 1
+
+        aggregate = self.sessions.get(session_id)
+        if aggregate is None:
+            if event_type != "session_created":
+                # Finished, gone quiet or created before tracking began: counters only
+                return
+            aggregate = self.sessions[session_id] = {"last_seen": timestamp, "stages": {}}
+        aggregate["last_seen"] = max(aggregate["last_seen"], timestamp)
+
+        stages = aggregate.setdefault("stages", {})
+        stage = STAGE_EVENTS.get(event_type)
+        if stage is None or stage in stages:
+            return
+        stages[stage] = timestamp
+        self.funnel[stage] += 1
+        if stage == "plan_started" and stages.get("created"):
+            self.durations["time_to_plan_start"].add(since(stages["created"]))
+        elif stage == "plan_completed" and stages.get("created"):
+            self.durations["time_to_first_plan"].add(since(stages["created"]))
+        elif stage == "first_chat":
+            self.chatting_sessions += 1
+            if stages.get("plan_completed"):
+                self.durations["plan_to_first_chat"].add(since(stages["plan_completed"]))
+        if len(stages) == len(FUNNEL_STAGES):
+            del self.sessions[session_id]
+
+    def count(self, event_type: str, window: Optional[int] = None, now: Optional[float] = None) -> int:
+        """Events of a type in the last ``window`` seconds, or all time"""
+        if window is None:
+            return self.totals.get(event_type, 0)
+        now = now if now is not None else time.time()
+        if window <= DAY:
+            buckets, width = self.minutes.get(event_type, {}), MINUTE
+        elif window <= self.hour_retention:
+            buckets, width = self.hours.get(event_type, {}), HOUR
+        else:
+            buckets, width = self.days.get(event_type, {}), DAY
+        first = int(now - window) // width
+        return sum(count for bucket, count in buckets.items() if bucket >= first)
+
+    def prune(self, now: Optional[float] = None):
+        """Drop minute and hour buckets that no window can reach any more, and sessions gone quiet"""
+        now = now if now is not None else time.time()
+        for buckets, width, keep in ((self.minutes, MINUTE, DAY), (self.hours, HOUR, self.hour_retention)):
+            first = int(now - keep) // width - 1
+            for counts in buckets.values():
+                for bucket in [b for b in counts if b < first]:
+                    del counts[bucket]
+        self.errors.prune(now)
+
+        cutoff = datetime.fromtimestamp(now - self.hour_retention).isoformat()
+        for session_id in [
+            s for s, aggregate in self.sessions.items()
+            if aggregate["last_seen"] < cutoff or len(aggregate.get("stages", {})) == len(FUNNEL_STAGES)
+        ]:
+            del self.sessions[session_id]
+        for session_id in [s for s, started in self.pending_plans.items() if started < cutoff]:
+            del self.pending_plans[session_id]
+
+    def to_dict(self) -> Dict:
+        return {
+            "totals": dict(self.totals),
+            "minutes": {t: dict(c) for t, c in self.minutes.items()},
+            "hours": {t: dict(c) for t, c in self.hours.items()},
+            "days": {t: dict(c) for t, c in self.days.items()},
+            "hour_of_day": dict(self.hour_of_day),
+            "sessions": self.sessions,
+            "pending_plans": self.pending_plans,
+            "recent_errors": list(self.recent_errors),
+            "error_fingerprints": self.errors.to_dict(),
+            "funnel": self.funnel,
+            "durations": {name: histogram.to_dict() for name, histogram in self.durations.items()},
+            "chatting_sessions": self.chatting_sessions,
+            "session_chats": self.session_chats
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, **options) -> "AnalyticsRollups":
+        rollups = cls(**options)
+        rollups.totals.update(data.get("totals", {}))
+        for name in ("minutes", "hours", "days"):
+            target = getattr(rollups, name)
+            for event_type, counts in data.get(name, {}).items():
+                target[event_type].update({int(bucket): count for bucket, count in counts.items()})
+        rollups.hour_of_day.update(data.get("hour_of_day", {}))
+        rollups.sessions = data.get("sessions", {})
+        rollups.pending_plans = data.get("pending_plans", {})
+        for session_id, aggregate in rollups.sessions.items():
+            # Older snapshots kept the pending plan on the session aggregate
+            if aggregate.get("pending_plan"):
+                rollups.pending_plans.setdefault(session_id, aggregate.pop("pending_plan"))
+        rollups.recent_errors.extend(data.get("recent_errors", []))
+        if "error_fingerprints" in data:
+            rollups.errors = ErrorFingerprints.from_dict(data["error_fingerprints"])
+        else:
+            # Older snapshots only kept the most recent errors
+            for event in rollups.recent_errors:
+                rollups.errors.add(event, int(datetime.fromisoformat(event["timestamp"]).timestamp()))
+        if "funnel" in data:
+            rollups.funnel.update(data["funnel"])
+            for name, histogram in data.get("durations", {}).items():
+                if name in rollups.durations:
+                    rollups.durations[name] = DurationHistogram.from_dict(histogram)
+            rollups.chatting_sessions = data.get("chatting_sessions", 0)
+            rollups.session_chats = data.get("session_chats", 0)
+        else:
+            rollups._backfill_funnel()
+        return rollups
+
+    def _backfill_funnel(self):
+        """Stage counts for snapshots written before funnel tracking; their stage times are unknown"""
+        for aggregate in self.sessions.values():
+            events = aggregate.get("events", {})
+            stages = aggregate.setdefault("stages", {})
+            for event_type, stage in STAGE_EVENTS.items():
+                if events.get(event_type) and stage not in stages:
+                    stages[stage] = None
+                    self.funnel[stage] += 1
+            if events.get("chat_message"):
+                self.chatting_sessions += 1
+                self.session_chats += events["chat_message"]
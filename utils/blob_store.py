@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from utils.lru_cache import LRUCache
+
+BLOB_REF = "$blob"
+
+class BlobStore:
+    """Content-addressed store for large, repeated JSON blocks.
+
+    ``pack`` walks a value bottom-up and replaces every dict or list whose
+    serialized form is at least ``min_size`` bytes with ``{"$blob": <sha256>}``,
+    writing the block once to ``<root>/<hash[:2]>/<hash>.json``. Identical
+    sections of different plans (interview stages, benefits, checklists)
+    therefore hash to the same blob and are stored once.
+
+    ``unpack`` reassembles a packed value. Loaded blocks are interned in a
+    bounded LRU keyed by hash, so sessions sharing a section also share the
+    in-memory object; unpacked values must be treated as read-only.
+
+    Blobs no longer referenced by any plan are removed by ``sweep``, a
+    mark-and-sweep pass over every stored plan. Between ``begin_sweep`` and
+    the end of the sweep, blobs that are stored or ``pin``-ned survive it,
+    so plans written while the mark phase runs keep their blocks.
+    """
+
+    def __init__(self, root_dir: str, min_size: int = 128, intern_max_bytes: int = 16 * 1024 * 1024):
+        self.root_dir = root_dir
+        self.min_size = min_size
+        os.makedirs(root_dir, exist_ok=True)
+        self._intern = LRUCache(max_entries=100000, max_bytes=intern_max_bytes)
+        self._known = set()
+        self._pinned: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def pack(self, value: Any) -> Any:
+        """Replace large nested blocks with blob references.
+
+        The top level stays inline: it carries per-session fields and would
+        never be shared anyway.
+        """
+        if isinstance(value, dict):
+            return {key: self._pack(item)[0] for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._pack(item)[0] for item in value]
+        return value
+
+    def unpack(self, value: Any) -> Any:
+        """Resolve blob references back into full values"""
+        if isinstance(value, dict):
+            if len(value) == 1 and BLOB_REF in value:
+                return self._resolve(value[BLOB_REF])
+            return {key: self.unpack(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.unpack(item) for item in value]
+        return value
+
+    def begin_sweep(self):
+        """Start a sweep: blobs stored or pinned from now on are kept by it"""
+        with self._lock:
+            self._pinned = set()
+
+    def pin(self, value: Any):
+        """Keep the blobs a packed value refers to if a sweep is under way"""
+        if self._pinned is None:
+            return
+        refs = self.references([value])
+        with self._lock:
+            if self._pinned is not None:
+                self._pinned |= refs
+
+    def sweep(self, live_values: Iterable[Any]) -> int:
+        """Delete blobs not referenced by ``live_values`` (every stored packed plan).
+
+        Must follow ``begin_sweep``. Returns the number of blobs deleted.
+        """
+        try:
+            live = self.references(live_values)
+            removed = 0
+            for digest in self._stored_digests():
+                with self._lock:
+                    if digest in live or digest in self._pinned:
+                        continue
+                    self._known.discard(digest)
+                    self._intern.invalidate(digest)
+                    try:
+                        os.remove(self._blob_path(digest))
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+            return removed
+        finally:
+            with self._lock:
+                self._pinned = None
+
+    def references(self, values: Iterable[Any]) -> Set[str]:
+        """Digests of every blob the packed values refer to, directly or through other blobs"""
+        found = set()
+        pending = list(values)
+        while pending:
+            item = pending.pop()
+            if isinstance(item, dict):
+                if len(item) == 1 and BLOB_REF in item:
+                    digest = item[BLOB_REF]
+                    if digest not in found:
+                        found.add(digest)
+                        try:
+                            with open(self._blob_path(digest), 'r', encoding='utf-8') as f:
+                                pending.append(json.load(f))
+                        except FileNotFoundError:
+                            pass
+                else:
+                    pending.extend(item.values())
+            elif isinstance(item, list):
+                pending.extend(item)
+        return found
+
+    @property
+    def hits(self) -> int:
+        """Blob reads served from the intern cache"""
+        return self._intern.hits
+
+    @property
+    def misses(self) -> int:
+        return self._intern.misses
+
+    def stats(self) -> Dict:
+        return {"blobs_written": len(self._known), "intern": self._intern.stats()}
+
+    def _pack(self, value: Any):
+        """Return the packed value and the size of its serialized form"""
+        if isinstance(value, dict):
+            items = {key: self._pack(item) for key, item in value.items()}
+            packed = {key: item for key, (item, _) in items.items()}
+            size = sum(len(json.dumps(key)) + item_size + 2 for key, (_, item_size) in items.items()) + 2
+        elif isinstance(value, list):
+            items = [self._pack(item) for item in value]
+            packed = [item for item, _ in items]
+            size = sum(item_size + 2 for _, item_size in items) + 2
+        else:
+            return value, len(json.dumps(value))
+
+        if size < self.min_size:
+            return packed, size
+        ref = {BLOB_REF: self._put(packed)}
+        return ref, len(json.dumps(ref))
+
+    def _put(self, packed: Any) -> str:
+        data = json.dumps(packed, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        with self._lock:
+            # Pinned before the file is (re)written, so a running sweep can't remove it
+            if self._pinned is not None:
+                self._pinned.add(digest)
+            if digest in self._known:
+                return digest
+
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # Same content under the same name, so a concurrent writer winning is harmless
+            os.replace(tmp_file, path)
+        with self._lock:
+            self._known.add(digest)
+        return digest
+
+    def _resolve(self, digest: str) -> Any:
+        value = self._intern.get(digest)
+        if value is not None:
+            return value
+        with open(self._blob_path(digest), 'r', encoding='utf-8') as f:
+            data = f.read()
+        value = self.unpack(json.loads(data))
+        self._intern.put(digest, value, len(data))
+        return value
+
+    def _stored_digests(self) -> Iterator[str]:
+        for bucket in os.listdir(self.root_dir):
+            bucket_dir = os.path.join(self.root_dir, bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for name in os.listdir(bucket_dir):
+                if name.endswith(".json"):
+                    yield name[:-len(".json")]
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root_dir, digest[:2], f"{digest}.json")
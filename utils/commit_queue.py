@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+class CommitQueue:
+    """Single-writer queue that group-commits mutations.
+
+    Callers submit mutation callables and get a ``Future``. One writer
+    thread takes the first pending mutation, gathers whatever else arrives
+    within ``window`` seconds (up to ``max_batch``), applies them in order
+    inside ``batch_factory()`` and resolves every future only after that
+    batch has been made durable. Many concurrent writers therefore share one
+    flush/fsync instead of paying for one each.
+    """
+
+    def __init__(self, batch_factory: Optional[Callable[[], ContextManager]] = None,
+                 window: float = 0.002, max_batch: int = 256):
+        self.batch_factory = batch_factory or nullcontext
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[Callable[[], Any], Future]]]" = queue.Queue()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.mutations = 0
+        self.max_batch_seen = 0
+        self._writer = threading.Thread(target=self._run, name="session-commit-queue", daemon=True)
+        self._writer.start()
+
+    def submit(self, mutation: Callable[[], Any]) -> Future:
+        """Queue a mutation; the future resolves once it is committed"""
+        if self._closed:
+            raise RuntimeError("Commit queue is closed")
+        future: Future = Future()
+        self._queue.put((mutation, future))
+        return future
+
+    def close(self):
+        """Commit everything already queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "mutations": self.mutations,
+                "avg_batch_size": round(self.mutations / self.batches, 2) if self.batches else 0,
+                "max_batch_size": self.max_batch_seen,
+                "pending": self._queue.qsize()
+            }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Callable[[], Any], Future]]):
+        results = []
+        try:
+            with self.batch_factory():
+                for mutation, future in batch:
+                    try:
+                        results.append((future, mutation(), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            # The batch could not be made durable; fail every caller in it
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.mutations += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
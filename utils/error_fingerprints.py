@@ -0,0 +1,100 @@
+import hashlib
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+HOUR = 3600
+
+# Applied in order: specific shapes first so e.g. a UUID isn't split into numbers
+_NORMALIZERS = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b"), "<email>"),
+    (re.compile(r"\b(?:0x)?(?=[0-9a-f]*\d)[0-9a-f]{8,}\b", re.I), "<hex>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+def normalize_error(message: str, max_length: int = 300) -> str:
+    """Error message with IDs, UUIDs, URLs and numbers replaced by placeholders"""
+    normalized = message or ""
+    for pattern, replacement in _NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized.strip()[:max_length]
+
+def fingerprint_error(message: str) -> Tuple[str, str]:
+    """Stable fingerprint of an error message and the normalized pattern it was derived from"""
+    pattern = normalize_error(message)
+    return hashlib.sha1(pattern.encode("utf-8")).hexdigest()[:12], pattern
+
+class ErrorFingerprints:
+    """Error counts aggregated by fingerprint.
+
+    Each fingerprint keeps its normalized pattern, total count, first and
+    last seen timestamps, hourly counts for the last day and up to
+    ``max_samples`` raw messages. At most ``max_fingerprints`` are kept; the
+    least recently seen one is dropped to make room, so memory is bounded by
+    the number of distinct error kinds rather than by error volume.
+    """
+
+    def __init__(self, max_fingerprints: int = 1000, max_samples: int = 3):
+        self.max_fingerprints = max_fingerprints
+        self.max_samples = max_samples
+        self.fingerprints: Dict[str, Dict] = {}
+
+    def add(self, event: Dict, epoch: int):
+        message = event.get("error_message") or ""
+        # Events tracked before fingerprinting are fingerprinted on replay
+        fingerprint = event.get("fingerprint") or fingerprint_error(message)[0]
+
+        entry = self.fingerprints.get(fingerprint)
+        if entry is None:
+            if len(self.fingerprints) >= self.max_fingerprints:
+                oldest = min(self.fingerprints, key=lambda key: self.fingerprints[key]["last_seen"])
+                del self.fingerprints[oldest]
+            entry = self.fingerprints[fingerprint] = {
+                "pattern": normalize_error(message), "count": 0, "first_seen": event["timestamp"],
+                "last_seen": event["timestamp"], "hours": {}, "samples": []
+            }
+        entry["count"] += 1
+        entry["first_seen"] = min(entry["first_seen"], event["timestamp"])
+        entry["last_seen"] = max(entry["last_seen"], event["timestamp"])
+        hour = str(epoch // HOUR)
+        entry["hours"][hour] = entry["hours"].get(hour, 0) + 1
+        if len(entry["samples"]) < self.max_samples and message not in entry["samples"]:
+            entry["samples"].append(message)
+
+    def top(self, limit: int = 10, now: Optional[float] = None) -> List[Dict]:
+        """Fingerprints with the most errors in the last 24 hours, then all time"""
+        first = int((now if now is not None else time.time()) - 24 * HOUR) // HOUR
+        ranked = []
+        for fingerprint, entry in self.fingerprints.items():
+            last_24h = sum(count for hour, count in entry["hours"].items() if int(hour) >= first)
+            ranked.append({
+                "fingerprint": fingerprint,
+                "pattern": entry["pattern"],
+                "count": entry["count"],
+                "count_24h": last_24h,
+                "rate_per_hour_24h": round(last_24h / 24, 3),
+                "first_seen": entry["first_seen"],
+                "last_seen": entry["last_seen"],
+                "samples": entry["samples"]
+            })
+        ranked.sort(key=lambda item: (item["count_24h"], item["count"]), reverse=True)
+        return ranked[:limit]
+
+    def prune(self, now: Optional[float] = None):
+        """Drop hourly counts older than a day"""
+        first = int((now if now is not None else time.time()) - 24 * HOUR) // HOUR - 1
+        for entry in self.fingerprints.values():
+            for hour in [h for h in entry["hours"] if int(h) < first]:
+                del entry["hours"][hour]
+
+    def to_dict(self) -> Dict:
+        return self.fingerprints
+
+    @classmethod
+    def from_dict(cls, data: Dict, **options) -> "ErrorFingerprints":
+        fingerprints = cls(**options)
+        fingerprints.fingerprints = data
+        return fingerprints
@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+class ColumnarEventStore:
+    """Append-only columnar copy of the analytics events for ad-hoc queries.
+
+    Each event becomes one row across three binary column files: ``ts.i8``
+    (int64 epoch microseconds), ``type.i2`` (event-type code) and
+    ``session.i4`` (session code, -1 for none). Codes are assigned in order
+    of first appearance and persisted as one name per line in ``types.txt``
+    and ``sessions.txt``. Columns are read through ``numpy.memmap``, so
+    queries over millions of events use ``searchsorted`` and ``bincount``
+    without loading anything into Python objects.
+
+    Timestamps are kept non-decreasing (an event that arrives slightly late
+    is stamped with the previous row's time), which is what lets time
+    windows be found by binary search.
+
+    ``meta.json`` records the row count together with the event-log offset
+    those rows cover; on open, columns are truncated back to that count so
+    rows appended before a crash are not duplicated by the replay.
+    """
+
+    COLUMNS = {"ts": np.int64, "type": np.int16, "session": np.int32}
+    FILES = {"ts": "ts.i8", "type": "type.i2", "session": "session.i4"}
+    BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self.meta_file = os.path.join(root_dir, "meta.json")
+        self._lock = threading.Lock()
+        self._types = self._load_codes("types.txt")
+        self._sessions = self._load_codes("sessions.txt")
+        self._session_names = list(self._sessions)
+        meta = self._load_meta()
+        self._rows = self._repair(meta.get("rows"))
+        self._last_ts = int(self._column("ts")[-1]) if self._rows else 0
+        self._views: Dict[str, np.ndarray] = {}
+        self.log_offset = meta.get("log_offset", 0)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, events: Iterable[Dict], log_offset: Optional[int] = None):
+        """Append events and record the event-log offset they bring the store up to"""
+        with self._lock:
+            timestamps, types, sessions = [], [], []
+            for event in events:
+                ts = int(datetime.fromisoformat(event["timestamp"]).timestamp() * 1_000_000)
+                self._last_ts = max(self._last_ts, ts)
+                timestamps.append(self._last_ts)
+                types.append(self._code(self._types, "types.txt", event.get("event_type")))
+                session_id = event.get("session_id")
+                sessions.append(self._code(self._sessions, "sessions.txt", session_id) if session_id else -1)
+            if timestamps:
+                for name, values in (("ts", timestamps), ("type", types), ("session", sessions)):
+                    with open(self._path(name), 'ab') as f:
+                        np.asarray(values, dtype=self.COLUMNS[name]).tofile(f)
+                self._rows += len(timestamps)
+                self._views = {}
+            if log_offset is not None:
+                self.log_offset = log_offset
+            # Rows past the count recorded here are discarded on open, so a crash
+            # before this point replays the same events from the old offset once
+            self._save_meta()
+
+    def count(self, event_type: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, session_id: Optional[str] = None) -> int:
+        """Number of events matching the filters; ``since``/``until`` are epoch seconds"""
+        return int(np.count_nonzero(self._select(event_type, since, until, session_id)[2]))
+
+    def window_counts(self, event_type: str, windows: Dict[str, float], now: Optional[float] = None) -> Dict[str, int]:
+        """Counts over trailing windows, e.g. ``{"24h": 86400, "7d": 604800}``"""
+        now = now if now is not None else time.time()
+        ts, types = self._view("ts"), self._view("type")
+        code = self._types.get(event_type)
+        if code is None or not len(ts):
+            return {name: 0 for name in windows}
+        # Only the widest window is scanned; matching timestamps stay sorted, so
+        # every window is then one binary search
+        start = int(np.searchsorted(ts, self._micros(now - max(windows.values())), side="left"))
+        match_ts = ts[start:][types[start:len(ts)] == code]
+        return {
+            name: int(len(match_ts) - np.searchsorted(match_ts, self._micros(now - seconds), side="left"))
+            for name, seconds in windows.items()
+        }
+
+    def hourly_histogram(self, event_type: str, since: Optional[float] = None) -> List[int]:
+        """Events per local hour of day, using the UTC offset in force at each event"""
+        start, end, mask = self._select(event_type, since, None, None)
+        ts = self._view("ts")[start:end][mask]
+        if not len(ts):
+            return [0] * 24
+        seconds = ts // 1_000_000
+        # Offsets only change on quarter hours; timestamps are sorted, so look
+        # one up per run of events in the same quarter hour
+        quarters = seconds // 900
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(quarters)) + 1))
+        offsets = np.array([
+            datetime.fromtimestamp(int(quarters[i]) * 900).astimezone().utcoffset().total_seconds()
+            for i in starts
+        ], dtype=np.int64)
+        local = seconds + np.repeat(offsets, np.diff(np.append(starts, len(seconds))))
+        return np.bincount((local // 3600) % 24, minlength=24).tolist()
+
+    def session_counts(self, event_type: str, top: Optional[int] = None) -> Dict[str, int]:
+        """Events per session, largest first"""
+        start, end, mask = self._select(event_type, None, None, None)
+        sessions = self._view("session")[start:end][mask]
+        sessions = sessions[sessions >= 0]
+        if not len(sessions):
+            return {}
+        counts = np.bincount(sessions, minlength=len(self._session_names))
+        order = np.argsort(counts)[::-1]
+        order = order[counts[order] > 0][:top]
+        return {self._session_names[code]: int(counts[code]) for code in order}
+
+    def series(self, event_type: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               session_id: Optional[str] = None, bucket: str = "hour") -> List[Dict]:
+        """Event counts per time bucket as ``[{"start": iso, "count": n}]``"""
+        width = self.BUCKETS[bucket] * 1_000_000
+        start, end, mask = self._select(event_type, since, until, session_id)
+        selected = self._view("ts")[start:end][mask]
+        if not len(selected):
+            return []
+        first = selected[0] // width
+        counts = np.bincount(selected // width - first)
+        return [
+            {"start": datetime.fromtimestamp((first + i) * width / 1_000_000).isoformat(), "count": int(c)}
+            for i, c in enumerate(counts) if c
+        ]
+
+    def stats(self) -> Dict:
+        return {"rows": self._rows, "event_types": len(self._types), "sessions": len(self._sessions)}
+
+    def _select(self, event_type, since, until, session_id):
+        """Row range for the time filters and a mask over it for the others"""
+        ts = self._view("ts")
+        start = int(np.searchsorted(ts, self._micros(since), side="left")) if since is not None else 0
+        end = int(np.searchsorted(ts, self._micros(until), side="left")) if until is not None else len(ts)
+        mask = np.ones(max(0, end - start), dtype=bool)
+        for column, codes, name in (("type", self._types, event_type), ("session", self._sessions, session_id)):
+            if name is not None:
+                code = codes.get(name)
+                mask &= (self._view(column)[start:end] == code) if code is not None else False
+        return start, end, mask
+
+    def _view(self, name: str) -> np.ndarray:
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                view = self._views[name] = self._column(name)
+            return view
+
+    def _column(self, name: str) -> np.ndarray:
+        if not self._rows:
+            return np.empty(0, dtype=self.COLUMNS[name])
+        return np.memmap(self._path(name), dtype=self.COLUMNS[name], mode='r', shape=(self._rows,))
+
+    def _repair(self, committed: Optional[int] = None) -> int:
+        """Row count, truncating columns to the last committed row count and
+        evening out columns left uneven by a crash mid-append"""
+        rows = min(
+            os.path.getsize(self._path(name)) // np.dtype(dtype).itemsize if os.path.exists(self._path(name)) else 0
+            for name, dtype in self.COLUMNS.items()
+        )
+        if committed is not None:
+            rows = min(rows, committed)
+        for name, dtype in self.COLUMNS.items():
+            path = self._path(name)
+            size = rows * np.dtype(dtype).itemsize
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            elif os.path.getsize(path) != size:
+                with open(path, 'rb+') as f:
+                    f.truncate(size)
+        return rows
+
+    def _code(self, codes: Dict[str, int], file_name: str, name: Optional[str]) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+            if codes is self._sessions:
+                self._session_names.append(name)
+            with open(os.path.join(self.root_dir, file_name), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(name) + "\n")
+        return code
+
+    def _load_codes(self, file_name: str) -> Dict[str, int]:
+        codes = {}
+        try:
+            with open(os.path.join(self.root_dir, file_name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        codes.setdefault(json.loads(line), len(codes))
+                    except json.JSONDecodeError:
+                        break
+        except FileNotFoundError:
+            pass
+        return codes
+
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self.meta_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_meta(self):
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"log_offset": self.log_offset, "rows": self._rows}, f)
+        os.replace(tmp_file, self.meta_file)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, self.FILES[name])
+
+    @staticmethod
+    def _micros(epoch_seconds: float) -> int:
+        return int(epoch_seconds * 1_000_000)
@@ -0,0 +1,40 @@
+from typing import Any, Dict, Iterable, Union
+
+Projection = Dict[str, Union["Projection", bool]]
+
+def parse_fields(fields: Iterable[str], aliases: Dict[str, str] = None) -> Projection:
+    """Turn dotted paths (``hiring_plan.compensation_packages``) into a projection tree.
+
+    A path that selects a whole value wins over deeper paths under it.
+    ``aliases`` renames a path's first segment (e.g. ``plan`` to ``hiring_plan``).
+    """
+    tree: Projection = {}
+    for field in fields:
+        parts = [part for part in field.strip().split(".") if part]
+        if not parts:
+            continue
+        if aliases:
+            parts[0] = aliases.get(parts[0], parts[0])
+        node = tree
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[parts[-1]] = True
+    return tree
+
+def project(value: Any, tree: Union[Projection, bool]) -> Any:
+    """The parts of ``value`` selected by a projection tree.
+
+    Lists are projected item by item, so ``messages.user_message`` keeps
+    only that field of every message. Missing keys are left out.
+    """
+    if tree is True:
+        return value
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    return value
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.latency import latency_recorder
+from utils.metrics import metrics
+
+JobHandler = Callable[[Dict, Callable[[Dict], None]], Awaitable[Any]]
+
+class JobStore:
+    """SQLite-backed job records (WAL mode).
+
+    Every job is written when it is enqueued and on each state change, so
+    jobs that were queued or running when the process stopped can be picked
+    up again on the next start.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            progress TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+    """
+
+    def __init__(self, storage_dir: str = "data", db_name: str = "jobs.db"):
+        self.db_file = os.path.join(storage_dir, db_name)
+        os.makedirs(storage_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def create(self, kind: str, payload: Dict) -> Dict:
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": "queued",
+            "payload": payload,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, payload, progress, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job["job_id"], kind, "queued", json.dumps(payload), "{}", job["created_at"])
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, kind, status, payload, progress, result, error, created_at, started_at, finished_at"
+                " FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def pending(self) -> List[Dict]:
+        """Queued and interrupted running jobs, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, kind, status, payload, progress, result, error, created_at, started_at, finished_at"
+                " FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def mark_running(self, job_id: str):
+        self._update(job_id, status="running", started_at=datetime.now().isoformat(), progress="{}")
+
+    def set_progress(self, job_id: str, progress: Dict):
+        self._update(job_id, progress=json.dumps(progress))
+
+    def complete(self, job_id: str, result: Any):
+        self._update(job_id, status="completed", result=json.dumps(result), finished_at=datetime.now().isoformat())
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error, finished_at=datetime.now().isoformat())
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _row_to_job(row) -> Dict:
+        job_id, kind, status, payload, progress, result, error, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "status": status,
+            "payload": json.loads(payload),
+            "progress": json.loads(progress) if progress else {},
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at
+        }
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+class JobQueue:
+    """Bounded asyncio job queue drained by a fixed pool of workers.
+
+    ``submit`` records the job in the ``JobStore`` and returns immediately;
+    at most ``max_queued`` jobs wait at a time, and ``workers`` of them run
+    concurrently. Each handler is called with the job's payload and a
+    ``progress`` callback whose argument is stored as the job's progress.
+    On ``start`` jobs left queued or running by a previous process are
+    enqueued again, so an interrupted job is rerun from the beginning.
+
+    Queue depth, job counts by outcome and wait/run latencies (the
+    ``job_wait`` and ``job_run`` latency groups) are exported as metrics.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 4, max_queued: int = 1000):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._enqueued_at: Dict[str, float] = {}
+        self.running = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        """Spawn the workers on the running loop and re-enqueue unfinished jobs"""
+        self._queue = asyncio.Queue()
+        for job in self.store.pending():
+            self._enqueue(job["job_id"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stop the workers; jobs still queued or running stay pending in the store"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, payload: Dict) -> Dict:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.depth() >= self.max_queued:
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+        job = self.store.create(kind, payload)
+        self._enqueue(job["job_id"])
+        metrics.inc("hr_agent_jobs_total", {"kind": kind, "status": "queued"})
+        return job
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> Dict:
+        return {"queued": self.depth(), "running": self.running, "workers": self.workers}
+
+    def _enqueue(self, job_id: str):
+        self._enqueued_at[job_id] = time.perf_counter()
+        self._queue.put_nowait(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Error running job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        kind = job["kind"]
+        latency_recorder.record("job_wait", kind, time.perf_counter() - self._enqueued_at.pop(job_id))
+        self.store.mark_running(job_id)
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            result = await self._handlers[kind](job["payload"], lambda progress: self.store.set_progress(job_id, progress))
+            self.store.complete(job_id, result)
+            metrics.inc("hr_agent_jobs_total", {"kind": kind, "status": "completed"})
+        except asyncio.CancelledError:
+            # Shutting down: the job stays "running" and is rerun on the next start
+            raise
+        except Exception as e:
+            self.store.fail(job_id, str(e))
+            metrics.inc("hr_agent_jobs_total", {"kind": kind, "status": "failed"})
+        finally:
+            self.running -= 1
+            latency_recorder.record("job_run", kind, time.perf_counter() - started)
@@ -0,0 +1,142 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+class LatencyHistogram:
+    """Fixed-size, log-scale latency histogram in the style of HDR histograms.
+
+    Values are recorded in microseconds. Below 64us every value has its own
+    bucket; above that each power of two is split into 32 linear
+    sub-buckets, so any recorded value is reported within about 3%. The
+    bucket array has a fixed size (values up to about an hour), which makes
+    ``record`` O(1) and memory constant regardless of traffic.
+    """
+
+    SUB_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BITS
+    BUCKETS = 28 * SUB_BUCKETS
+
+    def __init__(self):
+        self.counts: List[int] = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        self.counts[min(self._index(value), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> float:
+        """Upper bound, in microseconds, of the bucket holding the percentile"""
+        if not self.count:
+            return 0
+        rank = max(1, round(percentile / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        """Count, mean, p50/p90/p99 and max in milliseconds"""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count / 1000, 3) if self.count else 0,
+            "p50_ms": round(self.percentile(50) / 1000, 3),
+            "p90_ms": round(self.percentile(90) / 1000, 3),
+            "p99_ms": round(self.percentile(99) / 1000, 3),
+            "max_ms": round(self.max / 1000, 3)
+        }
+
+    def cumulative(self, bounds: List[int]) -> List[int]:
+        """Counts of values at or below each bound (microseconds), as Prometheus ``le`` buckets"""
+        counts, seen, index = [], 0, 0
+        for bound in bounds:
+            while index < self.BUCKETS and self._upper_bound(index) <= bound:
+                seen += self.counts[index]
+                index += 1
+            counts.append(seen)
+        return counts
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS - 1
+        return ((shift + 1) << cls.SUB_BITS) | ((value >> shift) & (cls.SUB_BUCKETS - 1))
+
+    @classmethod
+    def _upper_bound(cls, index: int) -> int:
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = (index >> cls.SUB_BITS) - 1
+        sub_bucket = cls.SUB_BUCKETS + (index & (cls.SUB_BUCKETS - 1))
+        return ((sub_bucket + 1) << shift) - 1
+
+class LatencyRecorder:
+    """Latency histograms grouped by kind (endpoint, step, llm) and name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+    def record(self, group: str, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.setdefault(group, {}).get(name)
+            if histogram is None:
+                histogram = self._histograms[group][name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def time(self, group: str, name: str):
+        """Record how long the block takes, including when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(group, name, time.perf_counter() - started)
+
+    def timed(self, group: str, name: Optional[str] = None):
+        """Decorator recording the duration of an async function"""
+        def decorator(func):
+            label = name or func.__name__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.time(group, label):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def export(self, bounds: List[float]) -> Dict:
+        """Per-group, per-name cumulative bucket counts for bounds in seconds, with count and sum"""
+        bounds_us = [int(bound * 1_000_000) for bound in bounds]
+        with self._lock:
+            return {
+                group: {
+                    name: {
+                        "buckets": histogram.cumulative(bounds_us),
+                        "count": histogram.count,
+                        "sum": histogram.total / 1_000_000
+                    }
+                    for name, histogram in sorted(histograms.items())
+                }
+                for group, histograms in self._histograms.items()
+            }
+
+    def snapshot(self) -> Dict:
+        """Per-group, per-name latency summaries"""
+        with self._lock:
+            return {
+                group: {name: histogram.summary() for name, histogram in sorted(histograms.items())}
+                for group, histograms in self._histograms.items()
+            }
+
+# Shared by the API middleware, the orchestrator and the agents
+latency_recorder = LatencyRecorder()
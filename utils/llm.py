@@ -0,0 +1,53 @@
+import time
+from typing import AsyncIterator, Dict, List
+
+from utils.latency import latency_recorder
+from utils.metrics import metrics
+from utils.rate_limit import llm_rate_limiter
+
+async def invoke_llm(llm, messages: List, agent: str):
+    """Call a chat model, recording latency, call count and token usage under the agent's name"""
+    await llm_rate_limiter.acquire()
+    try:
+        with latency_recorder.time("llm", agent):
+            response = await llm.ainvoke(messages)
+    except Exception:
+        metrics.inc("hr_agent_llm_calls_total", {"agent": agent, "status": "error"})
+        raise
+    metrics.inc("hr_agent_llm_calls_total", {"agent": agent, "status": "ok"})
+    _record_usage(agent, getattr(response, "usage_metadata", None))
+    return response
+
+async def stream_llm(llm, messages: List, agent: str) -> AsyncIterator[str]:
+    """Stream a chat model's reply as text chunks.
+
+    Records the same metrics as invoke_llm, plus time to first token under
+    the ``llm_first_token`` latency group.
+    """
+    await llm_rate_limiter.acquire()
+    started = time.perf_counter()
+    first_token = True
+    usage: Dict = {}
+    try:
+        async for chunk in llm.astream(messages):
+            if chunk.content and first_token:
+                latency_recorder.record("llm_first_token", agent, time.perf_counter() - started)
+                first_token = False
+            # Usage arrives on the last chunk, when the model reports it at all
+            for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                if isinstance(value, int):
+                    usage[key] = usage.get(key, 0) + value
+            if chunk.content:
+                yield chunk.content
+    except Exception:
+        metrics.inc("hr_agent_llm_calls_total", {"agent": agent, "status": "error"})
+        raise
+    finally:
+        latency_recorder.record("llm", agent, time.perf_counter() - started)
+    metrics.inc("hr_agent_llm_calls_total", {"agent": agent, "status": "ok"})
+    _record_usage(agent, usage)
+
+def _record_usage(agent: str, usage: Dict):
+    if usage:
+        metrics.inc("hr_agent_llm_tokens_total", {"agent": agent, "kind": "prompt"}, usage.get("input_tokens", 0))
+        metrics.inc("hr_agent_llm_tokens_total", {"agent": agent, "kind": "completion"}, usage.get("output_tokens", 0))
@@ -1,132 +1,578 @@
+import asyncio
+import copy
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
-import uuid
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.blob_store import BlobStore
+from utils.commit_queue import CommitQueue
+from utils.field_projection import Projection, parse_fields, project
+from utils.latency import latency_recorder
+from utils.lru_cache import LRUCache
+from utils.session_archive import SessionArchive
+from utils.session_index import encode_cursor
+from utils.session_stores import (IndexedJsonSessionStore, JsonSessionStore, SessionStore, ShardedSessionStore,
+                                  SQLiteSessionStore, session_summary)
 
 class MemoryManager:
-    def __init__(self, storage_dir: str = "data"):
+    """Session persistence facade over a pluggable storage backend.
+
+    ``backend="json"`` (default) is the log-structured ``sessions.json`` store;
+    ``backend="indexed"`` uses the same files but reads sessions on demand
+    through an offset index instead of loading them all;
+    ``backend="sqlite"`` keeps sessions, plans and messages in ``sessions.db``;
+    ``backend="sharded"`` stores one file per session under ``sessions/``.
+
+    Hot sessions are kept in a bounded LRU cache that is updated write-through
+    on every mutation, so repeated reads of an active session never go back
+    to the backend. Cached entries hold only the most recent
+    ``recent_messages`` chat messages; older history is paged from the store.
+
+    Mutations go through a single-writer ``CommitQueue``: writes arriving
+    within ``commit_window`` seconds are applied in order and made durable
+    together, and each caller returns once its write is committed. Reads and
+    cache updates of one session are serialized by a per-session lock. The
+    ``a``-prefixed methods are awaitable variants for async request handlers.
+
+    With ``plan_dedup`` (default) hiring plans are stored packed: large
+    sections are kept once in a content-addressed ``BlobStore`` under
+    ``blobs/`` and referenced by hash, then reassembled on read. Sections are
+    shared between sessions in memory, so reads return deep copies of the
+    plan. With ``blob_sweep_interval`` a background pass deletes blobs no
+    plan refers to any more.
+
+    Sessions idle for longer than ``archive_after`` seconds are moved by a
+    background pass into a compressed ``SessionArchive`` under ``archive/``.
+    They stay listed, and reading or writing one restores it to the hot store.
+    """
+
+    LOCK_STRIPES = 64
+    # Accepted in ``fields`` paths as shorthand for the stored key
+    FIELD_ALIASES = {"plan": "hiring_plan"}
+    ARCHIVE_BATCH = 256
+
+    BACKENDS = {
+        "json": JsonSessionStore,
+        "indexed": IndexedJsonSessionStore,
+        "sqlite": SQLiteSessionStore,
+        "sharded": ShardedSessionStore,
+    }
+
+    def __init__(self, storage_dir: str = "data", backend: str = "json",
+                 cache_max_entries: int = 1024, cache_max_bytes: int = 64 * 1024 * 1024,
+                 recent_messages: int = 50, group_commit: bool = True, commit_window: float = 0.002,
+                 plan_dedup: bool = True, archive_after: Optional[float] = None, archive_interval: float = 3600,
+                 archive_codec: str = "lzma", blob_sweep_interval: Optional[float] = None, **store_options):
         self.storage_dir = storage_dir
-        self.sessions_file = os.path.join(storage_dir, "sessions.json")
+        self.backend = backend
+        self.recent_messages = recent_messages
+        self.cache = LRUCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
+        self._session_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
         self.ensure_storage_dir()
+
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown session backend: {backend}")
+        self.store: SessionStore = self.BACKENDS[backend](storage_dir, **store_options)
+        self.blobs = BlobStore(os.path.join(storage_dir, "blobs")) if plan_dedup else None
+        self.commit_queue = CommitQueue(self.store.batch, window=commit_window) if group_commit else None
+
+        self.archive = SessionArchive(os.path.join(storage_dir, "archive"), codec=archive_codec)
+        self.archive_after = archive_after
+        self._archive_stats = {"archived": 0, "restored": 0, "archive_ms": [], "restore_ms": []}
+        self._archive_stats_lock = threading.Lock()
+        self._background_stop = threading.Event()
+        self._archiver: Optional[threading.Thread] = None
+        if archive_after:
+            self._archiver = threading.Thread(
+                target=self._archive_loop, args=(archive_interval,), name="session-archiver", daemon=True
+            )
+            self._archiver.start()
+        self._blob_sweeper: Optional[threading.Thread] = None
+        if self.blobs and blob_sweep_interval:
+            self._blob_sweeper = threading.Thread(
+                target=self._blob_sweep_loop, args=(blob_sweep_interval,), name="plan-blob-sweeper", daemon=True
+            )
+            self._blob_sweeper.start()
     
     def ensure_storage_dir(self):
         """Ensure storage directory exists"""
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
-        
-        # Initialize sessions file if it doesn't exist
-        if not os.path.exists(self.sessions_file):
-            with open(self.sessions_file, 'w') as f:
-                json.dump({}, f)
     
     def create_session(self, session_id: str, session_data: Dict) -> bool:
         """Create a new session"""
+        return self._commit(lambda: self._create(session_id, session_data), "creating session")
+
+    async def acreate_session(self, session_id: str, session_data: Dict) -> bool:
+        return await self._acommit(lambda: self._create(session_id, session_data), "creating session")
+
+    def get_session(self, session_id: str, message_limit: Optional[int] = None,
+                    message_cursor: Optional[str] = None, message_since: Optional[str] = None,
+                    fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """Get session data by ID.
+
+        Chat history is returned as ``messages``: all of it by default, or one
+        page when ``message_limit``, ``message_cursor`` or ``message_since`` is
+        given, in which case ``next_message_cursor`` points at older messages.
+
+        ``fields`` restricts the result to the given keys or dotted paths
+        (``status``, ``plan.compensation_packages``, ``messages``).
+        Chat history and plan sections that weren't asked for are not read.
+        """
         try:
-            sessions = self._load_sessions()
-            sessions[session_id] = session_data
-            self._save_sessions(sessions)
-            return True
-        except Exception as e:
-            print(f"Error creating session: {e}")
-            return False
-    
-    def get_session(self, session_id: str) -> Optional[Dict]:
-        """Get session data by ID"""
-        try:
-            sessions = self._load_sessions()
-            return sessions.get(session_id)
+            projection = parse_fields(fields, self.FIELD_ALIASES) if fields else None
+            loaded = self._load_cached(session_id, projection)
+            if loaded is None and session_id in self.archive:
+                # Restored on the writer thread, which takes this session's lock itself
+                if self._commit(lambda: self._restore(session_id), "restoring session"):
+                    loaded = self._load_cached(session_id, projection)
+            if loaded is None:
+                return None
+            session, recent = loaded
+
+            paged = message_limit is not None or message_cursor is not None or message_since is not None
+            wants_messages = projection is None or "messages" in projection
+            if wants_messages:
+                page = self._page_recent(session, recent, message_limit, message_cursor, message_since)
+                if page is None:
+                    page = self.store.get_messages(
+                        session_id, limit=message_limit, cursor=message_cursor, since=message_since
+                    )
+                session["messages"], next_cursor = page
+            if projection is not None:
+                session = project(session, projection)
+            if paged and wants_messages:
+                session["next_message_cursor"] = next_cursor
+            return session
         except Exception as e:
             print(f"Error getting session: {e}")
             return None
     
+    def session_version(self, session_id: str) -> Optional[str]:
+        """A value that changes whenever the session is written, or None if it doesn't exist.
+
+        Read from the cached copy or, on a miss, from the store's metadata
+        alone, so checking a version never loads the plan or chat history.
+        """
+        session = self.get_session(session_id, fields=["created_at", "updated_at", "message_count"])
+        if session is None:
+            return None
+        # Every write stamps updated_at; the count tells apart writes within one timestamp
+        return f"{session.get('updated_at') or session.get('created_at')}/{session.get('message_count', 0)}"
+
+    def get_session_versioned(self, session_id: str, **options) -> Tuple[Optional[str], Optional[Dict]]:
+        """get_session together with the session_version the result was read at.
+
+        The version is checked again after the read, and the read retried if
+        a write landed in between, so the pair always describes one state.
+        """
+        version = self.session_version(session_id)
+        while version is not None:
+            session = self.get_session(session_id, **options)
+            current = self.session_version(session_id)
+            if current == version:
+                return version, session
+            version = current
+        return None, None
+
+    async def asession_version(self, session_id: str) -> Optional[str]:
+        await self._arestore(session_id)
+        return self.session_version(session_id)
+
+    async def aget_session(self, session_id: str, **options) -> Optional[Dict]:
+        """Awaitable get_session: an archived session is restored without blocking the event loop"""
+        await self._arestore(session_id)
+        return self.get_session(session_id, **options)
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of chat history and the cursor of the next older page"""
+        session = self.get_session(session_id, message_limit=limit, message_cursor=cursor, message_since=since)
+        if session is None:
+            return [], None
+        return session["messages"], session.get("next_message_cursor")
+
     def update_session_plan(self, session_id: str, hiring_plan: Dict) -> bool:
         """Update session with hiring plan"""
-        try:
-            sessions = self._load_sessions()
-            if session_id in sessions:
-                sessions[session_id]["hiring_plan"] = hiring_plan
-                sessions[session_id]["updated_at"] = datetime.now().isoformat()
-                self._save_sessions(sessions)
-                return True
-            return False
-        except Exception as e:
-            print(f"Error updating session plan: {e}")
-            return False
+        return self._commit(lambda: self._update_plan(session_id, hiring_plan), "updating session plan")
+
+    async def aupdate_session_plan(self, session_id: str, hiring_plan: Dict) -> bool:
+        return await self._acommit(lambda: self._update_plan(session_id, hiring_plan), "updating session plan")
     
     def add_chat_message(self, session_id: str, user_message: str, ai_response: str) -> bool:
         """Add chat message to session"""
-        try:
-            sessions = self._load_sessions()
-            if session_id in sessions:
-                if "messages" not in sessions[session_id]:
-                    sessions[session_id]["messages"] = []
-                
-                sessions[session_id]["messages"].append({
-                    "timestamp": datetime.now().isoformat(),
-                    "user_message": user_message,
-                    "ai_response": ai_response
-                })
-                
-                sessions[session_id]["updated_at"] = datetime.now().isoformat()
-                self._save_sessions(sessions)
-                return True
-            return False
-        except Exception as e:
-            print(f"Error adding chat message: {e}")
-            return False
-    
+        return self._commit(lambda: self._add_message(session_id, user_message, ai_response), "adding chat message")
+
+    async def aadd_chat_message(self, session_id: str, user_message: str, ai_response: str) -> bool:
+        return await self._acommit(
+            lambda: self._add_message(session_id, user_message, ai_response), "adding chat message"
+        )
+
     def list_sessions(self) -> List[Dict]:
-        """List all sessions with summary info"""
+        """List all sessions with summary info, newest first"""
+        return self.list_sessions_page()[0]
+
+    def list_sessions_page(self, limit: Optional[int] = None, cursor: Optional[str] = None,
+                           status: Optional[str] = None,
+                           has_hiring_plan: Optional[bool] = None,
+                           fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        """List one page of session summaries, restricted to ``fields`` if given, and the cursor of the next page"""
         try:
-            sessions = self._load_sessions()
-            session_list = []
-            
-            for session_id, data in sessions.items():
-                session_list.append({
-                    "session_id": session_id,
-                    "created_at": data.get("created_at"),
-                    "updated_at": data.get("updated_at"),
-                    "status": data.get("status"),
-                    "has_hiring_plan": bool(data.get("hiring_plan")),
-                    "message_count": len(data.get("messages", []))
-                })
-            
-            # Sort by creation date, newest first
-            session_list.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-            return session_list
-            
+            page = self.store.list_summaries(limit=limit, cursor=cursor, status=status, has_hiring_plan=has_hiring_plan)
+            if len(self.archive):
+                cold = self.archive.list(limit=limit, cursor=cursor, status=status, has_hiring_plan=has_hiring_plan)
+                page = self._merge_pages(page, cold, limit)
+            if fields:
+                projection = parse_fields(fields, self.FIELD_ALIASES)
+                page = ([project(summary, projection) for summary in page[0]], page[1])
+            return page
         except Exception as e:
             print(f"Error listing sessions: {e}")
-            return []
+            return [], None
+
+    def archive_idle_sessions(self, idle_for: Optional[float] = None) -> int:
+        """Move sessions not updated for ``idle_for`` seconds into the archive"""
+        idle_for = idle_for if idle_for is not None else self.archive_after
+        if not idle_for:
+            return 0
+        cutoff = (datetime.now() - timedelta(seconds=idle_for)).isoformat()
+        try:
+            summaries, _ = self.store.list_summaries()
+            idle = [s["session_id"] for s in summaries if (s.get("updated_at") or s.get("created_at") or "") < cutoff]
+            archived = 0
+            for start in range(0, len(idle), self.ARCHIVE_BATCH):
+                batch = idle[start:start + self.ARCHIVE_BATCH]
+                archived += self._submit(lambda batch=batch: self._archive(batch, cutoff)).result()
+            return archived
+        except Exception as e:
+            print(f"Error archiving sessions: {e}")
+            return 0
     
+    def sweep_blobs(self) -> int:
+        """Delete plan blobs that no hot or archived session refers to any more"""
+        if not self.blobs:
+            return 0
+        try:
+            # Started on the writer thread, so every write committed after it pins its blobs
+            self._submit(self.blobs.begin_sweep).result()
+            return self.blobs.sweep(self._stored_plans())
+        except Exception as e:
+            print(f"Error sweeping plan blobs: {e}")
+            return 0
+
     def delete_session(self, session_id: str) -> bool:
         """Delete a session"""
+        return self._commit(lambda: self._delete(session_id), "deleting session")
+
+    async def adelete_session(self, session_id: str) -> bool:
+        return await self._acommit(lambda: self._delete(session_id), "deleting session")
+
+    def stats(self) -> Dict:
+        """Storage statistics for the analytics endpoint"""
+        stats = {
+            "backend": self.backend,
+            "session_cache": self.cache.stats()
+        }
+        if self.commit_queue:
+            stats["commit_queue"] = self.commit_queue.stats()
+        if self.blobs:
+            stats["plan_blobs"] = self.blobs.stats()
+        with self._archive_stats_lock:
+            stats["archive"] = dict(
+                self.archive.stats(),
+                archived=self._archive_stats["archived"],
+                restored=self._archive_stats["restored"],
+                archive_latency_ms=self._latency_summary(self._archive_stats["archive_ms"]),
+                restore_latency_ms=self._latency_summary(self._archive_stats["restore_ms"])
+            )
+        return stats
+
+    def close(self):
+        """Commit queued writes, then flush and release the storage backend"""
+        self._background_stop.set()
+        if self._archiver:
+            self._archiver.join()
+        if self._blob_sweeper:
+            self._blob_sweeper.join()
+        if self.commit_queue:
+            self.commit_queue.close()
+        self.store.close()
+        self.archive.close()
+
+    # Mutations below run on the commit-queue writer thread
+
+    def _create(self, session_id: str, session_data: Dict) -> bool:
+        if session_data.get("hiring_plan") and self.blobs:
+            session_data = dict(session_data, hiring_plan=self.blobs.pack(session_data["hiring_plan"]))
+        with self._lock_for(session_id):
+            self.store.create(session_id, session_data)
+            self.cache.invalidate(session_id)
+        return True
+
+    def _update_plan(self, session_id: str, hiring_plan: Dict) -> bool:
+        now = datetime.now().isoformat()
+        stored_plan = self.blobs.pack(hiring_plan) if self.blobs else hiring_plan
+        self._ensure_hot(session_id)
+        with self._lock_for(session_id):
+            if not self.store.update_plan(session_id, stored_plan, now):
+                return False
+            cached = self.cache.peek(session_id)
+            if cached is not None:
+                cached["hiring_plan"] = stored_plan
+                cached["updated_at"] = now
+                size = self._session_size(cached)
+                cached["hiring_plan"] = self._unpack_plan(stored_plan)
+                self.cache.put(session_id, cached, size)
+        return True
+
+    def _add_message(self, session_id: str, user_message: str, ai_response: str) -> bool:
+        # Stamped by the writer so timestamps follow commit order
+        now = datetime.now().isoformat()
+        message = {
+            "timestamp": now,
+            "user_message": user_message,
+            "ai_response": ai_response
+        }
+        self._ensure_hot(session_id)
+        with self._lock_for(session_id):
+            if not self.store.add_message(session_id, message, now):
+                return False
+            cached = self.cache.peek(session_id)
+            if cached is not None:
+                recent = cached["messages"]
+                recent.append(message)
+                delta = self._session_size(message)
+                while len(recent) > self.recent_messages:
+                    delta -= self._session_size(recent.pop(0))
+                cached["message_count"] = cached.get("message_count", 0) + 1
+                cached["updated_at"] = now
+                self.cache.resize(session_id, delta)
+        return True
+
+    def _delete(self, session_id: str) -> bool:
+        with self._lock_for(session_id):
+            deleted = self.store.delete(session_id)
+            deleted = self.archive.remove(session_id) or deleted
+            self.cache.invalidate(session_id)
+        return deleted
+
+    def _archive(self, session_ids: List[str], cutoff: str) -> int:
+        """Move one batch of idle sessions to a new archive segment"""
+        started = time.perf_counter()
+        sessions, summaries = {}, {}
+        for session_id in session_ids:
+            with self._lock_for(session_id):
+                data = self.store.get(session_id)
+                if data is None or (data.get("updated_at") or data.get("created_at") or "") >= cutoff:
+                    # Deleted or written to since it was picked
+                    continue
+                summaries[session_id] = session_summary(session_id, data)
+                data.pop("message_count", None)
+                data["messages"] = self.store.get_messages(session_id)[0]
+                sessions[session_id] = data
+        if not sessions:
+            return 0
+        if self.blobs:
+            for data in sessions.values():
+                self.blobs.pin(data.get("hiring_plan"))
+
+        # The segment is durable before the hot copies go; after a crash in
+        # between the hot copy simply wins
+        self.archive.archive(sessions, summaries)
+        for session_id in sessions:
+            with self._lock_for(session_id):
+                self.store.delete(session_id)
+                self.cache.invalidate(session_id)
+        self._record_archive_latency("archive", len(sessions), started)
+        return len(sessions)
+
+    def _restore(self, session_id: str) -> bool:
+        """Fault an archived session back into the hot store"""
+        started = time.perf_counter()
+        with self._lock_for(session_id):
+            if self.store.get(session_id) is None:
+                data = self.archive.read(session_id)
+                if data is None:
+                    return False
+                if self.blobs:
+                    self.blobs.pin(data.get("hiring_plan"))
+                self.store.create(session_id, data)
+            self.archive.remove(session_id)
+        self._record_archive_latency("restore", 1, started)
+        return True
+
+    def _ensure_hot(self, session_id: str):
+        if session_id in self.archive:
+            self._restore(session_id)
+
+    async def _arestore(self, session_id: str):
+        """Restore an archived session through the writer, awaiting the commit instead of blocking on it"""
+        if session_id in self.archive and self.cache.peek(session_id) is None:
+            await self._acommit(lambda: self._restore(session_id), "restoring session")
+
+    def _archive_loop(self, interval: float):
+        while not self._background_stop.wait(interval):
+            self.archive_idle_sessions()
+
+    def _blob_sweep_loop(self, interval: float):
+        while not self._background_stop.wait(interval):
+            self.sweep_blobs()
+
+    def _stored_plans(self) -> Iterator[Dict]:
+        """The packed plan of every hot and archived session"""
+        summaries, _ = self.store.list_summaries(has_hiring_plan=True)
+        for summary in summaries:
+            session = self.store.get(summary["session_id"], fields=["hiring_plan"])
+            if session and session.get("hiring_plan"):
+                yield session["hiring_plan"]
+        for _, data in self.archive.iter_sessions():
+            if data.get("hiring_plan"):
+                yield data["hiring_plan"]
+
+    def _record_archive_latency(self, kind: str, count: int, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._archive_stats_lock:
+            self._archive_stats["archived" if kind == "archive" else "restored"] += count
+            samples = self._archive_stats[f"{kind}_ms"]
+            samples.append(elapsed_ms)
+            del samples[:-1000]
+
+    @staticmethod
+    def _latency_summary(samples: List[float]) -> Dict:
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "avg": round(sum(samples) / len(samples), 2),
+            "max": round(max(samples), 2),
+            "last": round(samples[-1], 2)
+        }
+
+    @staticmethod
+    def _merge_pages(hot: Tuple[List[Dict], Optional[str]], cold: Tuple[List[Dict], Optional[str]],
+                     limit: Optional[int]) -> Tuple[List[Dict], Optional[str]]:
+        """Merge two newest-first summary pages that share the same keyset cursor.
+
+        A crash between writing a session to the archive and deleting it from
+        the hot store can leave it in both; the hot copy wins.
+        """
+        key = lambda s: (s.get("created_at") or "", s["session_id"])
+        hot_ids = {summary["session_id"] for summary in hot[0]}
+        cold_only = [summary for summary in cold[0] if summary["session_id"] not in hot_ids]
+        merged = sorted(hot[0] + cold_only, key=key, reverse=True)
+        if limit is None or (len(merged) <= limit and not hot[1] and not cold[1]):
+            return merged, None
+        page = merged[:limit]
+        if not page:
+            return page, None
+        return page, encode_cursor(page[-1]["created_at"], page[-1]["session_id"])
+
+    def _submit(self, mutation: Callable[[], Any]) -> Future:
+        """Queue a mutation, or apply and sync it directly without group commit"""
+        if self.commit_queue:
+            return self.commit_queue.submit(mutation)
+        future: Future = Future()
         try:
-            sessions = self._load_sessions()
-            if session_id in sessions:
-                del sessions[session_id]
-                self._save_sessions(sessions)
-                return True
-            return False
+            result = mutation()
+            self.store.sync()
+            future.set_result(result)
         except Exception as e:
-            print(f"Error deleting session: {e}")
-            return False
-    
-    def _load_sessions(self) -> Dict:
-        """Load sessions from file"""
+            future.set_exception(e)
+        return future
+
+    def _commit(self, mutation: Callable[[], Any], action: str) -> bool:
         try:
-            with open(self.sessions_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-    
-    def _save_sessions(self, sessions: Dict) -> bool:
-        """Save sessions to file"""
+            with latency_recorder.time("store", "write"):
+                return self._submit(mutation).result()
+        except Exception as e:
+            print(f"Error {action}: {e}")
+            return False
+
+    async def _acommit(self, mutation: Callable[[], Any], action: str) -> bool:
         try:
-            with open(self.sessions_file, 'w') as f:
-                json.dump(sessions, f, indent=2)
-            return True
+            with latency_recorder.time("store", "write"):
+                return await asyncio.wrap_future(self._submit(mutation))
         except Exception as e:
-            print(f"Error saving sessions: {e}")
+            print(f"Error {action}: {e}")
             return False
+
+    def _load_cached(self, session_id: str,
+                     projection: Optional[Projection] = None) -> Optional[Tuple[Dict, List[Dict]]]:
+        """Copy of the cached session and its recent messages, filling the cache on a miss.
+
+        A miss for a projection without ``messages`` reads only the requested
+        fields from the store (metadata alone never loads the plan), resolves
+        only the requested plan sections, and leaves the cache alone.
+        """
+        with self._lock_for(session_id):
+            cached = self.cache.get(session_id)
+            if cached is None and projection is not None and "messages" not in projection:
+                with latency_recorder.time("store", "read"):
+                    session = self.store.get(session_id, fields=list(projection))
+                if session is None:
+                    return None
+                plan_fields = projection.get("hiring_plan")
+                if plan_fields and session.get("hiring_plan"):
+                    # Sections are blob references at the plan's top level; resolve only the selected ones
+                    plan = session["hiring_plan"]
+                    if plan_fields is not True:
+                        plan = {key: plan[key] for key in plan_fields if key in plan}
+                    session["hiring_plan"] = copy.deepcopy(self._unpack_plan(plan))
+                return session, []
+            if cached is None:
+                # Filled under the lock so a concurrent write can't be overwritten by a stale read
+                with latency_recorder.time("store", "read"):
+                    cached = self.store.get(session_id)
+                    if cached is None:
+                        return None
+                    cached["messages"] = self.store.get_messages(session_id, limit=self.recent_messages)[0]
+                # Sized while packed: shared plan sections are accounted to the blob intern
+                size = self._session_size(cached)
+                cached["hiring_plan"] = self._unpack_plan(cached.get("hiring_plan"))
+                self.cache.put(session_id, cached, size)
+            # The plan's sections are shared with other sessions and the messages with the cache
+            session = dict(cached)
+            if projection is None or "hiring_plan" in projection:
+                session["hiring_plan"] = copy.deepcopy(cached.get("hiring_plan"))
+            if projection is None or "messages" in projection:
+                return session, copy.deepcopy(cached["messages"])
+            return session, []
+
+    def _unpack_plan(self, plan: Optional[Dict]) -> Optional[Dict]:
+        if plan and self.blobs:
+            return self.blobs.unpack(plan)
+        return plan
+
+    def _lock_for(self, session_id: str) -> threading.Lock:
+        return self._session_locks[hash(session_id) % self.LOCK_STRIPES]
+
+    @staticmethod
+    def _page_recent(session: Dict, recent: List[Dict], limit: Optional[int], cursor: Optional[str],
+                     since: Optional[str]) -> Optional[Tuple[List[Dict], Optional[str]]]:
+        """Serve a page of history from the cached tail, or None if it isn't covered"""
+        count = session.get("message_count", len(recent))
+        first_cached = count - len(recent)
+
+        if since is not None:
+            if first_cached > 0 and (not recent or (recent[0].get("timestamp") or "") > since):
+                return None
+            end = count if cursor is None else max(0, min(count, int(cursor)))
+            newer = [m for m in recent[:max(0, end - first_cached)] if (m.get("timestamp") or "") > since]
+            if limit is not None:
+                newer = newer[-limit:] if limit else []
+            return newer, None
+
+        end = count if cursor is None else max(0, min(count, int(cursor)))
+        start = 0 if limit is None else max(0, end - limit)
+        if start < first_cached:
+            return None
+        return recent[start - first_cached:end - first_cached], (str(start) if start > 0 else None)
+
+    @staticmethod
+    def _session_size(value) -> int:
+        """Approximate in-memory footprint by serialized length"""
+        return len(json.dumps(value, default=str))
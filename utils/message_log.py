@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional, Tuple
+
+class MessageLog:
+    """Append-only, segmented chat history per session.
+
+    Messages of a session are written as NDJSON lines into fixed-size
+    segment files (``<root>/<bucket>/<session_id>/00000000.ndjson``), so an
+    append touches only the last segment and reading the last N messages
+    only opens the segments that hold them. Cursors are message positions:
+    a page starting at position ``p`` returns ``str(p)`` as the cursor of
+    the next (older) page.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, root_dir: str, segment_size: int = 100):
+        self.root_dir = root_dir
+        self.segment_size = segment_size
+        os.makedirs(root_dir, exist_ok=True)
+        self._counts: Dict[str, int] = {}
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def append(self, session_id: str, message: Dict) -> int:
+        """Append one message and return the new message count"""
+        with self._lock_for(session_id):
+            count = self._count(session_id)
+            path = self._segment_path(session_id, count // self.segment_size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(message) + "\n")
+            with self._dirty_lock:
+                self._dirty.add(path)
+            self._counts[session_id] = count + 1
+            return count + 1
+
+    def extend(self, session_id: str, messages: List[Dict]) -> int:
+        """Append several messages, e.g. when importing inline history"""
+        count = self.count(session_id)
+        for message in messages:
+            count = self.append(session_id, message)
+        return count
+
+    def count(self, session_id: str) -> int:
+        with self._lock_for(session_id):
+            return self._count(session_id)
+
+    def read(self, session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+             since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Read messages in chronological order.
+
+        ``limit`` returns the newest ``limit`` messages before ``cursor``
+        (or the end). ``since`` keeps only messages with a later timestamp;
+        it is meant for polling and never yields a next cursor.
+        """
+        with self._lock_for(session_id):
+            end = self._count(session_id)
+            if cursor is not None:
+                end = max(0, min(end, int(cursor)))
+            start = 0 if limit is None else max(0, end - limit)
+
+            if since is not None:
+                messages = self._read_range_since(session_id, end, since)
+                if limit is not None:
+                    messages = messages[-limit:] if limit else []
+                return messages, None
+
+            messages = self._read_range(session_id, start, end)
+            return messages, (str(start) if start > 0 else None)
+
+    def sync(self):
+        """fsync every segment appended to since the last sync"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def delete(self, session_id: str):
+        with self._lock_for(session_id):
+            shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+            self._counts.pop(session_id, None)
+
+    def _read_range(self, session_id: str, start: int, end: int) -> List[Dict]:
+        messages = []
+        if start >= end:
+            return messages
+        first_segment = start // self.segment_size
+        last_segment = (end - 1) // self.segment_size
+        for segment in range(first_segment, last_segment + 1):
+            base = segment * self.segment_size
+            for offset, message in enumerate(self._read_segment(session_id, segment)):
+                if start <= base + offset < end:
+                    messages.append(message)
+        return messages
+
+    def _read_range_since(self, session_id: str, end: int, since: str) -> List[Dict]:
+        """Walk segments backwards until one starts at or before ``since``"""
+        messages = []
+        if end == 0:
+            return messages
+        for segment in range((end - 1) // self.segment_size, -1, -1):
+            base = segment * self.segment_size
+            segment_messages = [
+                m for offset, m in enumerate(self._read_segment(session_id, segment))
+                if base + offset < end
+            ]
+            newer = [m for m in segment_messages if (m.get("timestamp") or "") > since]
+            messages = newer + messages
+            if len(newer) < len(segment_messages):
+                break
+        return messages
+
+    def _read_segment(self, session_id: str, segment: int) -> List[Dict]:
+        messages = []
+        try:
+            with open(self._segment_path(session_id, segment), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        messages.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn append from a crash
+                        break
+        except FileNotFoundError:
+            pass
+        return messages
+
+    def _count(self, session_id: str) -> int:
+        """Message count, learned from the segment files on first use"""
+        count = self._counts.get(session_id)
+        if count is not None:
+            return count
+
+        count = 0
+        session_dir = self._session_dir(session_id)
+        if os.path.isdir(session_dir):
+            segments = sorted(name for name in os.listdir(session_dir) if name.endswith(".ndjson"))
+            if segments:
+                last_segment = int(segments[-1].split(".")[0])
+                self._repair_segment(self._segment_path(session_id, last_segment))
+                count = last_segment * self.segment_size + len(self._read_segment(session_id, last_segment))
+        self._counts[session_id] = count
+        return count
+
+    @staticmethod
+    def _repair_segment(path: str):
+        """Drop a torn trailing line so the next append starts on a fresh line"""
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _lock_for(self, session_id: str) -> threading.Lock:
+        return self._locks[hash(session_id) % self.LOCK_STRIPES]
+
+    def _session_dir(self, session_id: str) -> str:
+        bucket = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root_dir, bucket, session_id)
+
+    def _segment_path(self, session_id: str, segment: int) -> str:
+        return os.path.join(self._session_dir(session_id), f"{segment:08d}.ndjson")
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.latency import latency_recorder
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Latency recorder groups exported as Prometheus histograms: metric name, help
+# text and the label the recorded name goes into
+LATENCY_HISTOGRAMS = {
+    "endpoint": ("hr_agent_http_request_duration_seconds", "HTTP request latency by route", "route"),
+    "step": ("hr_agent_workflow_step_duration_seconds", "Hiring workflow step latency", "step"),
+    "agent": ("hr_agent_agent_duration_seconds", "Agent processing latency", "agent"),
+    "llm": ("hr_agent_llm_call_duration_seconds", "LLM call latency by agent", "agent"),
+    "llm_first_token": ("hr_agent_llm_first_token_seconds", "Time to first streamed LLM token by agent", "agent"),
+    "store": ("hr_agent_session_store_duration_seconds", "Session store read/write latency", "operation"),
+    "event_loop": ("hr_agent_event_loop_lag_seconds", "Event loop scheduling lag", "loop"),
+    "job_wait": ("hr_agent_job_wait_seconds", "Time background jobs spend queued, by kind", "kind"),
+    "job_run": ("hr_agent_job_run_seconds", "Background job run time, by kind", "kind"),
+    "rate_limit": ("hr_agent_rate_limit_wait_seconds", "Time spent waiting for an outbound rate limit", "limiter"),
+}
+
+HISTOGRAM_BOUNDS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+class MetricsRegistry:
+    """In-memory counters and gauges rendered in the Prometheus text format.
+
+    Updates are a dict lookup and an add under a lock. Histograms are not
+    stored here: they are rendered from the shared ``latency_recorder`` at
+    scrape time. Collectors registered with ``register_collector`` add
+    samples read from other components' own counters (cache hit counts and
+    the like), so nothing is read from disk when scraping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict, float]]]] = []
+
+    def counter(self, name: str, help_text: str):
+        self._define(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str):
+        self._define(name, "gauge", help_text)
+
+    def inc(self, name: str, labels: Optional[Dict] = None, value: float = 1):
+        key = self._labels(labels)
+        with self._lock:
+            samples = self._metrics[name]["samples"]
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: Optional[Dict] = None):
+        key = self._labels(labels)
+        with self._lock:
+            self._metrics[name]["samples"][key] = value
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict, float]]]):
+        """Add a callable yielding ``(name, type, help, labels, value)`` samples at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            metrics = {name: dict(metric, samples=dict(metric["samples"])) for name, metric in self._metrics.items()}
+
+        for collector in self._collectors:
+            try:
+                for name, metric_type, help_text, labels, value in collector():
+                    metric = metrics.setdefault(name, {"type": metric_type, "help": help_text, "samples": {}})
+                    metric["samples"][self._labels(labels)] = value
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+
+        for name, metric in metrics.items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for labels, value in metric["samples"].items():
+                lines.append(f"{name}{self._format_labels(labels)} {self._format_value(value)}")
+
+        exported = latency_recorder.export(HISTOGRAM_BOUNDS)
+        for group, (name, help_text, label) in LATENCY_HISTOGRAMS.items():
+            histograms = exported.get(group)
+            if not histograms:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for recorded_name, histogram in histograms.items():
+                labels = self._histogram_labels(group, label, recorded_name)
+                for bound, count in zip(HISTOGRAM_BOUNDS, histogram["buckets"]):
+                    lines.append(f"{name}_bucket{self._format_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {self._format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def _define(self, name: str, metric_type: str, help_text: str):
+        with self._lock:
+            self._metrics.setdefault(name, {"type": metric_type, "help": help_text, "samples": {}})
+
+    @staticmethod
+    def _histogram_labels(group: str, label: str, recorded_name: str) -> Labels:
+        if group == "endpoint":
+            # Endpoint latencies are recorded as "<METHOD> <route>"
+            method, _, route = recorded_name.partition(" ")
+            return (("method", method), ("route", route))
+        return ((label, recorded_name),)
+
+    @staticmethod
+    def _labels(labels: Optional[Dict]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+    @staticmethod
+    def _format_labels(labels: Labels) -> str:
+        if not labels:
+            return ""
+        escaped = (
+            f'{key}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for key, value in labels
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        if isinstance(value, float):
+            return repr(round(value, 6))
+        return str(value)
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Measure how late the event loop wakes up from a sleep, until cancelled"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+        latency_recorder.record("event_loop", "main", lag)
+        metrics.set("hr_agent_event_loop_lag_last_seconds", lag)
+
+# Shared by the API server, the agents and the tools
+metrics = MetricsRegistry()
+metrics.counter("hr_agent_http_requests_total", "HTTP requests by method, route and status")
+metrics.gauge("hr_agent_http_requests_in_flight", "HTTP requests currently being served")
+metrics.counter("hr_agent_llm_calls_total", "LLM calls by agent and outcome")
+metrics.counter("hr_agent_llm_tokens_total", "LLM tokens by agent and kind (prompt or completion)")
+metrics.counter("hr_agent_search_calls_total", "Web search calls by outcome")
+metrics.gauge("hr_agent_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+metrics.counter("hr_agent_jobs_total", "Background jobs by kind and status (queued, completed, failed)")
+metrics.counter("hr_agent_single_flight_calls_total", "Single-flight calls by name and whether they led or were coalesced")
+metrics.set("hr_agent_http_requests_in_flight", 0)
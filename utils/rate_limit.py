@@ -0,0 +1,44 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from utils.latency import latency_recorder
+
+class AsyncRateLimiter:
+    """Token bucket shared by every coroutine that calls ``acquire``.
+
+    Allows ``rate`` calls per second on average with bursts of up to
+    ``burst``. Waiters are served in arrival order. A rate of 0 disables
+    limiting. Time spent waiting is recorded in the ``rate_limit`` latency
+    group under the limiter's name.
+    """
+
+    def __init__(self, name: str, rate: float, burst: Optional[int] = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        started = time.perf_counter()
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+        latency_recorder.record("rate_limit", self.name, time.perf_counter() - started)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+# Process-wide limits on outbound calls, shared by single and batch requests
+llm_rate_limiter = AsyncRateLimiter("llm", float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "0")))
+search_rate_limiter = AsyncRateLimiter("search", float(os.getenv("SEARCH_RATE_LIMIT_PER_SECOND", "0")))
@@ -0,0 +1,69 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Hashable, Optional
+
+from utils.lru_cache import LRUCache
+
+class ResponseCache:
+    """Serialized response bodies keyed by the version of what they represent.
+
+    Each entry holds the JSON bytes and, for bodies of at least
+    ``gzip_min_bytes``, their gzip-compressed form, so serving a version
+    again costs neither encoding nor compression. Keys must change whenever
+    the content does; stale versions simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024,
+                 gzip_min_bytes: int = 1024, compresslevel: int = 6):
+        self.gzip_min_bytes = gzip_min_bytes
+        self.compresslevel = compresslevel
+        self._entries = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    @staticmethod
+    def etag(key: Hashable) -> str:
+        """Weak ETag for a key: equal keys always name equal content"""
+        return 'W/"' + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32] + '"'
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Optional[bytes]]]:
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, value: Any) -> Dict[str, Optional[bytes]]:
+        """Serialize (unless already bytes), compress if large enough and cache"""
+        if isinstance(value, bytes):
+            body = value
+        else:
+            body = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        compressed = None
+        if len(body) >= self.gzip_min_bytes:
+            compressed = gzip.compress(body, compresslevel=self.compresslevel, mtime=0)
+        entry = {"body": body, "gzip": compressed}
+        self._entries.put(key, entry, len(body) + len(compressed or b""))
+        return entry
+
+    @property
+    def hits(self) -> int:
+        return self._entries.hits
+
+    @property
+    def misses(self) -> int:
+        return self._entries.misses
+
+    def stats(self) -> Dict:
+        return self._entries.stats()
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip; an explicit ``gzip`` entry overrides ``*``"""
+    qualities = {}
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
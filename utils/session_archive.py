@@ -0,0 +1,147 @@
+import gzip
+import json
+import lzma
+import os
+import threading
+import uuid
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.session_index import SessionIndex
+
+class SessionArchive:
+    """Compressed cold storage for idle sessions.
+
+    Sessions are archived in batches: each ``archive`` call writes one
+    immutable segment file (``segment-00000001.ndjson.xz`` with lzma, or
+    ``.gz`` with gzip) holding the full sessions, plans and messages. A
+    ``SessionIndex`` of their summaries records which segment holds each
+    session, so archived sessions can still be listed and looked up without
+    opening any segment. A segment is removed once every session in it has
+    been restored or deleted.
+    """
+
+    CODECS = {"lzma": (lzma.open, ".xz"), "gzip": (gzip.open, ".gz")}
+
+    def __init__(self, root_dir: str, codec: str = "lzma"):
+        if codec not in self.CODECS:
+            raise ValueError(f"Unknown archive codec: {codec}")
+        self.root_dir = root_dir
+        self.codec = codec
+        os.makedirs(root_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.index = SessionIndex(root_dir, name="archive_index")
+        self._live = Counter(summary["segment"] for summary in self._summaries())
+        self._next_segment = max(self._segment_numbers(), default=0) + 1
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def archive(self, sessions: Dict[str, Dict], summaries: Dict[str, Dict]) -> str:
+        """Write full sessions into a new segment and index their summaries"""
+        with self._lock:
+            segment = self._segment_name(self._next_segment)
+            self._next_segment += 1
+            path = os.path.join(self.root_dir, segment)
+            tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+            opener = self.CODECS[self.codec][0]
+            with opener(tmp_file, 'wt', encoding='utf-8') as f:
+                for session_id, data in sessions.items():
+                    f.write(json.dumps({"session_id": session_id, "data": data}) + "\n")
+            with open(tmp_file, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_file, path)
+
+            for session_id in sessions:
+                self.index.put(dict(summaries[session_id], segment=segment))
+            self.index.sync()
+            self._live[segment] += len(sessions)
+            return segment
+
+    def read(self, session_id: str) -> Optional[Dict]:
+        """Decode one archived session from its segment"""
+        summary = self.index.get(session_id)
+        if summary is None:
+            return None
+        opener = self.CODECS[self._codec_of(summary["segment"])][0]
+        with opener(os.path.join(self.root_dir, summary["segment"]), 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record["session_id"] == session_id:
+                    return record["data"]
+        return None
+
+    def iter_sessions(self) -> Iterator[Tuple[str, Dict]]:
+        """Every archived session, decoding each live segment once"""
+        with self._lock:
+            segments = list(self._live)
+        for segment in segments:
+            opener = self.CODECS[self._codec_of(segment)][0]
+            try:
+                with opener(os.path.join(self.root_dir, segment), 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        record = json.loads(line)
+                        summary = self.index.get(record["session_id"])
+                        if summary is not None and summary["segment"] == segment:
+                            yield record["session_id"], record["data"]
+            except FileNotFoundError:
+                # Emptied and dropped since the listing
+                continue
+
+    def remove(self, session_id: str) -> bool:
+        """Forget an archived session, dropping its segment once it is empty"""
+        with self._lock:
+            summary = self.index.get(session_id)
+            if summary is None:
+                return False
+            self.index.remove(session_id)
+            self.index.sync()
+            segment = summary["segment"]
+            self._live[segment] -= 1
+            if self._live[segment] <= 0:
+                del self._live[segment]
+                try:
+                    os.remove(os.path.join(self.root_dir, segment))
+                except FileNotFoundError:
+                    pass
+            return True
+
+    def list(self, limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+             has_hiring_plan: Optional[bool] = None) -> Tuple[List[Dict], Optional[str]]:
+        summaries, next_cursor = self.index.list(
+            limit=limit, cursor=cursor, status=status, has_hiring_plan=has_hiring_plan
+        )
+        for summary in summaries:
+            summary.pop("segment", None)
+            summary["archived"] = True
+        return summaries, next_cursor
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"archived_sessions": len(self.index), "segments": len(self._live), "codec": self.codec}
+
+    def close(self):
+        self.index.close()
+
+    def _summaries(self) -> List[Dict]:
+        return [self.index.get(session_id) for session_id in self.index.session_ids()]
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.root_dir):
+            if name.startswith("segment-") and not name.endswith(".tmp"):
+                numbers.append(int(name.split("-")[1].split(".")[0]))
+        return numbers
+
+    def _segment_name(self, number: int) -> str:
+        return f"segment-{number:08d}.ndjson{self.CODECS[self.codec][1]}"
+
+    def _codec_of(self, segment: str) -> str:
+        # Segments keep the codec they were written with
+        for codec, (_, suffix) in self.CODECS.items():
+            if segment.endswith(suffix):
+                return codec
+        return self.codec
@@ -0,0 +1,208 @@
+import bisect
+import json
+import os
+import re
+import threading
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def encode_cursor(created_at: Optional[str], session_id: str) -> str:
+    """Encode a keyset pagination cursor for session listings"""
+    return f"{created_at or ''}|{session_id}"
+
+# What encode_cursor produces; server.py validates list cursors against it
+CURSOR_PATTERN = r"^[^|]*\|[^|]+$"
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Decode a cursor produced by encode_cursor; raises ValueError for anything else"""
+    if not cursor:
+        return None
+    if not re.match(CURSOR_PATTERN, cursor):
+        raise ValueError(f"Malformed session cursor: {cursor!r}")
+    created_at, session_id = cursor.rsplit("|", 1)
+    return created_at, session_id
+
+class SessionIndex:
+    """Persistent side index of session summaries.
+
+    The index is held in memory and persisted as a ``<name>.json`` snapshot
+    plus a ``<name>.log`` of appended summary updates. The snapshot is
+    rewritten once the log grows as large as the index, which keeps the
+    amortized cost of an update constant.
+
+    Summaries are kept in sorted ``(created_at, session_id)`` key lists, one
+    for all sessions and one per status and per has-plan value, so a listing
+    page is a slice of a pre-sorted list rather than a sort.
+    """
+
+    def __init__(self, storage_dir: str, name: str = "index", min_compact_threshold: int = 1000):
+        self.snapshot_file = os.path.join(storage_dir, f"{name}.json")
+        self.log_file = os.path.join(storage_dir, f"{name}.log")
+        self.min_compact_threshold = min_compact_threshold
+        self._lock = threading.RLock()
+        self._log_records = 0
+        self.loaded_from_disk = os.path.exists(self.snapshot_file) or os.path.exists(self.log_file)
+        self._entries = self._recover()
+        self._rebuild_order()
+        self._log = open(self.log_file, 'a', encoding='utf-8')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            summary = self._entries.get(session_id)
+            return dict(summary) if summary else None
+
+    def put(self, summary: Dict):
+        """Insert or replace the summary of one session"""
+        with self._lock:
+            old = self._entries.get(summary["session_id"])
+            if old is not None:
+                self._unlink(old)
+            self._entries[summary["session_id"]] = summary
+            self._link(summary)
+            self._append({"op": "put", "summary": summary})
+
+    def remove(self, session_id: str):
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                self._unlink(old)
+                self._append({"op": "remove", "session_id": session_id})
+
+    def replace_all(self, summaries: Iterable[Dict]):
+        """Reset the index to the given summaries and persist it"""
+        with self._lock:
+            self._entries = {summary["session_id"]: summary for summary in summaries}
+            self._rebuild_order()
+            self.compact()
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def list(self, limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+             has_hiring_plan: Optional[bool] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Summaries newest first, optionally filtered, paginated by keyset cursor"""
+        if limit is not None and limit < 1:
+            return [], None
+        with self._lock:
+            if status is not None and has_hiring_plan is not None:
+                by_status = self._by_status.get(status, [])
+                by_plan = self._by_plan[bool(has_hiring_plan)]
+                keys = by_status if len(by_status) <= len(by_plan) else by_plan
+            elif status is not None:
+                keys = self._by_status.get(status, [])
+            elif has_hiring_plan is not None:
+                keys = self._by_plan[bool(has_hiring_plan)]
+            else:
+                keys = self._order
+
+            after = decode_cursor(cursor)
+            position = bisect.bisect_left(keys, after) if after else len(keys)
+
+            page = []
+            while position > 0 and (limit is None or len(page) <= limit):
+                position -= 1
+                summary = self._entries[keys[position][1]]
+                if status is not None and summary.get("status") != status:
+                    continue
+                if has_hiring_plan is not None and bool(summary.get("has_hiring_plan")) != bool(has_hiring_plan):
+                    continue
+                page.append(dict(summary))
+
+        if limit is None or len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        return page, encode_cursor(page[-1]["created_at"], page[-1]["session_id"])
+
+    def compact(self):
+        """Rewrite the snapshot and truncate the log"""
+        with self._lock:
+            tmp_file = f"{self.snapshot_file}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self._entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            self._log.close()
+            self._log = open(self.log_file, 'w', encoding='utf-8')
+            self._log_records = 0
+
+    def sync(self):
+        """fsync appended updates"""
+        with self._lock:
+            if not self._log.closed:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._log.closed:
+                self._log.flush()
+                self._log.close()
+
+    @staticmethod
+    def _key(summary: Dict) -> Tuple[str, str]:
+        return summary.get("created_at") or "", summary["session_id"]
+
+    def _link(self, summary: Dict):
+        key = self._key(summary)
+        for keys in (self._order, self._by_status[summary.get("status")], self._by_plan[bool(summary.get("has_hiring_plan"))]):
+            if not keys or keys[-1] < key:
+                # New sessions are the newest, so this is the common case
+                keys.append(key)
+            else:
+                bisect.insort(keys, key)
+
+    def _unlink(self, summary: Dict):
+        key = self._key(summary)
+        for keys in (self._order, self._by_status[summary.get("status")], self._by_plan[bool(summary.get("has_hiring_plan"))]):
+            position = bisect.bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    def _rebuild_order(self):
+        self._order: List[Tuple[str, str]] = []
+        self._by_status: Dict[Optional[str], List[Tuple[str, str]]] = defaultdict(list)
+        self._by_plan: Dict[bool, List[Tuple[str, str]]] = {True: [], False: []}
+        for summary in sorted(self._entries.values(), key=self._key):
+            key = self._key(summary)
+            self._order.append(key)
+            self._by_status[summary.get("status")].append(key)
+            self._by_plan[bool(summary.get("has_hiring_plan"))].append(key)
+
+    def _append(self, record: Dict):
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+        self._log_records += 1
+        if self._log_records >= max(self.min_compact_threshold, len(self._entries)):
+            self.compact()
+
+    def _recover(self) -> Dict:
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = {}
+
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if record.get("op") == "put":
+                        entries[record["summary"]["session_id"]] = record["summary"]
+                    elif record.get("op") == "remove":
+                        entries.pop(record["session_id"], None)
+                    self._log_records += 1
+        except FileNotFoundError:
+            pass
+        return entries
@@ -0,0 +1,945 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+
+from utils.message_log import MessageLog
+from utils.session_index import SessionIndex, decode_cursor, encode_cursor
+from utils.snapshot_file import LazySessions, SnapshotFile
+
+def session_summary(session_id: str, data: Dict) -> Dict:
+    """Build the summary row returned by list_sessions"""
+    return {
+        "session_id": session_id,
+        "created_at": data.get("created_at"),
+        "updated_at": data.get("updated_at"),
+        "status": data.get("status"),
+        "has_hiring_plan": bool(data.get("hiring_plan")),
+        "message_count": data.get("message_count", len(data.get("messages") or []))
+    }
+
+# Session keys every backend can read without loading the session body
+META_FIELDS = ("created_at", "updated_at", "status", "message_count")
+
+def metadata_only(fields: Optional[Collection[str]]) -> bool:
+    """Whether a field selection can be answered from session metadata alone"""
+    return fields is not None and set(fields) <= set(META_FIELDS)
+
+def summary_fields(summary: Dict, fields: Collection[str]) -> Dict:
+    """The selected metadata fields of a session summary"""
+    return {key: summary[key] for key in fields if summary.get(key) is not None}
+
+class SessionStore:
+    """Interface implemented by MemoryManager storage backends.
+
+    Listings are ordered by ``created_at`` newest first and paginated with an
+    opaque keyset cursor, so a page costs the same wherever it starts.
+
+    ``get`` returns session metadata and plan with a ``message_count``; given
+    ``fields`` it must return at least those top-level keys and may skip
+    reading the rest, so a metadata-only selection never loads the plan. Chat
+    history is read separately through ``get_messages``, whose cursor is the
+    position of the oldest message returned. ``iter_sessions`` yields full
+    sessions including ``messages`` for migrations.
+
+    Mutations made inside ``batch()`` may be buffered and are made durable
+    together when the block exits; ``batch()`` is only ever entered by the
+    single commit-queue writer thread. Outside a batch each mutation is
+    written on its own and ``sync()`` makes it durable.
+    """
+
+    def create(self, session_id: str, session_data: Dict):
+        raise NotImplementedError
+
+    def get(self, session_id: str, fields: Optional[Collection[str]] = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def update_plan(self, session_id: str, hiring_plan: Dict, updated_at: str) -> bool:
+        raise NotImplementedError
+
+    def add_message(self, session_id: str, message: Dict, updated_at: str) -> bool:
+        raise NotImplementedError
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_summaries(self, limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+                       has_hiring_plan: Optional[bool] = None) -> Tuple[List[Dict], Optional[str]]:
+        raise NotImplementedError
+
+    def iter_sessions(self) -> Iterator[Tuple[str, Dict]]:
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        """Group the mutations made inside the block into one durable write"""
+        yield
+        self.sync()
+
+    def sync(self):
+        """Make every completed mutation durable"""
+        pass
+
+    def close(self):
+        pass
+
+class JsonSessionStore(SessionStore):
+    """Log-structured JSON file store.
+
+    Sessions live in memory. Every mutation is appended as one small JSON
+    record to ``sessions.log``; ``sessions.json`` is a snapshot that a
+    background compaction periodically rebuilds from the previous snapshot
+    plus the rotated log. At startup the view is rebuilt from snapshot + log.
+    Chat history is kept out of the snapshot in a segmented ``MessageLog``;
+    history stored inline by older versions is moved there on load.
+    Listings come from a ``SessionIndex`` persisted next to the snapshot and
+    updated on every mutation.
+    """
+
+    def __init__(self, storage_dir: str = "data", compact_threshold: int = 1000):
+        self.storage_dir = storage_dir
+        self.sessions_file = os.path.join(storage_dir, "sessions.json")
+        self.log_file = os.path.join(storage_dir, "sessions.log")
+        self.compacting_log_file = self.log_file + ".1"
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._log_records = 0
+        self._in_batch = False
+        
+        # Initialize sessions file if it doesn't exist
+        if not os.path.exists(self.sessions_file):
+            with open(self.sessions_file, 'w') as f:
+                json.dump({}, f)
+        
+        self.messages = MessageLog(os.path.join(storage_dir, "messages"))
+        self._sessions = self._recover()
+        self._externalize_messages(self._sessions)
+        self._log = open(self.log_file, 'a', encoding='utf-8')
+
+        self.index = SessionIndex(storage_dir, name="session_index")
+        self._verify_index()
+
+    def create(self, session_id: str, session_data: Dict):
+        data = dict(session_data)
+        inline_messages = data.pop("messages", None) or []
+        with self._lock:
+            data["message_count"] = self.messages.extend(session_id, inline_messages)
+            self._append({"op": "create", "session_id": session_id, "data": data})
+            self._sessions[session_id] = data
+            self.index.put(session_summary(session_id, data))
+
+    def get(self, session_id: str, fields: Optional[Collection[str]] = None) -> Optional[Dict]:
+        with self._lock:
+            if metadata_only(fields):
+                # Answered from the index; the indexed store never decodes the snapshot line
+                summary = self.index.get(session_id)
+                return summary_fields(summary, fields) if summary else None
+            session = self._sessions.get(session_id)
+            return dict(session) if session is not None else None
+
+    def update_plan(self, session_id: str, hiring_plan: Dict, updated_at: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            record = {
+                "op": "plan",
+                "session_id": session_id,
+                "hiring_plan": hiring_plan,
+                "updated_at": updated_at
+            }
+            self._append(record)
+            self._apply(self._sessions, record)
+            self.index.put(session_summary(session_id, self._sessions[session_id]))
+            return True
+
+    def add_message(self, session_id: str, message: Dict, updated_at: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            record = {
+                "op": "messages",
+                "session_id": session_id,
+                "message_count": self.messages.append(session_id, message),
+                "updated_at": updated_at
+            }
+            self._append(record)
+            self._apply(self._sessions, record)
+            self.index.put(session_summary(session_id, self._sessions[session_id]))
+            return True
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        if session_id not in self._sessions:
+            return [], None
+        return self.messages.read(session_id, limit=limit, cursor=cursor, since=since)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            record = {"op": "delete", "session_id": session_id}
+            self._append(record)
+            self._apply(self._sessions, record)
+            self.index.remove(session_id)
+            self.messages.delete(session_id)
+            return True
+
+    def list_summaries(self, limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+                       has_hiring_plan: Optional[bool] = None) -> Tuple[List[Dict], Optional[str]]:
+        return self.index.list(limit=limit, cursor=cursor, status=status, has_hiring_plan=has_hiring_plan)
+
+    def iter_sessions(self) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            data = self.get(session_id)
+            if data is None:
+                continue
+            data["messages"] = self.messages.read(session_id)[0]
+            yield session_id, data
+
+    def compact(self, wait: bool = True) -> bool:
+        """Fold the mutation log into a new snapshot.
+
+        The active log is rotated under the lock, so writers are only blocked
+        for a rename; the snapshot itself is rebuilt from disk in a background
+        thread. Returns False if a compaction is already running.
+        """
+        with self._lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return False
+            if os.path.exists(self.compacting_log_file):
+                # A previous compaction crashed; its log is still pending
+                pass
+            elif self._log_records == 0:
+                return True
+            else:
+                self._log.close()
+                os.replace(self.log_file, self.compacting_log_file)
+                self._log = open(self.log_file, 'a', encoding='utf-8')
+                self._log_records = 0
+                self._rotated()
+
+            self._compaction_thread = threading.Thread(
+                target=self._write_snapshot, name="sessions-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+            thread = self._compaction_thread
+
+        if wait:
+            thread.join()
+        return True
+
+    @contextmanager
+    def batch(self):
+        """Buffer log appends and flush + fsync them once at the end"""
+        self._in_batch = True
+        try:
+            yield
+        finally:
+            self._in_batch = False
+        self.sync()
+
+    def sync(self):
+        with self._lock:
+            if not self._log.closed:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            self.index.sync()
+        self.messages.sync()
+
+    def close(self):
+        """Flush the log and wait for a running compaction"""
+        with self._lock:
+            thread = self._compaction_thread
+        if thread:
+            thread.join()
+        with self._lock:
+            if not self._log.closed:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
+            self.index.close()
+
+    def _verify_index(self):
+        # get() rather than items() so a lazily loaded view isn't pulled into memory
+        summaries = [session_summary(session_id, self._sessions.get(session_id)) for session_id in list(self._sessions)]
+        if len(summaries) != len(self.index) or any(self.index.get(s["session_id"]) != s for s in summaries):
+            # Missing or behind the log after a crash; startup is O(sessions) anyway
+            self.index.replace_all(summaries)
+
+    def _rotated(self):
+        """Called under the lock once the active log has been rotated for compaction"""
+        pass
+
+    def _append(self, record: Dict):
+        """Append one mutation record to the log"""
+        self._log.write(json.dumps(record) + "\n")
+        if not self._in_batch:
+            self._log.flush()
+        self._log_records += 1
+        if self._log_records >= self.compact_threshold:
+            self.compact(wait=False)
+
+    @staticmethod
+    def _apply(sessions: Dict, record: Dict):
+        """Apply a mutation record to a sessions dict"""
+        op = record.get("op")
+        session_id = record.get("session_id")
+
+        if op == "create":
+            sessions[session_id] = record["data"]
+        elif op == "delete":
+            sessions.pop(session_id, None)
+        elif session_id in sessions:
+            session = sessions[session_id]
+            if op == "plan":
+                session["hiring_plan"] = record["hiring_plan"]
+                session["updated_at"] = record["updated_at"]
+            elif op == "messages":
+                session["message_count"] = record["message_count"]
+                session["updated_at"] = record["updated_at"]
+            elif op == "message":
+                # Inline history written before chat moved to the MessageLog
+                messages = session.get("messages")
+                if messages is None:
+                    messages = session["messages"] = []
+                if record.get("index", len(messages)) == len(messages):
+                    messages.append(record["message"])
+                    session["updated_at"] = record["updated_at"]
+
+    def _recover(self) -> Dict:
+        """Rebuild the in-memory view from snapshot plus logs"""
+        sessions = self._load_sessions()
+        self._replay(self.compacting_log_file, sessions)
+        self._log_records = self._replay(self.log_file, sessions)
+        return sessions
+
+    def _externalize_messages(self, sessions: Dict):
+        """Move inline chat history into the MessageLog"""
+        for session_id, session in sessions.items():
+            if "messages" not in session:
+                continue
+            inline_messages = session.pop("messages") or []
+            if inline_messages and self.messages.count(session_id) == 0:
+                self.messages.extend(session_id, inline_messages)
+            session["message_count"] = self.messages.count(session_id)
+
+    def _replay(self, path: str, sessions: Dict, touched: Optional[set] = None) -> int:
+        """Replay a log file onto sessions, returning the number of records"""
+        count = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write from a crash; everything before it is intact
+                        break
+                    self._apply(sessions, record)
+                    if touched is not None:
+                        touched.add(record.get("session_id"))
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    def _write_snapshot(self):
+        """Build a new snapshot from the old one plus the rotated log"""
+        try:
+            sessions = self._load_sessions()
+            self._replay(self.compacting_log_file, sessions)
+            self._externalize_messages(sessions)
+            if self._save_sessions(sessions):
+                os.remove(self.compacting_log_file)
+        except Exception as e:
+            print(f"Error compacting sessions: {e}")
+
+    def _load_sessions(self) -> Dict:
+        """Load sessions snapshot from file"""
+        try:
+            with open(self.sessions_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _save_sessions(self, sessions: Dict) -> bool:
+        """Atomically replace the sessions snapshot"""
+        try:
+            SnapshotFile.write(self.sessions_file, ((sid, json.dumps(data)) for sid, data in sessions.items()))
+            return True
+        except Exception as e:
+            print(f"Error saving sessions: {e}")
+            return False
+
+class IndexedJsonSessionStore(JsonSessionStore):
+    """JSON store that reads single sessions without loading the snapshot.
+
+    Uses the same files as ``JsonSessionStore``, but ``sessions.json`` is
+    mapped with ``mmap`` and its offsets sidecar lets ``get`` decode only the
+    requested session, so a lookup costs the same however many sessions the
+    file holds. Sessions changed since the last snapshot are kept in an
+    in-memory overlay that compaction folds into the next snapshot. A
+    snapshot in an older layout is rewritten once at startup.
+    """
+
+    def __init__(self, storage_dir: str = "data", compact_threshold: int = 1000):
+        # Sessions written since the last log rotation; their overlay state
+        # is newer than any snapshot being compacted
+        self._touched = set()
+        super().__init__(storage_dir, compact_threshold)
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._sessions.base.close()
+
+    def _recover(self) -> LazySessions:
+        base = SnapshotFile(self.sessions_file)
+        if base.legacy:
+            base.close()
+            sessions = self._load_sessions()
+            self._externalize_messages(sessions)
+            self._save_sessions(sessions)
+            base = SnapshotFile(self.sessions_file)
+        sessions = LazySessions(base)
+        self._replay(self.compacting_log_file, sessions)
+        self._log_records = self._replay(self.log_file, sessions, self._touched)
+        return sessions
+
+    def _externalize_messages(self, sessions: Dict):
+        # Snapshot lines never carry inline history; only logged sessions can
+        super()._externalize_messages(sessions.overlay if isinstance(sessions, LazySessions) else sessions)
+
+    def _verify_index(self):
+        if not self.index.loaded_from_disk or len(self.index) != len(self._sessions):
+            super()._verify_index()
+            return
+        # Only sessions replayed from the logs can be ahead of the index
+        for session_id in set(self._sessions.overlay) | self._sessions.deleted:
+            data = self._sessions.get(session_id)
+            if data is None:
+                self.index.remove(session_id)
+            elif self.index.get(session_id) != session_summary(session_id, data):
+                self.index.put(session_summary(session_id, data))
+
+    def _rotated(self):
+        self._touched = set()
+
+    def _append(self, record: Dict):
+        self._touched.add(record.get("session_id"))
+        super()._append(record)
+
+    def _write_snapshot(self):
+        """Stream the old snapshot plus the rotated log into a new snapshot"""
+        try:
+            previous = LazySessions(SnapshotFile(self.sessions_file))
+            self._replay(self.compacting_log_file, previous)
+            self._externalize_messages(previous)
+            SnapshotFile.write(self.sessions_file, previous.encoded_items())
+            previous.base.close()
+            with self._lock:
+                self._sessions.rebase(SnapshotFile(self.sessions_file), keep=self._touched)
+            os.remove(self.compacting_log_file)
+        except Exception as e:
+            print(f"Error compacting sessions: {e}")
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite session store (WAL mode).
+
+    Session metadata, plans and chat messages live in separate tables. The
+    ``sessions`` table carries denormalized ``has_hiring_plan`` and
+    ``message_count`` columns so listings are served from the
+    ``created_at`` index without touching plans or messages.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL DEFAULT '',
+            updated_at TEXT,
+            status TEXT,
+            data TEXT NOT NULL,
+            has_hiring_plan INTEGER NOT NULL DEFAULT 0,
+            message_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at, session_id);
+        CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+        CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions(status, created_at, session_id);
+        CREATE INDEX IF NOT EXISTS idx_sessions_has_plan ON sessions(has_hiring_plan, created_at, session_id);
+        CREATE TABLE IF NOT EXISTS plans (
+            session_id TEXT PRIMARY KEY REFERENCES sessions(session_id) ON DELETE CASCADE,
+            plan TEXT NOT NULL,
+            updated_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+            timestamp TEXT,
+            user_message TEXT,
+            ai_response TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+    """
+
+    def __init__(self, storage_dir: str = "data", db_name: str = "sessions.db"):
+        self.storage_dir = storage_dir
+        self.db_file = os.path.join(storage_dir, db_name)
+        self._lock = threading.RLock()
+        self._in_batch = False
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Commits are grouped by the commit queue, so each one can afford an fsync
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.SCHEMA)
+
+    def create(self, session_id: str, session_data: Dict):
+        data = dict(session_data)
+        hiring_plan = data.pop("hiring_plan", None)
+        messages = data.pop("messages", None) or []
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, created_at, updated_at, status, data, has_hiring_plan, message_count)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, data.get("created_at") or "", data.get("updated_at"), data.get("status"),
+                 json.dumps(data), int(bool(hiring_plan)), len(messages))
+            )
+            if hiring_plan:
+                self._conn.execute(
+                    "INSERT INTO plans (session_id, plan, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(hiring_plan), data.get("updated_at"))
+                )
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, timestamp, user_message, ai_response) VALUES (?, ?, ?, ?)",
+                [(session_id, m.get("timestamp"), m.get("user_message"), m.get("ai_response")) for m in messages]
+            )
+
+    def get(self, session_id: str, fields: Optional[Collection[str]] = None) -> Optional[Dict]:
+        if metadata_only(fields):
+            columns = [column for column in META_FIELDS if column in fields] or ["session_id"]
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(columns)} FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            return summary_fields(dict(zip(columns, row)), [column for column in columns if column in fields])
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at, message_count FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            with_plan = fields is None or "hiring_plan" in fields
+            if with_plan:
+                plan_row = self._conn.execute(
+                    "SELECT plan FROM plans WHERE session_id = ?", (session_id,)
+                ).fetchone()
+
+        session = json.loads(row[0])
+        if row[1]:
+            session["updated_at"] = row[1]
+        session["message_count"] = row[2]
+        if with_plan:
+            session["hiring_plan"] = json.loads(plan_row[0]) if plan_row else None
+        return session
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return [], None
+            end = row[0] if cursor is None else max(0, min(row[0], int(cursor)))
+            start = 0 if limit is None else max(0, end - limit)
+
+            if since is not None:
+                rows = self._conn.execute(
+                    "SELECT timestamp, user_message, ai_response FROM"
+                    " (SELECT id, timestamp, user_message, ai_response FROM messages"
+                    "  WHERE session_id = ? ORDER BY id LIMIT ?)"
+                    " WHERE timestamp > ? ORDER BY id",
+                    (session_id, end, since)
+                ).fetchall()
+                if limit is not None:
+                    rows = rows[-limit:] if limit else []
+                next_cursor = None
+            else:
+                rows = self._conn.execute(
+                    "SELECT timestamp, user_message, ai_response FROM messages"
+                    " WHERE session_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                    (session_id, end - start, start)
+                ).fetchall()
+                next_cursor = str(start) if start > 0 else None
+
+        messages = [
+            {"timestamp": ts, "user_message": user_message, "ai_response": ai_response}
+            for ts, user_message, ai_response in rows
+        ]
+        return messages, next_cursor
+
+    def update_plan(self, session_id: str, hiring_plan: Dict, updated_at: str) -> bool:
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE sessions SET updated_at = ?, has_hiring_plan = ? WHERE session_id = ?",
+                (updated_at, int(bool(hiring_plan)), session_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (session_id, plan, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(hiring_plan), updated_at)
+            )
+            return True
+
+    def add_message(self, session_id: str, message: Dict, updated_at: str) -> bool:
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE sessions SET updated_at = ?, message_count = message_count + 1 WHERE session_id = ?",
+                (updated_at, session_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._conn.execute(
+                "INSERT INTO messages (session_id, timestamp, user_message, ai_response) VALUES (?, ?, ?, ?)",
+                (session_id, message.get("timestamp"), message.get("user_message"), message.get("ai_response"))
+            )
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock, self._transaction():
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            return cursor.rowcount > 0
+
+    def list_summaries(self, limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+                       has_hiring_plan: Optional[bool] = None) -> Tuple[List[Dict], Optional[str]]:
+        if limit is not None and limit < 1:
+            return [], None
+        query = "SELECT session_id, created_at, updated_at, status, has_hiring_plan, message_count FROM sessions"
+        conditions: List[str] = []
+        params: List = []
+        after = decode_cursor(cursor)
+        if after:
+            conditions.append("(created_at, session_id) < (?, ?)")
+            params.extend(after)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if has_hiring_plan is not None:
+            conditions.append("has_hiring_plan = ?")
+            params.append(int(bool(has_hiring_plan)))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC, session_id DESC"
+        if limit is not None:
+            # Fetch one extra row to learn whether another page exists
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        session_list = [
+            {
+                "session_id": session_id,
+                "created_at": created_at or None,
+                "updated_at": updated_at,
+                "status": status,
+                "has_hiring_plan": bool(has_hiring_plan),
+                "message_count": message_count
+            }
+            for session_id, created_at, updated_at, status, has_hiring_plan, message_count in rows
+        ]
+        if limit is None or len(session_list) <= limit:
+            return session_list, None
+
+        page = session_list[:limit]
+        return page, encode_cursor(page[-1]["created_at"], page[-1]["session_id"])
+
+    def iter_sessions(self) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            session_ids = [row[0] for row in self._conn.execute("SELECT session_id FROM sessions")]
+        for session_id in session_ids:
+            session = self.get(session_id)
+            if session is not None:
+                session["messages"] = self.get_messages(session_id)[0]
+                yield session_id, session
+
+    @contextmanager
+    def batch(self):
+        """Run the whole batch as one transaction; each mutation is a savepoint"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._in_batch = True
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self._in_batch = False
+                self._conn.rollback()
+            raise
+        with self._lock:
+            self._in_batch = False
+            self._conn.commit()
+
+    @contextmanager
+    def _transaction(self):
+        """Commit on its own, or as a savepoint inside a running batch"""
+        if not self._in_batch:
+            with self._conn:
+                yield
+            return
+        self._conn.execute("SAVEPOINT mutation")
+        try:
+            yield
+        except Exception:
+            self._conn.execute("ROLLBACK TO mutation")
+            self._conn.execute("RELEASE mutation")
+            raise
+        self._conn.execute("RELEASE mutation")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class ShardedSessionStore(SessionStore):
+    """One JSON file per session under hashed subdirectories.
+
+    ``data/sessions/ab/<session_id>.json`` holds a single session, so an
+    update rewrites only that session's bytes. Every write goes to a temp
+    file that is moved into place with ``os.replace``, so readers never see a
+    torn file and writers to different sessions never clobber each other.
+    ``list_summaries`` is served from a small side index instead of opening
+    every shard. Chat history is appended to a segmented ``MessageLog``; the
+    index carries ``message_count`` and ``updated_at`` so appending a message
+    does not rewrite the shard.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, storage_dir: str = "data", dir_name: str = "sessions"):
+        self.sessions_dir = os.path.join(storage_dir, dir_name)
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        self._locks = [threading.RLock() for _ in range(self.LOCK_STRIPES)]
+        self._in_batch = False
+        self._dirty: Dict[str, Dict] = {}
+        self._dirty_lock = threading.Lock()
+        self.messages = MessageLog(os.path.join(storage_dir, "session_messages"))
+        self.index = SessionIndex(self.sessions_dir)
+        if not self.index.loaded_from_disk:
+            self._rebuild_index()
+
+    def create(self, session_id: str, session_data: Dict):
+        data = dict(session_data)
+        inline_messages = data.pop("messages", None) or []
+        with self._lock_for(session_id):
+            data["message_count"] = self.messages.extend(session_id, inline_messages)
+            self._write_shard(session_id, data)
+            self.index.put(session_summary(session_id, data))
+
+    def get(self, session_id: str, fields: Optional[Collection[str]] = None) -> Optional[Dict]:
+        if metadata_only(fields):
+            summary = self.index.get(session_id)
+            return summary_fields(summary, fields) if summary else None
+        session = self._read_shard(session_id)
+        if session is None:
+            return None
+        if "messages" in session:
+            session = self._externalize_messages(session_id)
+        summary = self.index.get(session_id)
+        if summary:
+            session["updated_at"] = summary.get("updated_at")
+            session["message_count"] = summary.get("message_count", 0)
+        return session
+
+    def update_plan(self, session_id: str, hiring_plan: Dict, updated_at: str) -> bool:
+        with self._lock_for(session_id):
+            session = self.get(session_id)
+            if session is None:
+                return False
+            session["hiring_plan"] = hiring_plan
+            session["updated_at"] = updated_at
+            self._write_shard(session_id, session)
+            self.index.put(session_summary(session_id, session))
+            return True
+
+    def add_message(self, session_id: str, message: Dict, updated_at: str) -> bool:
+        with self._lock_for(session_id):
+            summary = self.index.get(session_id)
+            if summary is None:
+                return False
+            if self.messages.count(session_id) < summary.get("message_count", 0):
+                # History is still inline in a shard written by an older version
+                self._externalize_messages(session_id)
+            summary["message_count"] = self.messages.append(session_id, message)
+            summary["updated_at"] = updated_at
+            self.index.put(summary)
+            return True
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        # The side index answers existence without reading the shard
+        summary = self.index.get(session_id)
+        if summary is None:
+            return [], None
+        if self.messages.count(session_id) < summary.get("message_count", 0):
+            # History is still inline in a shard written by an older version
+            self._externalize_messages(session_id)
+        return self.messages.read(session_id, limit=limit, cursor=cursor, since=since)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock_for(session_id):
+            with self._dirty_lock:
+                existed = self._dirty.pop(session_id, None) is not None
+            try:
+                os.remove(self._shard_path(session_id))
+                existed = True
+            except FileNotFoundError:
+                pass
+            if not existed:
+                return False
+            self.index.remove(session_id)
+            self.messages.delete(session_id)
+            return True
+
+    def list_summaries(self, limit: Optional[int] = None, cursor: Optional[str] = None, status: Optional[str] = None,
+                       has_hiring_plan: Optional[bool] = None) -> Tuple[List[Dict], Optional[str]]:
+        return self.index.list(limit=limit, cursor=cursor, status=status, has_hiring_plan=has_hiring_plan)
+
+    def iter_sessions(self) -> Iterator[Tuple[str, Dict]]:
+        for session_id in self._shard_ids():
+            session = self.get(session_id)
+            if session is not None:
+                session["messages"] = self.messages.read(session_id)[0]
+                yield session_id, session
+
+    @contextmanager
+    def batch(self):
+        """Coalesce shard rewrites so each session is written once per batch"""
+        self._in_batch = True
+        try:
+            yield
+        finally:
+            self._in_batch = False
+        self.sync()
+
+    def sync(self):
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+        for session_id, session in dirty.items():
+            self._flush_shard(session_id, session)
+        self.index.sync()
+        self.messages.sync()
+
+    def close(self):
+        self.sync()
+        self.index.close()
+
+    def _lock_for(self, session_id: str) -> threading.Lock:
+        return self._locks[hash(session_id) % self.LOCK_STRIPES]
+
+    def _shard_path(self, session_id: str) -> str:
+        bucket = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.sessions_dir, bucket, f"{session_id}.json")
+
+    def _read_shard(self, session_id: str) -> Optional[Dict]:
+        with self._dirty_lock:
+            pending = self._dirty.get(session_id)
+        if pending is not None:
+            return json.loads(json.dumps(pending))
+        try:
+            with open(self._shard_path(session_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_shard(self, session_id: str, session: Dict):
+        if self._in_batch:
+            with self._dirty_lock:
+                self._dirty[session_id] = session
+            return
+        self._flush_shard(session_id, session)
+
+    def _flush_shard(self, session_id: str, session: Dict):
+        path = self._shard_path(session_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(session, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    def _externalize_messages(self, session_id: str) -> Optional[Dict]:
+        """Move chat history stored inline by older versions into the MessageLog"""
+        with self._lock_for(session_id):
+            session = self._read_shard(session_id)
+            if session is None or "messages" not in session:
+                return session
+            inline_messages = session.pop("messages") or []
+            if inline_messages and self.messages.count(session_id) == 0:
+                self.messages.extend(session_id, inline_messages)
+            session["message_count"] = self.messages.count(session_id)
+            self._write_shard(session_id, session)
+            self.index.put(session_summary(session_id, session))
+            return session
+
+    def _shard_ids(self) -> Iterator[str]:
+        for bucket in sorted(os.listdir(self.sessions_dir)):
+            bucket_dir = os.path.join(self.sessions_dir, bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for name in os.listdir(bucket_dir):
+                if name.endswith(".json"):
+                    yield name[:-len(".json")]
+
+    def _rebuild_index(self):
+        """Scan every shard once when the side index is missing"""
+        for session_id in self._shard_ids():
+            session = self._read_shard(session_id)
+            if session is not None:
+                if "messages" not in session:
+                    session["message_count"] = self.messages.count(session_id)
+                self.index.put(session_summary(session_id, session))
+
+def migrate_sessions(source: SessionStore, target: SessionStore) -> int:
+    """Copy every session from one store into another, returning the count"""
+    count = 0
+    for session_id, session_data in source.iter_sessions():
+        target.create(session_id, session_data)
+        count += 1
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import data/sessions.json into another session store")
+    parser.add_argument("--storage-dir", default="data")
+    parser.add_argument("--backend", choices=["sqlite", "sharded"], default="sqlite")
+    args = parser.parse_args()
+
+    json_store = JsonSessionStore(args.storage_dir)
+    if args.backend == "sqlite":
+        target_store = SQLiteSessionStore(args.storage_dir)
+    else:
+        target_store = ShardedSessionStore(args.storage_dir)
+    try:
+        migrated = migrate_sessions(json_store, target_store)
+        print(f"Migrated {migrated} sessions into the {args.backend} store")
+    finally:
+        json_store.close()
+        target_store.close()
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from utils.metrics import metrics
+
+class FlightAbandoned(Exception):
+    """The leading call was cancelled before producing a result"""
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key into one computation.
+
+    The first caller for a key (the leader) runs the computation; callers
+    arriving while it is in flight wait for the leader's result instead of
+    starting their own. Nothing is cached: once the leader finishes, the
+    next call with that key starts a new computation. If the leader is
+    cancelled, waiting callers retry and one of them takes over.
+
+    Calls are counted in ``hr_agent_single_flight_calls_total`` by ``name``
+    and by whether they led or were coalesced.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of ``func`` for this key and whether it was shared with an earlier caller"""
+        while True:
+            future, leader = self.claim(key)
+            if leader:
+                break
+            try:
+                return await asyncio.shield(future), True
+            except FlightAbandoned:
+                continue
+
+        try:
+            result = await func()
+        except BaseException as e:
+            self.resolve(key, error=e)
+            raise
+        self.resolve(key, result=result)
+        return result, False
+
+    def claim(self, key: str) -> Tuple[asyncio.Future, bool]:
+        """The in-flight future for a key and whether the caller leads it.
+
+        A leader must call ``resolve`` exactly once, whatever happens.
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            metrics.inc("hr_agent_single_flight_calls_total", {"name": self.name, "result": "coalesced"})
+            return future, False
+        future = self._flights[key] = asyncio.get_running_loop().create_future()
+        # Followers may never come; don't warn about an exception nobody retrieved
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.leaders += 1
+        metrics.inc("hr_agent_single_flight_calls_total", {"name": self.name, "result": "leader"})
+        return future, True
+
+    def resolve(self, key: str, result: Any = None, error: BaseException = None):
+        """Hand the leader's result (or failure) to every waiting caller"""
+        future = self._flights.pop(key)
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.set_exception(FlightAbandoned(self.name))
+
+    def stats(self) -> Dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "calls": calls,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / calls, 4) if calls else 0.0
+        }
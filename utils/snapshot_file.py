@@ -0,0 +1,203 @@
+import json
+import mmap
+import os
+import uuid
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+class SnapshotFile:
+    """Read-only, random-access view of a sessions snapshot.
+
+    Snapshots are written as a JSON object with one session per line
+    (``"<session_id>": {...},``), which is still plain JSON for anything that
+    loads the whole file. A ``<snapshot>.offsets`` sidecar maps each session
+    to the byte range of its line, so ``get`` decodes just that line from an
+    ``mmap`` of the file. A missing or stale sidecar is rebuilt by scanning
+    the lines once; a snapshot written in an older (pretty-printed or
+    single-line) layout reports ``legacy`` and has no offsets.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets_file = f"{path}.offsets"
+        self.legacy = False
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._offsets = self._load_offsets(size)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def ids(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Decode a single session"""
+        line = self.raw(session_id)
+        return json.loads(line) if line is not None else None
+
+    def raw(self, session_id: str) -> Optional[str]:
+        """The encoded session exactly as stored"""
+        location = self._offsets.get(session_id)
+        if location is None:
+            return None
+        offset, length = location
+        return self._mmap[offset:offset + length].decode("utf-8")
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    @classmethod
+    def write(cls, path: str, sessions: Iterable[Tuple[str, str]]):
+        """Atomically write ``(session_id, encoded_session)`` pairs and their offsets"""
+        offsets = {}
+        tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(b"{")
+            separator = b"\n"
+            for session_id, encoded in sessions:
+                key = (json.dumps(session_id) + ": ").encode("utf-8")
+                value = encoded.encode("utf-8")
+                f.write(separator + key)
+                offsets[session_id] = [f.tell(), len(value)]
+                f.write(value)
+                separator = b",\n"
+            f.write(b"\n}\n")
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        cls._write_offsets(f"{path}.offsets", size, offsets)
+        # The sidecar records the snapshot size, so a crash between the two
+        # renames leaves a sidecar that is detected as stale and rebuilt
+        os.replace(tmp_file, path)
+
+    def _load_offsets(self, size: int) -> Dict[str, list]:
+        try:
+            with open(self.offsets_file, 'r') as f:
+                sidecar = json.load(f)
+            if sidecar.get("size") == size:
+                return sidecar["offsets"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        offsets = self._scan()
+        if not self.legacy:
+            self._write_offsets(self.offsets_file, size, offsets)
+        return offsets
+
+    def _scan(self) -> Dict[str, list]:
+        """Rebuild offsets by walking the snapshot lines"""
+        offsets = {}
+        if self._mmap is None:
+            return offsets
+        if self._mmap[:2] not in (b"{\n", b"{}"):
+            self.legacy = True
+            return offsets
+        position = 2
+        while True:
+            end = self._mmap.find(b"\n", position)
+            if end < 0:
+                break
+            line = self._mmap[position:end].rstrip(b",")
+            if line == b"}":
+                break
+            key_end = line.find(b'": ')
+            if not line.startswith(b'"') or key_end < 0:
+                # Pretty-printed or single-line snapshot from an older version
+                self.legacy = True
+                return {}
+            session_id = json.loads(line[:key_end + 1])
+            offsets[session_id] = [position + key_end + 3, len(line) - key_end - 3]
+            position = end + 1
+        return offsets
+
+    @staticmethod
+    def _write_offsets(path: str, size: int, offsets: Dict[str, list]):
+        tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"size": size, "offsets": offsets}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+class LazySessions(MutableMapping):
+    """Sessions mapping backed by a ``SnapshotFile`` plus an in-memory overlay.
+
+    Reads through ``get`` decode only the requested session. Sessions that
+    are written, or fetched with ``[]`` to be mutated in place, are kept in
+    the overlay; deletions of snapshot sessions are remembered until the
+    next snapshot no longer contains them.
+    """
+
+    def __init__(self, base: SnapshotFile):
+        self.base = base
+        self.overlay: Dict[str, Dict] = {}
+        self.deleted: Set[str] = set()
+
+    def get(self, session_id: str, default=None):
+        if session_id in self.overlay:
+            return self.overlay[session_id]
+        if session_id in self.deleted:
+            return default
+        session = self.base.get(session_id)
+        return session if session is not None else default
+
+    def __getitem__(self, session_id: str) -> Dict:
+        if session_id in self.overlay:
+            return self.overlay[session_id]
+        session = None if session_id in self.deleted else self.base.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        self.overlay[session_id] = session
+        return session
+
+    def __setitem__(self, session_id: str, session: Dict):
+        self.overlay[session_id] = session
+        self.deleted.discard(session_id)
+
+    def __delitem__(self, session_id: str):
+        if session_id not in self:
+            raise KeyError(session_id)
+        self.overlay.pop(session_id, None)
+        if session_id in self.base:
+            self.deleted.add(session_id)
+
+    def __contains__(self, session_id) -> bool:
+        return session_id in self.overlay or (session_id not in self.deleted and session_id in self.base)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self.overlay)
+        for session_id in list(self.base.ids()):
+            if session_id not in self.overlay and session_id not in self.deleted:
+                yield session_id
+
+    def __len__(self) -> int:
+        added = sum(1 for session_id in self.overlay if session_id not in self.base)
+        return len(self.base) - len(self.deleted) + added
+
+    def encoded_items(self) -> Iterator[Tuple[str, str]]:
+        """Every session encoded, copying untouched snapshot lines verbatim"""
+        for session_id in list(self.base.ids()):
+            if session_id in self.deleted:
+                continue
+            if session_id in self.overlay:
+                yield session_id, json.dumps(self.overlay[session_id])
+            else:
+                yield session_id, self.base.raw(session_id)
+        for session_id, session in list(self.overlay.items()):
+            if session_id not in self.base:
+                yield session_id, json.dumps(session)
+
+    def rebase(self, base: SnapshotFile, keep: Set[str]):
+        """Switch to a newer snapshot, keeping overlay state only for ``keep``"""
+        old_base = self.base
+        self.base = base
+        self.overlay = {sid: session for sid, session in self.overlay.items() if sid in keep}
+        self.deleted = {sid for sid in self.deleted if sid in keep and sid in base}
+        old_base.close()
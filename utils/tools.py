@@ -5,6 +5,9 @@ from googleapiclient.discovery import build
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from utils.metrics import metrics
+from utils.rate_limit import search_rate_limiter
+
 class GoogleSearchTool:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
@@ -21,12 +24,14 @@ class GoogleSearchTool:
         """Perform Google search and return results"""
         
         if not self.service:
+            metrics.inc("hr_agent_search_calls_total", {"status": "unconfigured"})
             return {
                 "query": query,
                 "results": [],
                 "error": "Google Search API not configured"
             }
         
+        await search_rate_limiter.acquire()
         try:
             result = self.service.cse().list(
                 q=query,
@@ -45,6 +50,7 @@ class GoogleSearchTool:
                     "displayLink": item.get("displayLink", "")
                 })
             
+            metrics.inc("hr_agent_search_calls_total", {"status": "ok"})
             return {
                 "query": query,
                 "results": search_results,
@@ -52,6 +58,7 @@ class GoogleSearchTool:
             }
             
         except Exception as e:
+            metrics.inc("hr_agent_search_calls_total", {"status": "error"})
             return {
                 "query": query,
                 "results": [],